@@ -183,8 +183,9 @@ def draw_layout(layout, sheet_width, sheet_height):
 
 
 # Run everything
-start_time = time.time()
-layout = pack_smart_rows_with_rotation(SHEET_WIDTH, SHEET_HEIGHT, cut_pieces)
-end_time = time.time()
-print(f"🕒 Execution Time: {end_time - start_time:.4f} seconds")
-draw_layout(layout, SHEET_WIDTH, SHEET_HEIGHT)
+if __name__ == "__main__":
+    start_time = time.time()
+    layout = pack_smart_rows_with_rotation(SHEET_WIDTH, SHEET_HEIGHT, cut_pieces)
+    end_time = time.time()
+    print(f"🕒 Execution Time: {end_time - start_time:.4f} seconds")
+    draw_layout(layout, SHEET_WIDTH, SHEET_HEIGHT)
@@ -1,8 +1,13 @@
 import matplotlib.pyplot as plt
 from fractions import Fraction
-from math import ceil
 import time
 from collections import defaultdict
+import os
+import sys
+
+# Shared nesting engines live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nesting import occupancy, rowfill
 
 # ========== UTILITY FUNCTIONS ==========
 
@@ -30,44 +35,10 @@ def to_mixed_fraction(value):
 # ========== WASTE SCANNING ==========
 
 def scan_waste_blocks(sheet_w, sheet_h, rects, resolution=8):
-    grid_w = int(sheet_w * resolution)
-    grid_h = int(sheet_h * resolution)
-    used = [[False for _ in range(grid_w)] for _ in range(grid_h)]
-
-    for x, y, w, h, *_ in rects:
-        for dx in range(ceil(w * resolution)):
-            for dy in range(ceil(h * resolution)):
-                px = int(round((x + dx / resolution) * resolution))
-                py = int(round((y + dy / resolution) * resolution))
-                if 0 <= px < grid_w and 0 <= py < grid_h:
-                    used[py][px] = True
-
-    visited = [[False for _ in range(grid_w)] for _ in range(grid_h)]
-    waste_blocks = []
-
-    for y in range(grid_h - 1, -1, -1):
-        for x in range(grid_w):
-            if not used[y][x] and not visited[y][x]:
-                max_w = 0
-                while x + max_w < grid_w and not used[y][x + max_w] and not visited[y][x + max_w]:
-                    max_w += 1
-
-                max_h = 1
-                while True:
-                    next_y = y - max_h
-                    if next_y < 0:
-                        break
-                    if any(used[next_y][x + dx] or visited[next_y][x + dx] for dx in range(max_w)):
-                        break
-                    max_h += 1
-
-                for dy in range(max_h):
-                    for dx in range(max_w):
-                        visited[y - dy][x + dx] = True
-
-                top_y = y - max_h + 1
-                waste_blocks.append((x / resolution, top_y / resolution, max_w / resolution, max_h / resolution))
-    return waste_blocks
+    # Bottom-up scan on the shared NumPy occupancy grid (nesting/occupancy.py)
+    return occupancy.scan_waste_blocks(
+        sheet_w, sheet_h, rects, scan_direction="bottom", resolution=resolution, snap="round"
+    )
 
 # ========== FASTER FALLBACK OPTIMIZER ==========
 
@@ -78,59 +49,9 @@ def optimize_layout(sheet_w, sheet_h, cuts):
     try:
         print("[PERF] Starting optimizer profiling...")
         start_time = time.time()
-        def dp_find_best_row(pieces, max_width):
-            n = len(pieces)
-            dp = [{} for _ in range(n + 1)]  # dp[i][w] = (total, items)
-
-            dp[0][0] = (0, [])
-
-            for i in range(1, n + 1):
-                w0, h0, label, is_bracket = pieces[i - 1]
-                orientations = [(w0, h0), (h0, w0)]
-                for prev_w, (total, items) in dp[i - 1].items():
-                    for w, h in orientations:
-                        new_w = prev_w + w
-                        if new_w <= max_width:
-                            new_total = total + w
-                            new_items = items + [(w, h, label, is_bracket, i - 1)]
-                            if new_w not in dp[i] or dp[i][new_w][0] < new_total:
-                                dp[i][new_w] = (new_total, new_items)
-
-                    if prev_w not in dp[i] or dp[i][prev_w][0] < total:
-                        dp[i][prev_w] = (total, items)
-
-            best_total = 0
-            best_items = []
-            for total, items in dp[n].values():
-                if total > best_total:
-                    best_total = total
-                    best_items = items
-
-            if not best_items:
-                return None
-
-            used_indexes = [idx for *_, idx in best_items]
-            used_items = [pieces[i] for i in used_indexes]
-            row = [item[:4] for item in best_items]
-            return used_items, row
-
-        parsed = [tuple(cut) for cut in cuts]
-        y_cursor = 0
-        layout = []
-
-        while parsed:
-            result = dp_find_best_row(parsed, sheet_w)
-            if not result:
-                break
-            used_items, row = result
-            row_height = max(h for _, h, _, _ in row)
-            if y_cursor + row_height > sheet_h:
-                break
-            layout.extend(row)
-            for item in used_items:
-                parsed.remove(item)
-            y_cursor += row_height
-
+        # Row DP over 1/16" widths with back-pointers (shared with the app)
+        layout = rowfill.fill_rows(sheet_w, sheet_h, cuts)
+        print(f"[PERF] Optimizer time: {time.time() - start_time:.4f} seconds")
         return layout
     
     except Exception as e:
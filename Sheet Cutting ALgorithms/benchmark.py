@@ -0,0 +1,348 @@
+# Sheet Cutting ALgorithms/benchmark.py
+"""
+Benchmark harness for the sheet cutting algorithms.
+
+Runs every packer on the same cut lists — the real jobs that live in the
+comments of the Greedy-BinPackingAlgorithm scripts / grouping-logic.py, plus
+seeded random jobs at shop-floor sizes — and reports per (case, algorithm):
+
+    time_ms        best wall time over --repeat runs
+    peak_kb        peak Python heap during one extra traced run (tracemalloc)
+    utilization    placed area / sheet area
+    placed         pieces on the sheet
+    unplaced       pieces that did not fit
+    valid          every piece inside the sheet and no overlaps
+
+Each (case, algorithm) runs in its own process with a --timeout budget;
+Algorithm 1 tries every row combination and does not finish on large jobs.
+
+Output is JSON (default) or CSV. Pass --baseline with an earlier JSON run to
+flag speed / yield regressions (exit code 1 when any are found).
+
+    python "Sheet Cutting ALgorithms/benchmark.py" --out bench.json
+    python "Sheet Cutting ALgorithms/benchmark.py" --baseline bench.json
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import time
+import tracemalloc
+from fractions import Fraction
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def parse_inches(value):
+    value = value.strip()
+    if " " in value:
+        whole, frac = value.split(" ")
+        return int(whole) + float(Fraction(frac))
+    return float(Fraction(value))
+
+
+def to_mixed_fraction(value):
+    inches = int(value)
+    fraction = Fraction(value - inches).limit_denominator(16)
+    if fraction == 0:
+        return f"{inches}"
+    if inches == 0:
+        return f"{fraction.numerator}/{fraction.denominator}"
+    return f"{inches} {fraction.numerator}/{fraction.denominator}"
+
+
+# ========== CUT LISTS ==========
+# (name, sheet_w, sheet_h, [(w, h, is_bracket), ...]) — same shape as raw_pieces
+REAL_CASES = [
+    ("shelf-31-3/8", 48.0, 96.0, [("9", "31 3/8", False)] * 12 + [("12", "31 3/8", False)] * 3),
+    ("shelf-40-3/8", 48.0, 96.0, [("9", "40 3/8", False)] * 8 + [("12", "40 3/8", False)] * 2 + [("46 3/8", "12", False)]),
+    ("shelf-37-3/8", 48.0, 96.0, [("9", "37 3/8", False)] * 8 + [("12", "37 3/8", False)] * 2
+                                 + [("46 3/8", "12", False), ("46 3/8", "9", False)]),
+    ("shelf-37-3/8-short", 48.0, 76.0, [("9", "37 3/8", False)] * 8 + [("12", "37 3/8", False)] * 2),
+    ("shelf-25-3/8", 48.0, 77.0, [("9", "25 3/8", False)] * 12 + [("12", "25 3/8", False)] * 3),
+    ("brackets-mixed", 48.0, 96.0, [("6 1/2", "16 1/2", False)] * 35 + [("4 1/2", "13 1/2", False)] * 2
+                                   + [("19 1/2", "6 1/2", False)] * 4),
+    ("panels-53", 49.0, 106.0, [("21", "53", False)] * 4 + [("3 1/2", "53", False)] * 4),
+    ("cabinet-78", 48.0, 78.0, [("11", "77", False)] + [("27", "39", False)] * 2 + [("5", "39", False)] * 4),
+]
+
+SHEET_SIZES = [(48.0, 96.0), (48.0, 120.0), (60.0, 120.0)]
+
+
+def random_case(rng, index):
+    """A shop-like job: a few distinct part sizes in 1/8" steps, 60–105% of the sheet area."""
+    sheet_w, sheet_h = rng.choice(SHEET_SIZES)
+    target = sheet_w * sheet_h * rng.uniform(0.6, 1.05)
+    sizes = []
+    for _ in range(rng.randint(2, 5)):
+        w = rng.randint(28, int(sheet_w * 0.5) * 8) / 8
+        h = rng.randint(48, int(sheet_h * 0.6) * 8) / 8
+        sizes.append((to_mixed_fraction(w), to_mixed_fraction(h)))
+
+    pieces = []
+    area = 0.0
+    while area < target:
+        w, h = rng.choice(sizes)
+        pieces.append((w, h, rng.random() < 0.1))
+        area += parse_inches(w) * parse_inches(h)
+    return (f"random-{index:02d}", sheet_w, sheet_h, pieces)
+
+
+# ========== PACKERS ==========
+_scripts = {}
+
+
+def load_script(filename):
+    """Import one of the scripts in this folder (hyphenated names) once."""
+    if filename in _scripts:
+        return _scripts[filename]
+    path = os.path.join(HERE, filename)
+    name = os.path.splitext(filename)[0].replace("-", "_").lower()
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    _scripts[filename] = module
+    return module
+
+
+def to_rectangles(pieces):
+    return [(parse_inches(w), parse_inches(h), f"{w} x {h}", is_bracket) for w, h, is_bracket in pieces]
+
+
+def script_packer(filename):
+    def run(sheet_w, sheet_h, pieces):
+        module = load_script(filename)
+        result = module.place_rectangles(sheet_w, sheet_h, to_rectangles(pieces))
+        # Algorithm 2/3 return only the placements
+        if isinstance(result, tuple):
+            return result[0]
+        return result
+    return run
+
+
+def row_packer(sheet_w, sheet_h, pieces):
+    module = load_script("Greedy-BinPackingAlgorithm1.py")
+    cut_pieces = [
+        {"id": i + 1, "length": parse_inches(w), "width": parse_inches(h), "length_str": w, "width_str": h}
+        for i, (w, h, _) in enumerate(pieces)
+    ]
+    layout = module.pack_smart_rows_with_rotation(sheet_w, sheet_h, cut_pieces)
+    return [(p["x"], p["y"], p["width"], p["height"], p["index"], False) for p in layout]
+
+
+def in_app_packer(sheet_w, sheet_h, pieces):
+    # The app's packer without Qt / Firebase (see nesting.jobs)
+    from nesting import jobs
+    used, _ = jobs.place_rectangles(sheet_w, sheet_h, to_rectangles(pieces))
+    return used
+
+
+def grouped_in_app_packer(sheet_w, sheet_h, pieces):
+    from nesting import jobs
+    ordered = load_script("grouping-logic.py").group_sort(pieces)
+    used, _ = jobs.place_rectangles(sheet_w, sheet_h, to_rectangles(ordered))
+    return used
+
+
+def engine_packer(key):
+    def run(sheet_w, sheet_h, pieces):
+        from nesting.engines import get_engine
+        used, _ = get_engine(key, presort=True).pack(sheet_w, sheet_h, to_rectangles(pieces))
+        return used
+    return run
+
+
+PACKERS = {
+    "algorithm1": row_packer,
+    "algorithm2": script_packer("Greedy-BinPackingAlgorithm2.py"),
+    "algorithm3": script_packer("Greedy-BinPackingAlgorithm3.py"),
+    "algorithm4": script_packer("Greedy-BinPackingAlgorithm4.py"),
+    "algorithm5": script_packer("Greedy-BinPackingAlgorithm5.py"),
+    "grouping-logic+in-app": grouped_in_app_packer,
+    "in-app": in_app_packer,
+}
+for _key in ("skyline", "maxrects-bssf", "maxrects-cp", "guillotine-2", "guillotine-3", "blocks"):
+    PACKERS[f"engine:{_key}"] = engine_packer(_key)
+
+
+# ========== MEASUREMENT ==========
+def check_layout(sheet_w, sheet_h, used, eps=1e-6):
+    for i, (x, y, w, h, *_) in enumerate(used):
+        if x < -eps or y < -eps or x + w > sheet_w + eps or y + h > sheet_h + eps:
+            return False
+        for ox, oy, ow, oh, *_ in used[i + 1:]:
+            if x + w > ox + eps and ox + ow > x + eps and y + h > oy + eps and oy + oh > y + eps:
+                return False
+    return True
+
+
+def measure(packer, sheet_w, sheet_h, pieces, repeat):
+    # The first (untimed) call imports the script, so timing covers packing only
+    with contextlib.redirect_stdout(io.StringIO()):
+        used = packer(sheet_w, sheet_h, pieces)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            packer(sheet_w, sheet_h, pieces)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+    placed_area = sum(r[2] * r[3] for r in used)
+    return {
+        "time_ms": round(best * 1000, 3),
+        "utilization": round(placed_area / (sheet_w * sheet_h), 4),
+        "placed": len(used),
+        "unplaced": max(0, len(pieces) - len(used)),
+        "valid": check_layout(sheet_w, sheet_h, used),
+    }
+
+
+def measure_peak(packer, sheet_w, sheet_h, pieces):
+    """Peak traced heap in KB for one run (tracing slows the run down a lot)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        try:
+            packer(sheet_w, sheet_h, pieces)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def _measure_in_child(algo, sheet_w, sheet_h, pieces, repeat, results):
+    try:
+        results.put(measure(PACKERS[algo], sheet_w, sheet_h, pieces, repeat))
+        results.put({"peak_kb": measure_peak(PACKERS[algo], sheet_w, sheet_h, pieces)})
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(algo, sheet_w, sheet_h, pieces, repeat, timeout):
+    """
+    measure() in a child process, so an exhaustive search that runs away can
+    be cut off. Timings are kept even if the traced memory run overruns.
+    """
+    results = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_measure_in_child, args=(algo, sheet_w, sheet_h, pieces, repeat, results))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    row = {}
+    try:
+        row.update(results.get(timeout=timeout))
+        if "error" not in row:
+            row["peak_kb"] = None
+            row.update(results.get(timeout=max(0.1, deadline - time.monotonic())))
+    except queue.Empty:
+        if not row:
+            row["error"] = f"timeout after {timeout:g}s"
+    finally:
+        if proc.is_alive():
+            proc.terminate()
+        proc.join()
+    return row
+
+
+def run_benchmark(cases, packers, repeat, timeout):
+    rows = []
+    for name, sheet_w, sheet_h, pieces in cases:
+        for algo in packers:
+            row = {"case": name, "algorithm": algo, "sheet": f"{sheet_w:g}x{sheet_h:g}", "pieces": len(pieces)}
+            row.update(run_isolated(algo, sheet_w, sheet_h, pieces, repeat, timeout))
+            rows.append(row)
+            if "error" in row:
+                status = row["error"]
+            else:
+                status = f"{row['time_ms']:>10.3f} ms  {row['utilization'] * 100:6.2f}%  unplaced {row['unplaced']}"
+            print(f"  {name:<20} {algo:<22} {status}", file=sys.stderr)
+    return rows
+
+
+def compare(rows, baseline_rows, time_tolerance, yield_tolerance):
+    """Regressions against an earlier run, as readable strings."""
+    previous = {(r["case"], r["algorithm"]): r for r in baseline_rows}
+    problems = []
+    for row in rows:
+        old = previous.get((row["case"], row["algorithm"]))
+        if not old or "error" in old:
+            continue
+        label = f"{row['case']} / {row['algorithm']}"
+        if "error" in row:
+            problems.append(f"{label}: now fails ({row['error']})")
+            continue
+        if old["time_ms"] > 0 and row["time_ms"] > old["time_ms"] * time_tolerance:
+            problems.append(f"{label}: {old['time_ms']} ms → {row['time_ms']} ms")
+        if row["utilization"] < old["utilization"] - yield_tolerance:
+            problems.append(f"{label}: utilization {old['utilization']} → {row['utilization']}")
+        if row["unplaced"] > old["unplaced"]:
+            problems.append(f"{label}: unplaced {old['unplaced']} → {row['unplaced']}")
+        if old.get("valid") and not row["valid"]:
+            problems.append(f"{label}: layout now overlaps or leaves the sheet")
+    return problems
+
+
+# ========== MAIN ==========
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sheet cutting algorithms.")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (best is kept)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per case and algorithm")
+    parser.add_argument("--random", type=int, default=6, help="number of random cases")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--only", nargs="*", choices=sorted(PACKERS), help="algorithms to run")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--out", help="write results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON output to compare against")
+    parser.add_argument("--time-tolerance", type=float, default=1.5, help="allowed slowdown factor")
+    parser.add_argument("--yield-tolerance", type=float, default=0.001, help="allowed utilization drop")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = REAL_CASES + [random_case(rng, i + 1) for i in range(args.random)]
+    packers = args.only or list(PACKERS)
+    rows = run_benchmark(cases, packers, args.repeat, args.timeout)
+
+    if args.format == "json":
+        payload = json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": rows,
+        }, indent=2, ensure_ascii=False)
+    else:
+        buffer = io.StringIO()
+        fields = ["case", "algorithm", "sheet", "pieces", "time_ms", "peak_kb",
+                  "utilization", "placed", "unplaced", "valid", "error"]
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+        payload = buffer.getvalue()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline_rows = json.load(f)["results"]
+        problems = compare(rows, baseline_rows, args.time_tolerance, args.yield_tolerance)
+        for line in problems:
+            print(f"⚠️ REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
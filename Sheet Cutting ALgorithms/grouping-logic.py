@@ -91,25 +91,30 @@ raw_pieces = [
         *[("5", "39", False)]*4,
     ]
 
-# --- Group identical parts by (width, height)
-grouped = defaultdict(list)
-for piece in raw_pieces:
-    grouped[(piece[0], piece[1])].append(piece)
-
-# --- Improved sort key: prioritize height, then narrower widths, then higher counts
-def nesting_sort_key(k):
-    w = parse_inches(k[0])
-    h = parse_inches(k[1])
-    count = len(grouped[k])
-    return (-h, -w, -count)
-
-# --- Sort group keys
-sorted_group_keys = sorted(grouped.keys(), key=nesting_sort_key)
-
-# --- Flatten final cut list based on sorted groups
-final_sorted_list = [piece for key in sorted_group_keys for piece in grouped[key]]
-
-# --- Output result
-print("📦 Final Grouped & Sorted Cut Order:\n")
-for i, p in enumerate(final_sorted_list, 1):
-    print(f"{i:02d}. {p}")
+# --- Group identical parts by (width, height), then sort the groups
+def group_sort(raw_pieces):
+    grouped = defaultdict(list)
+    for piece in raw_pieces:
+        grouped[(piece[0], piece[1])].append(piece)
+
+    # --- Improved sort key: prioritize height, then narrower widths, then higher counts
+    def nesting_sort_key(k):
+        w = parse_inches(k[0])
+        h = parse_inches(k[1])
+        count = len(grouped[k])
+        return (-h, -w, -count)
+
+    # --- Sort group keys
+    sorted_group_keys = sorted(grouped.keys(), key=nesting_sort_key)
+
+    # --- Flatten final cut list based on sorted groups
+    return [piece for key in sorted_group_keys for piece in grouped[key]]
+
+
+if __name__ == "__main__":
+    final_sorted_list = group_sort(raw_pieces)
+
+    # --- Output result
+    print("📦 Final Grouped & Sorted Cut Order:\n")
+    for i, p in enumerate(final_sorted_list, 1):
+        print(f"{i:02d}. {p}")
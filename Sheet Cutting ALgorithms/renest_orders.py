@@ -0,0 +1,298 @@
+# Sheet Cutting ALgorithms/renest_orders.py
+"""
+Re-nest historical manufacturing orders offline: how much raw sheet would
+each engine have needed for the cuts we actually made?
+
+Two steps, so the heavy part never needs Firestore (or Qt):
+
+    # 1. once, with Firebase credentials: sheets + raw sizes → a JSON file
+    python "Sheet Cutting ALgorithms/renest_orders.py" export --out orders.json
+
+    # 2. any time, offline: every engine on every sheet, across all cores
+    python "Sheet Cutting ALgorithms/renest_orders.py" report orders.json
+    python "Sheet Cutting ALgorithms/renest_orders.py" report orders.json --format csv --out renest.csv
+
+An order sheet is a cut list that was laid out once and cut raw_qty times.
+Per (sheet, algorithm) the report has
+
+    yield          placed area / sheet area for one layout of the cut list
+    unplaced       cuts that did not fit on that one layout
+    sheets_used    raw_qty as ordered
+    sheets_needed  sheets for raw_qty copies of the cut list (plan_order)
+    time_ms        wall time of both runs
+
+and a summary per algorithm (sheets saved against what was ordered).
+"in-app" is the app's own skyline layout with the row-fill fallback; its
+sheets_needed comes from carrying the cuts that did not fit over to the
+next sheet, one in-app layout per sheet (multisheet.fill_order).
+Pipe sheets and sheets whose raw item has no width/length are skipped.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from nesting import geometry, jobs
+from nesting.engines import ENGINES, get_engine, layout_area
+from nesting.multisheet import fill_order, plan_order
+
+EXPORT_VERSION = 1
+ALGORITHMS = ["in-app"] + list(ENGINES)
+GET_ALL_CHUNK = 300     # product refs per batched read
+
+
+# ========== EXPORT (Firestore) ==========
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_orders(db, status=None, limit=None):
+    """manufacturing_orders → list of plain sheet dicts (sizes in inches)."""
+    query = db.collection("manufacturing_orders")
+    if status:
+        query = query.where("status", "==", status)
+    if limit:
+        query = query.limit(limit)
+    orders = [(doc.id, doc.to_dict() or {}) for doc in query.stream()]
+
+    # Raw items, read in batches instead of one get() per sheet
+    refs = {}
+    for _, order in orders:
+        for sheet in order.get("sheets", []) or []:
+            ref = (sheet.get("raw_item") or {}).get("raw_ref")
+            if ref is not None:
+                refs[ref.path] = ref
+    products = {}
+    ref_list = list(refs.values())
+    for i in range(0, len(ref_list), GET_ALL_CHUNK):
+        for snap in db.get_all(ref_list[i:i + GET_ALL_CHUNK]):
+            if snap.exists:
+                products[snap.reference.path] = snap.to_dict() or {}
+
+    sheets = []
+    for order_id, order in orders:
+        for index, sheet in enumerate(order.get("sheets", []) or []):
+            raw_item = sheet.get("raw_item") or {}
+            ref = raw_item.get("raw_ref")
+            product = products.get(ref.path, {}) if ref is not None else {}
+            cuts = [
+                [c.get("length_raw", str(c.get("length", ""))), c.get("width_raw", str(c.get("width", ""))),
+                 bool(c.get("is_bracket", False))]
+                for c in sheet.get("cuts", []) or []
+                if "length" in c and "width" in c
+            ]
+            sheets.append({
+                "order_id": order_id,
+                "sheet": index + 1,
+                "status": order.get("status", ""),
+                "created_at": _json_value(order.get("created_at")),
+                "raw_subcat": sheet.get("raw_subcat", ""),
+                "raw_item": {
+                    "id": ref.id if ref is not None else "",
+                    "name": raw_item.get("name", ""),
+                    "item_code": product.get("item_code", ""),
+                    "length": product.get("length", 0),
+                    "length_unit": product.get("length_unit", "inch"),
+                    "width": product.get("width", 0),
+                    "width_unit": product.get("width_unit", "inch"),
+                },
+                "raw_qty": raw_item.get("qty", ""),
+                "cuts": cuts,
+            })
+    return sheets
+
+
+# ========== RE-NEST (offline) ==========
+def sheet_size(sheet):
+    """(width, length) in inches on the 1/16" grid, like ManufacturingModule.sheet_size_inches."""
+    raw = sheet.get("raw_item") or {}
+    sheet_w = geometry.to_inches(raw.get("width", 0), raw.get("width_unit", "inch"))
+    sheet_h = geometry.to_inches(raw.get("length", 0), raw.get("length_unit", "inch"))
+    return geometry.snap_down(sheet_w), geometry.snap_down(sheet_h)
+
+
+def sheet_qty(sheet):
+    try:
+        return max(1, int(float(sheet.get("raw_qty") or 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def sheet_rectangles(sheet):
+    rectangles = []
+    for w_raw, h_raw, is_bracket in sheet.get("cuts", []):
+        w = geometry.parse_units(w_raw)
+        h = geometry.parse_units(h_raw)
+        if w and h:
+            rectangles.append((geometry.from_units(w), geometry.from_units(h), f"{w_raw} x {h_raw}", is_bracket))
+    return rectangles
+
+
+def usable(sheet):
+    if "pipe" in str(sheet.get("raw_subcat", "")).lower():
+        return False
+    sheet_w, sheet_h = sheet_size(sheet)
+    return sheet_w > 0 and sheet_h > 0 and bool(sheet_rectangles(sheet))
+
+
+class InAppPacker:
+    """The app's layout (nesting.jobs) behind the engine pack() interface."""
+    key = "in-app"
+
+    def __init__(self, kerf=0.0):
+        self.kerf = kerf
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        return jobs.place_rectangles(sheet_w, sheet_h, rectangles, kerf=self.kerf)
+
+
+def renest_sheet(task):
+    """One (sheet, algorithm) run; top-level so worker processes can pickle it."""
+    sheet, algorithm, kerf = task
+    sheet_w, sheet_h = sheet_size(sheet)
+    rectangles = sheet_rectangles(sheet)
+    qty = sheet_qty(sheet)
+
+    start = time.perf_counter()
+    if algorithm == "in-app":
+        packer = InAppPacker(kerf=kerf)
+        used, unplaced = packer.pack(sheet_w, sheet_h, rectangles)
+        plan = fill_order(sheet_w, sheet_h, rectangles * qty, packer, engine_key=packer.key)
+    else:
+        used, unplaced = get_engine(algorithm, kerf=kerf).pack(sheet_w, sheet_h, rectangles)
+        plan = plan_order(sheet_w, sheet_h, rectangles * qty, engine_key=algorithm, kerf=kerf)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "order_id": sheet.get("order_id", ""),
+        "sheet": sheet.get("sheet", ""),
+        "size": f"{sheet_w:g}x{sheet_h:g}",
+        "algorithm": algorithm,
+        "pieces": len(rectangles),
+        "yield": round(layout_area(used) / (sheet_w * sheet_h), 4),
+        "unplaced": len(unplaced),
+        "sheets_used": qty,
+        "sheets_needed": plan.sheets_needed,
+        "never_fit": len(plan.unplaced),
+        "sheet_area": sheet_w * sheet_h,
+        "time_ms": round(elapsed * 1000, 3),
+    }
+
+
+def renest(sheets, algorithms, kerf=0.0, workers=None):
+    tasks = [(sheet, algorithm, kerf) for sheet in sheets for algorithm in algorithms]
+    if workers == 1 or len(tasks) < 2:
+        return [renest_sheet(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(renest_sheet, tasks, chunksize=max(1, len(tasks) // (8 * (workers or os.cpu_count() or 1)))))
+
+
+def summarize(rows, algorithms):
+    summary = []
+    for algorithm in algorithms:
+        mine = [r for r in rows if r["algorithm"] == algorithm]
+        if not mine:
+            continue
+        used = sum(r["sheets_used"] for r in mine)
+        needed = sum(r["sheets_needed"] for r in mine)
+        saved_area = sum((r["sheets_used"] - r["sheets_needed"]) * r["sheet_area"] for r in mine)
+        summary.append({
+            "algorithm": algorithm,
+            "sheets": len(mine),
+            "mean_yield": round(sum(r["yield"] for r in mine) / len(mine), 4),
+            "unplaced": sum(r["unplaced"] for r in mine),
+            "sheets_used": used,
+            "sheets_needed": needed,
+            "sheets_saved": used - needed,
+            "saved_sqft": round(saved_area / 144, 1),
+            "time_ms": round(sum(r["time_ms"] for r in mine), 1),
+        })
+    return summary
+
+
+def format_table(summary):
+    header = f"{'algorithm':<16} {'sheets':>6} {'yield':>7} {'unplaced':>8} {'used':>6} {'needed':>6} {'saved':>6} {'sq ft':>8} {'time s':>8}"
+    lines = [header, "-" * len(header)]
+    for s in summary:
+        lines.append(
+            f"{s['algorithm']:<16} {s['sheets']:>6} {s['mean_yield'] * 100:>6.1f}% {s['unplaced']:>8} "
+            f"{s['sheets_used']:>6} {s['sheets_needed']:>6} {s['sheets_saved']:>6} {s['saved_sqft']:>8} "
+            f"{s['time_ms'] / 1000:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+# ========== MAIN ==========
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-nest historical manufacturing orders with every engine.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="download order sheets from Firestore into a JSON file")
+    exp.add_argument("--out", required=True)
+    exp.add_argument("--status", help="only orders with this status")
+    exp.add_argument("--limit", type=int)
+
+    rep = sub.add_parser("report", help="re-nest an exported file (offline)")
+    rep.add_argument("file")
+    rep.add_argument("--only", nargs="*", choices=ALGORITHMS, help="algorithms to run")
+    rep.add_argument("--kerf", type=float, default=0.0, help="blade kerf in inches")
+    rep.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    rep.add_argument("--format", choices=("table", "json", "csv"), default="table")
+    rep.add_argument("--out", help="write results here instead of stdout")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from firebase.config import db      # only export needs Firestore
+        sheets = export_orders(db, status=args.status, limit=args.limit)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"version": EXPORT_VERSION, "exported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "sheets": sheets}, f, ensure_ascii=False, indent=1)
+        print(f"Exported {len(sheets)} sheets to {args.out}", file=sys.stderr)
+        return 0
+
+    with open(args.file, encoding="utf-8") as f:
+        exported = json.load(f)
+    sheets = [s for s in exported.get("sheets", []) if usable(s)]
+    algorithms = args.only or ALGORITHMS
+    print(f"Re-nesting {len(sheets)} sheets x {len(algorithms)} algorithms...", file=sys.stderr)
+
+    rows = renest(sheets, algorithms, kerf=geometry.snap(args.kerf), workers=args.workers)
+    summary = summarize(rows, algorithms)
+
+    if args.format == "table":
+        payload = format_table(summary) + "\n"
+    elif args.format == "json":
+        payload = json.dumps({"summary": summary, "results": rows}, indent=2, ensure_ascii=False)
+    else:
+        buffer = io.StringIO()
+        fields = ["order_id", "sheet", "size", "algorithm", "pieces", "yield", "unplaced",
+                  "sheets_used", "sheets_needed", "never_fit", "time_ms"]
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        payload = buffer.getvalue()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            f.write(payload)
+    else:
+        print(payload, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
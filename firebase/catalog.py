@@ -0,0 +1,262 @@
+# firebase/catalog.py
+"""
+Session-wide product catalog: products, main categories and subcategories
+read once and shared by every module, instead of each window streaming the
+whole "products" collection on open.
+
+    store = catalog_store()
+    store.ensure()                       # loads on first use
+    store.product(doc_id) / store.by_item_code(code)
+    store.products_in_sub(sub_id) / store.products_in_main(main_id)
+    store.main_id("Finished Products") / store.sub_ids(main_id)
+
+Product dicts are shared between modules: copy one (dict(data)) before
+changing it. Screens that show stock on hand pass max_age so a catalog
+that is older than that is re-read first; screens that only need names
+and sizes take whatever is loaded. refresh() forces a re-read (the
+"Refresh" buttons).
+
+Loads go through the local SQLite mirror (firebase.local_mirror): only
+documents written since the last sync are read from Firestore, the rest
+come from disk, and offline the local copy is served as is.
+
+The dashboard warms the store in the background right after login and
+clears it on logout. Loading is thread-safe: concurrent callers wait for
+one read instead of starting their own.
+
+While the realtime listeners run (ui/live_sync), every change is applied
+here as it happens and the store counts as "live": max_age and refresh()
+no longer re-read anything. Accounts and parties are kept the same way
+in plain per-collection stores, see documents().
+"""
+
+import threading
+import time
+
+from firebase.local_mirror import local_mirror
+
+STOCK_MAX_AGE = 60.0     # seconds; stock screens re-read an older catalog
+
+
+def _merge(current, upserts, removed=(), initial=False):
+    """
+    Apply one listener snapshot to {doc_id: data} without touching `current`
+    (readers may be iterating it). Returns (new_dict, changed_ids); an
+    initial snapshot is the whole collection and replaces it.
+    """
+    merged = {} if initial else dict(current)
+    changed = []
+    for doc_id, data in upserts.items():
+        if current.get(doc_id) != data:
+            changed.append(doc_id)
+        merged[doc_id] = data
+    gone = [i for i in current if i not in merged] if initial else [i for i in removed if i in merged]
+    for doc_id in gone:
+        merged.pop(doc_id, None)
+    return merged, changed + gone
+
+
+class CatalogStore:
+    LIVE_COLLECTIONS = ("product_main_categories", "product_sub_categories", "products")
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._products = {}          # doc_id -> data
+        self._main = {}              # doc_id -> data
+        self._sub = {}               # doc_id -> data
+        self._by_code = {}           # item_code -> doc_id
+        self._by_sub = {}            # sub_id -> [doc_id]
+        self._live = set()           # collections whose listener delivered its first snapshot
+
+    # ---------- loading ----------
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    @property
+    def age(self):
+        return time.monotonic() - self._loaded_at if self._loaded_at is not None else float("inf")
+
+    @property
+    def live(self):
+        return self._live.issuperset(self.LIVE_COLLECTIONS)
+
+    def ensure(self, max_age=None):
+        """Load once; with max_age, also re-read when the catalog is older than that."""
+        with self._lock:
+            if self.live:
+                return self
+            if not self.loaded or (max_age is not None and self.age > max_age):
+                self._load()
+        return self
+
+    def refresh(self):
+        """Re-read everything, unless the listeners already keep the catalog current."""
+        with self._lock:
+            if not self.live:
+                self._load()
+        return self
+
+    def clear(self):
+        with self._lock:
+            self._loaded_at = None
+            self._live = set()
+            self._products, self._main, self._sub = {}, {}, {}
+            self._by_code, self._by_sub = {}, {}
+
+    def _load(self):
+        mirror = local_mirror()
+        for collection in self.LIVE_COLLECTIONS:
+            mirror.pull(collection)
+        self._main = dict(mirror.rows("product_main_categories"))
+        self._sub = dict(mirror.rows("product_sub_categories"))
+        self._products = dict(mirror.rows("products"))
+        self._reindex()
+        self._loaded_at = time.monotonic()
+
+    def _reindex(self):
+        by_code, by_sub = {}, {}
+        for doc_id, data in self._products.items():
+            code = str(data.get("item_code") or "").strip()
+            if code:
+                by_code.setdefault(code, doc_id)
+            by_sub.setdefault(data.get("sub_id"), []).append(doc_id)
+        self._by_code, self._by_sub = by_code, by_sub
+
+    # ---------- realtime ----------
+    def apply(self, collection, upserts, removed=(), initial=False):
+        """
+        Apply one listener snapshot of `collection` ({doc_id: data} written,
+        [doc_id] deleted). Returns the ids whose data actually changed.
+        """
+        with self._lock:
+            if collection == "products":
+                self._products, changed = _merge(self._products, upserts, removed, initial)
+                if changed:
+                    self._reindex()
+            elif collection == "product_main_categories":
+                self._main, changed = _merge(self._main, upserts, removed, initial)
+            elif collection == "product_sub_categories":
+                self._sub, changed = _merge(self._sub, upserts, removed, initial)
+            else:
+                raise ValueError(f"Not a catalog collection: {collection}")
+            if initial:
+                self._live.add(collection)
+                if self.live:
+                    self._loaded_at = time.monotonic()
+            return changed
+
+    def stop_live(self):
+        """Listeners stopped: fall back to max_age re-reads from here on."""
+        with self._lock:
+            self._live = set()
+
+    # ---------- categories ----------
+    def main_categories(self):
+        """{doc_id: data}"""
+        return self._main
+
+    def sub_categories(self):
+        """{doc_id: data}"""
+        return self._sub
+
+    def main_id(self, name):
+        return next((i for i, d in self._main.items() if d.get("name") == name), None)
+
+    def sub_ids(self, main_id):
+        return [i for i, d in self._sub.items() if d.get("main_id") == main_id]
+
+    def sub_id(self, name, main_id=None):
+        return next((i for i, d in self._sub.items()
+                     if d.get("name") == name and (main_id is None or d.get("main_id") == main_id)), None)
+
+    # ---------- products ----------
+    def items(self):
+        """(doc_id, data) for every product."""
+        return list(self._products.items())
+
+    def product(self, doc_id):
+        return self._products.get(doc_id)
+
+    def by_item_code(self, code):
+        """(doc_id, data) or (None, None)."""
+        doc_id = self._by_code.get(str(code or "").strip())
+        return (doc_id, self._products[doc_id]) if doc_id else (None, None)
+
+    def products_in_sub(self, sub_id):
+        """[(doc_id, data)] in one subcategory."""
+        return [(i, self._products[i]) for i in self._by_sub.get(sub_id, [])]
+
+    def products_in_main(self, main_id):
+        """[(doc_id, data)] in every subcategory of one main category."""
+        out = []
+        for sub_id in self.sub_ids(main_id):
+            out.extend(self.products_in_sub(sub_id))
+        return out
+
+
+class DocumentStore:
+    """One collection ({doc_id: data}) kept current by its realtime listener."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._docs = {}
+        self.live = False
+
+    def apply(self, upserts, removed=(), initial=False):
+        with self._lock:
+            self._docs, changed = _merge(self._docs, upserts, removed, initial)
+            if initial:
+                self.live = True
+            return changed
+
+    def get(self, doc_id):
+        return self._docs.get(doc_id)
+
+    def items(self):
+        return list(self._docs.items())
+
+    def clear(self):
+        with self._lock:
+            self._docs = {}
+            self.live = False
+
+
+_store = None
+_store_lock = threading.Lock()
+_documents = {}
+
+
+def catalog_store():
+    """The catalog shared by every window of this session."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CatalogStore()
+        return _store
+
+
+def documents(name):
+    """The live store of one collection ("accounts", "parties")."""
+    with _store_lock:
+        if name not in _documents:
+            _documents[name] = DocumentStore(name)
+        return _documents[name]
+
+
+def discard(collection, ids):
+    """
+    Drop documents this app just deleted from the mirror and the in-memory
+    stores, ahead of the listener.
+    """
+    ids = list(ids)
+    local_mirror().delete(collection, ids)
+    if collection in CatalogStore.LIVE_COLLECTIONS:
+        catalog_store().apply(collection, {}, ids)
+    else:
+        with _store_lock:
+            store = _documents.get(collection)
+        if store is not None:
+            store.apply({}, ids)
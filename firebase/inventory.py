@@ -0,0 +1,198 @@
+# firebase/inventory.py
+"""
+Multi-product stock changes (products.qty[branch][color][condition]) in
+one Firestore transaction, together with the documents that record them.
+
+    apply_inventory_moves(
+        [("PRD-001", "Lahore", "No Color", "New", -5),     # out of Lahore
+         ("PRD-001", "Karachi", "No Color", "New", +5)],   # into Karachi
+        extra=lambda tx: [("set", chalan_ref, payload)],
+    )
+
+Moves are grouped by product, so every product document is read once
+(one get_all inside the transaction) and written once, however many lines
+touch it. `extra(tx)` runs inside the same transaction after the stock
+reads; it may read with tx and returns the other writes as
+("set" | "merge" | "update", ref, data). Either everything is written or
+nothing is.
+
+Shortfalls are checked for every line before anything is written and
+raised together as InsufficientStock. Commits that lose a race with
+another writer are retried with exponential backoff. A timeout or outage
+is raised as CommitUnknown and never retried: the commit may still have
+landed, and running it again would apply the moves (and any Increment in
+`extra`) twice.
+
+A transaction holds at most MAX_TX_WRITES writes, so more than
+MAX_TX_PRODUCTS products are applied in consecutive transactions, `extra`
+going with the last one. If a later transaction fails, the earlier ones
+are reversed; moves that could not be reversed are raised as
+RollbackFailed, so the caller can name the stock that needs correcting.
+"""
+
+import random
+import time
+
+from firebase_admin import firestore
+from google.api_core import exceptions as api_exceptions
+
+from firebase.config import db
+from firebase.local_mirror import stamped
+from firebase.product_index import product_index
+
+MAX_TX_WRITES = 500                  # Firestore limit per transaction / batch
+MAX_TX_PRODUCTS = MAX_TX_WRITES - 50  # leaves room for the extra writes
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.2               # seconds, doubled on every retry
+
+# Lost a race, so nothing was written: safe to run the whole transaction again.
+# Not DeadlineExceeded / ServiceUnavailable, which can follow a commit that succeeded.
+_RETRYABLE = (api_exceptions.Aborted, api_exceptions.Conflict)
+# The commit may or may not have been applied
+_AMBIGUOUS = (api_exceptions.DeadlineExceeded, api_exceptions.ServiceUnavailable)
+# ...how the transactional wrapper reports an aborted commit (as ValueError)
+_ABORTED_COMMIT = "Failed to commit transaction"
+
+
+def _retryable(exc):
+    if isinstance(exc, _RETRYABLE):
+        return True
+    return isinstance(exc, ValueError) and str(exc).startswith(_ABORTED_COMMIT)
+
+
+class InsufficientStock(RuntimeError):
+    """One or more lines would take a stock cell below zero."""
+
+    def __init__(self, shortages):
+        self.shortages = list(shortages)
+        super().__init__("Insufficient stock:\n- " + "\n- ".join(self.shortages))
+
+
+class ProductNotFound(RuntimeError):
+    pass
+
+
+class CommitUnknown(RuntimeError):
+    """A commit timed out or lost the service: its writes may or may not have landed."""
+
+    def __init__(self, codes, cause):
+        self.codes = list(codes)
+        self.cause = cause
+        super().__init__(f"Commit outcome unknown for {', '.join(self.codes)}: {cause}")
+
+
+class RollbackFailed(RuntimeError):
+    """A later transaction failed and some earlier stock changes could not be reversed."""
+
+    def __init__(self, stranded, cause):
+        self.stranded = list(stranded)      # [(item_code, branch, color, condition, delta)] still applied
+        self.cause = cause
+        super().__init__(f"{cause}\nNot reversed:\n- " + "\n- ".join(describe_moves(self.stranded)))
+
+
+def describe_moves(moves):
+    """One line per move: 'PRD-001 [Lahore/No Color/New] -5'."""
+    return [f"{code} [{branch}/{color}/{condition}] {delta:+g}" for code, branch, color, condition, delta in moves]
+
+
+def _qty(value):
+    """Stock values stay whole numbers in Firestore unless a line really is fractional."""
+    value = round(float(value), 9)
+    return int(value) if value.is_integer() else value
+
+
+def _group(moves):
+    """{item_code: {(branch, color, condition): delta}}, dropping zero deltas."""
+    grouped = {}
+    for code, branch, color, condition, delta in moves:
+        code = str(code or "").strip()
+        delta = float(delta)
+        if not code or abs(delta) < 1e-9:
+            continue
+        cells = grouped.setdefault(code, {})
+        key = (str(branch), str(color), str(condition))
+        cells[key] = cells.get(key, 0) + delta
+    return grouped
+
+
+def _run(grouped, extra, allow_negative):
+    """One transaction over `grouped` products plus extra(tx)."""
+    transaction = db.transaction(max_attempts=1)
+
+    @firestore.transactional
+    def _do(tx):
+        snaps = product_index().fetch(grouped, transaction=tx)
+        missing = [code for code in grouped if code not in snaps]
+        if missing:
+            raise ProductNotFound("Product not found for code " + ", ".join(missing))
+
+        shortages, writes = [], []
+        for code, cells in grouped.items():
+            snap = snaps[code]
+            qty_map = (snap.to_dict() or {}).get("qty") or {}
+            update = {}
+            for (branch, color, condition), delta in cells.items():
+                curr = float(((qty_map.get(branch) or {}).get(color) or {}).get(condition) or 0)
+                new = curr + delta
+                if new < -1e-9 and delta < 0 and not allow_negative:
+                    shortages.append(f"{code} [{branch}/{color}/{condition}] (have {curr:g}, need {-delta:g})")
+                update.setdefault(branch, {}).setdefault(color, {})[condition] = _qty(new)
+            # nested maps merge, so only the touched qty cells change
+            writes.append(("merge", snap.reference, stamped({"qty": update})))
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        if extra is not None:
+            writes.extend(extra(tx))
+        for op, ref, data in writes:
+            if op == "update":
+                tx.update(ref, data)
+            else:
+                tx.set(ref, data, merge=(op == "merge"))
+
+    _do(transaction)
+
+
+def _run_with_retry(grouped, extra, allow_negative):
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return _run(grouped, extra, allow_negative)
+        except Exception as e:
+            if isinstance(e, _AMBIGUOUS):
+                raise CommitUnknown(grouped, e) from e
+            if not _retryable(e) or attempt == RETRY_ATTEMPTS - 1:
+                raise
+            delay = RETRY_BASE_DELAY * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+
+
+def apply_inventory_moves(moves, extra=None, allow_negative=False):
+    """
+    Apply [(item_code, branch, color, condition, delta)] atomically, with
+    the writes returned by extra(tx). Deltas may be fractional, as chalan
+    quantities are. Raises InsufficientStock (nothing written) if any cell
+    would go negative, unless allow_negative; CommitUnknown if a commit's
+    outcome is unknown; RollbackFailed if a failure left stock changed.
+    """
+    grouped = _group(moves)
+    codes = list(grouped)
+    chunks = [codes[i:i + MAX_TX_PRODUCTS] for i in range(0, len(codes), MAX_TX_PRODUCTS)] or [[]]
+
+    done = []
+    try:
+        for n, chunk in enumerate(chunks):
+            part = {code: grouped[code] for code in chunk}
+            _run_with_retry(part, extra if n == len(chunks) - 1 else None, allow_negative)
+            done.append(part)
+    except Exception as e:
+        # only reachable with more than MAX_TX_PRODUCTS products: undo the committed chunks
+        stranded = []
+        for part in reversed(done):
+            reverse = {code: {key: -delta for key, delta in cells.items()} for code, cells in part.items()}
+            try:
+                _run_with_retry(reverse, None, allow_negative=True)
+            except Exception:
+                stranded.extend((code, *key, delta) for code, cells in part.items() for key, delta in cells.items())
+        if stranded:
+            raise RollbackFailed(stranded, e) from e
+        raise
@@ -0,0 +1,312 @@
+# firebase/local_mirror.py
+"""
+Local SQLite mirror of the collections the app lists most: products,
+accounts, parties, journal_entries and invoices (plus the two small product
+category collections).
+
+    mirror = local_mirror()
+    mirror.sync("journal_entries")          # pull only what changed
+    mirror.rows("journal_entries", order_by="created_at", descending=True)
+    mirror.rows("products", sub_id=sub_id)  # indexed local query
+    mirror.get("parties", doc_id)
+
+Every write to a mirrored collection stamps "updated_at" (stamped(data)).
+sync() reads only documents whose updated_at is newer than the collection's
+stored watermark, minus a short overlap for commits that landed out of
+order, and upserts them. Deletes are hard deletes, which no updated_at
+query can see, so every delta sync is followed by an id-only read of the
+collection (select([]), no field data): rows whose document is gone are
+dropped, and documents the deltas never returned (written without the
+stamp) are fetched. A full re-read runs on the first sync and then once a
+day, which also refreshes unstamped updates to documents already mirrored.
+The category collections are a few dozen documents and always read in
+full.
+
+Rows keep the whole document as JSON (timestamps and document references
+round-trip), with the fields listed in MIRRORED copied into indexed columns.
+Nothing here needs the network to read: a cold start or offline mode
+serves straight from disk.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+
+from firebase.config import db
+from utils.paths import app_cache_dir
+
+# collection -> (indexed fields, synced by updated_at)
+MIRRORED = {
+    "products": (("item_code", "sub_id"), True),
+    "accounts": (("slug", "type", "parent"), True),
+    "parties": (("coa_account_id", "type"), True),
+    "journal_entries": (("created_at",), True),
+    "invoices": (("invoice_no", "created_at"), True),
+    "product_main_categories": (("name",), False),
+    "product_sub_categories": (("main_id", "name"), False),
+}
+
+SYNC_OVERLAP = timedelta(minutes=2)   # re-read this much before the watermark
+FULL_RESYNC_AGE = 24 * 3600.0         # seconds between full re-reads
+
+
+def stamped(data):
+    """`data` plus the updated_at field the mirror syncs by (server time)."""
+    data = dict(data)
+    data["updated_at"] = firestore.SERVER_TIMESTAMP
+    return data
+
+
+# ---------- Firestore values <-> JSON ----------
+def _encode(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"__ts__": value.isoformat()}
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    if hasattr(value, "path") and hasattr(value, "collection"):     # DocumentReference
+        return {"__ref__": value.path}
+    if hasattr(value, "latitude") and hasattr(value, "longitude"):  # GeoPoint
+        return {"__geo__": [value.latitude, value.longitude]}
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return value
+
+
+def _decode_hook(obj):
+    if "__ts__" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["__ts__"])
+    if "__ref__" in obj and len(obj) == 1:
+        return db.document(obj["__ref__"])
+    if "__geo__" in obj and len(obj) == 1:
+        return firestore.GeoPoint(*obj["__geo__"])
+    return obj
+
+
+def _column(value):
+    """Indexed column value: scalars as-is, timestamps as sortable UTC text."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+class LocalMirror:
+    def __init__(self, path=None, client=None):
+        self.path = path or os.path.join(app_cache_dir(), "mirror.sqlite3")
+        self._client = client
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._connection() as con:
+            con.execute("CREATE TABLE IF NOT EXISTS sync_state ("
+                        "collection TEXT PRIMARY KEY, watermark TEXT, full_at REAL)")
+            for collection, (fields, _) in MIRRORED.items():
+                cols = "".join(f", k_{f}" for f in fields)
+                con.execute(f'CREATE TABLE IF NOT EXISTS "{collection}" '
+                            f"(id TEXT PRIMARY KEY, updated_at TEXT, data TEXT{cols})")
+                for f in fields:
+                    con.execute(f'CREATE INDEX IF NOT EXISTS "{collection}_{f}" ON "{collection}" (k_{f})')
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else db
+
+    @contextmanager
+    def _connection(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=10)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        with con:
+            yield con
+
+    # ---------- sync ----------
+    def _state(self, collection):
+        with self._connection() as con:
+            row = con.execute("SELECT watermark, full_at FROM sync_state WHERE collection = ?",
+                              (collection,)).fetchone()
+        return row if row else (None, None)
+
+    def synced(self, collection):
+        """True once the collection has been read at least once (usable offline)."""
+        return self._state(collection)[1] is not None
+
+    def sync(self, collection, full=False):
+        """Pull what changed since the last sync into the mirror; returns (ids read, ids removed)."""
+        delta = MIRRORED[collection][1]
+        watermark, full_at = self._state(collection)
+        full = (full or not delta or not watermark
+                or time.time() - (full_at or 0) > FULL_RESYNC_AGE)
+
+        started = datetime.now(timezone.utc)
+        ref = self.client.collection(collection)
+        if full:
+            snaps = ref.stream()
+        else:
+            snaps = ref.where("updated_at", ">", datetime.fromisoformat(watermark) - SYNC_OVERLAP).stream()
+        docs = {snap.id: snap.to_dict() or {} for snap in snaps}
+        removed = self._store(collection, docs, full, started)
+        if full:
+            return list(docs), removed
+        fetched, removed = self._reconcile(collection, started)
+        return list(docs) + fetched, removed
+
+    def _reconcile(self, collection, started):
+        """
+        Match the mirror's ids to the collection's, read ids-only: fetch the
+        documents it lacks, drop the rows whose document was deleted.
+        Returns (ids fetched, ids removed). A row stamped after `started`
+        (less the overlap) stays, since the id read may have missed it.
+        """
+        ref = self.client.collection(collection)
+        remote = {snap.id for snap in ref.select([]).stream()}
+        with self._connection() as con:
+            local = dict(con.execute(f'SELECT id, updated_at FROM "{collection}"').fetchall())
+
+        missing = [i for i in remote if i not in local]
+        docs = {}
+        if missing:
+            for snap in self.client.get_all([ref.document(i) for i in missing]):
+                if snap.exists:
+                    docs[snap.id] = snap.to_dict() or {}
+        cutoff = _column(started - SYNC_OVERLAP)
+        gone = [i for i, stamp in local.items() if i not in remote and (stamp is None or stamp < cutoff)]
+        if docs or gone:
+            with self._write_lock, self._connection() as con:
+                self._upsert(con, collection, docs)
+                self._remove(con, collection, gone)
+        return list(docs), gone
+
+    def replace(self, collection, docs):
+        """Store a full read of the collection made elsewhere ({doc_id: data}, e.g. a listener's first snapshot)."""
+        self._store(collection, docs, True, datetime.now(timezone.utc))
+
+    def _store(self, collection, docs, full, started):
+        """Upsert `docs` (a full read replaces the table); returns the ids a full read removed."""
+        newest = max((_column(d["updated_at"]) for d in docs.values()
+                      if isinstance(d.get("updated_at"), datetime)), default=None)
+        if full and newest is None:
+            # nothing stamped yet: start the deltas from now
+            newest = _column(started)
+        removed = []
+        with self._write_lock, self._connection() as con:
+            if full:
+                removed = [i for (i,) in con.execute(f'SELECT id FROM "{collection}"') if i not in docs]
+                con.execute(f'DELETE FROM "{collection}"')
+            self._upsert(con, collection, docs)
+            con.execute(
+                "INSERT INTO sync_state (collection, watermark, full_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(collection) DO UPDATE SET "
+                "watermark = max(coalesce(watermark, ''), coalesce(excluded.watermark, '')), "
+                "full_at = coalesce(excluded.full_at, full_at)",
+                (collection, newest, time.time() if full else None),
+            )
+        return removed
+
+    def pull(self, collection):
+        """
+        sync(), falling back to the local copy when offline (returns None
+        then). Raises only if there is no local copy yet.
+        """
+        try:
+            return self.sync(collection)
+        except Exception:
+            if not self.synced(collection):
+                raise
+            return None
+
+    def watermark(self, collection):
+        """Newest updated_at already mirrored (datetime), or None."""
+        watermark = self._state(collection)[0]
+        return datetime.fromisoformat(watermark) if watermark else None
+
+    def _upsert(self, con, collection, docs):
+        """Store {doc_id: data}."""
+        fields = MIRRORED[collection][0]
+        cols = "".join(f", k_{f}" for f in fields)
+        marks = ", ?" * len(fields)
+        con.executemany(
+            f'INSERT OR REPLACE INTO "{collection}" (id, updated_at, data{cols}) VALUES (?, ?, ?{marks})',
+            [
+                (doc_id, _column(data.get("updated_at")), json.dumps(_encode(data), ensure_ascii=False),
+                 *(_column(data.get(f)) for f in fields))
+                for doc_id, data in docs.items()
+            ],
+        )
+
+    @staticmethod
+    def _remove(con, collection, ids):
+        con.executemany(f'DELETE FROM "{collection}" WHERE id = ?', [(i,) for i in ids])
+
+    # ---------- local writes (listener deltas, this app's deletes) ----------
+    def put(self, collection, docs):
+        """Store {doc_id: data} already read elsewhere (e.g. by a realtime listener)."""
+        if docs:
+            with self._write_lock, self._connection() as con:
+                self._upsert(con, collection, docs)
+
+    def delete(self, collection, ids):
+        if ids:
+            with self._write_lock, self._connection() as con:
+                self._remove(con, collection, ids)
+
+    # ---------- reads ----------
+    def get(self, collection, doc_id):
+        with self._connection() as con:
+            row = con.execute(f'SELECT data FROM "{collection}" WHERE id = ?', (doc_id,)).fetchone()
+        return json.loads(row[0], object_hook=_decode_hook) if row else None
+
+    def rows(self, collection, order_by=None, descending=False, limit=None, **where):
+        """[(doc_id, data)] filtered by indexed fields (field=value, or field=[values])."""
+        fields = MIRRORED[collection][0]
+        sql = f'SELECT id, data FROM "{collection}"'
+        clauses, params = [], []
+        for field, value in where.items():
+            if field not in fields:
+                raise ValueError(f"{collection}.{field} is not indexed")
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                if not value:
+                    return []
+                clauses.append(f"k_{field} IN ({', '.join('?' * len(value))})")
+                params.extend(_column(v) for v in value)
+            else:
+                clauses.append(f"k_{field} = ?")
+                params.append(_column(value))
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            if order_by not in fields:
+                raise ValueError(f"{collection}.{order_by} is not indexed")
+            sql += f" ORDER BY k_{order_by} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connection() as con:
+            found = con.execute(sql, params).fetchall()
+        return [(doc_id, json.loads(data, object_hook=_decode_hook)) for doc_id, data in found]
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def local_mirror():
+    """The mirror shared by every window of this app."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = LocalMirror()
+        return _mirror
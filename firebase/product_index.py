@@ -0,0 +1,147 @@
+# firebase/product_index.py
+"""
+item_code -> product document id, so screens that work by code (chalans,
+powder coating, stock adjustment, product search) stop running one
+where("item_code", "==", code) query per line.
+
+    index = product_index()
+    index.lookup(code)                 # doc id or None, never touches the network
+    index.fetch(codes)                 # {code: DocumentSnapshot}, one get_all round trip
+    index.fetch(codes, transaction=tx) # same, read inside a transaction
+
+Codes are looked up in the session catalog, then in this index, then in
+the local mirror's indexed item_code column (which persists them across
+runs). Only codes found in none of those are queried, up to
+IN_QUERY_LIMIT codes per "in" query, and the documents read are kept in
+the mirror. fetch() checks every snapshot still carries its code; a
+stale id (product deleted or re-coded) is dropped and queried again.
+"""
+
+import threading
+
+from firebase.config import db
+from firebase.catalog import catalog_store
+from firebase.local_mirror import local_mirror
+
+IN_QUERY_LIMIT = 30      # values per Firestore "in" filter
+
+
+def _norm(code):
+    return str(code or "").strip()
+
+
+class ProductIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}               # item_code -> doc_id
+
+    def lookup(self, code):
+        """Doc id for `code` from memory or disk, or None."""
+        code = _norm(code)
+        if not code:
+            return None
+        doc_id, _ = catalog_store().by_item_code(code)
+        if doc_id:
+            return doc_id
+        with self._lock:
+            doc_id = self._ids.get(code)
+        if doc_id:
+            return doc_id
+        try:
+            found = local_mirror().rows("products", item_code=code, limit=1)
+        except Exception:
+            found = []
+        if found:
+            self.remember(code, found[0][0])
+            return found[0][0]
+        return None
+
+    def remember(self, code, doc_id):
+        with self._lock:
+            self._ids[_norm(code)] = doc_id
+
+    def forget(self, code):
+        with self._lock:
+            self._ids.pop(_norm(code), None)
+
+    def _query(self, codes):
+        """Resolve codes on Firestore, IN_QUERY_LIMIT at a time; returns {code: doc_id}."""
+        found, docs = {}, {}
+        codes = list(codes)
+        for i in range(0, len(codes), IN_QUERY_LIMIT):
+            chunk = codes[i:i + IN_QUERY_LIMIT]
+            for snap in db.collection("products").where("item_code", "in", chunk).get():
+                data = snap.to_dict() or {}
+                code = _norm(data.get("item_code"))
+                if code in chunk and code not in found:
+                    found[code] = snap.id
+                    docs[snap.id] = data
+        for code, doc_id in found.items():
+            self.remember(code, doc_id)
+        try:
+            local_mirror().put("products", docs)
+        except Exception:
+            pass
+        return found
+
+    def resolve(self, codes):
+        """{code: doc_id} for every code that exists; unknown codes cost one batched query."""
+        ids, missing = {}, []
+        for code in dict.fromkeys(_norm(c) for c in codes):
+            if not code:
+                continue
+            doc_id = self.lookup(code)
+            if doc_id:
+                ids[code] = doc_id
+            else:
+                missing.append(code)
+        if missing:
+            ids.update(self._query(missing))
+        return ids
+
+    def _refs(self, codes):
+        """{code: DocumentReference} as indexed; unverified, see fetch()."""
+        products = db.collection("products")
+        return {code: products.document(doc_id) for code, doc_id in self.resolve(codes).items()}
+
+    def fetch(self, codes, transaction=None):
+        """{code: DocumentSnapshot} for every code that exists, read with one get_all."""
+        snaps, stale = self._get_all(self._refs(codes), transaction)
+        if stale:
+            for code in stale:
+                self.forget(code)
+            products = db.collection("products")
+            again = {code: products.document(doc_id) for code, doc_id in self._query(stale).items()}
+            snaps.update(self._get_all(again, transaction)[0])
+        return snaps
+
+    @staticmethod
+    def _get_all(refs, transaction=None):
+        """({code: snapshot}, [stale codes]) for {code: ref}."""
+        if not refs:
+            return {}, []
+        code_of = {ref.id: code for code, ref in refs.items()}
+        reader = transaction if transaction is not None else db
+        snaps, stale = {}, []
+        for snap in reader.get_all(list(refs.values())):
+            code = code_of.get(snap.id)
+            if code is None:
+                continue
+            if snap.exists and _norm((snap.to_dict() or {}).get("item_code")) == code:
+                snaps[code] = snap
+            else:
+                stale.append(code)
+        return snaps, stale
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def product_index():
+    """The item_code index shared by every window of this app."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProductIndex()
+        return _index
@@ -12,6 +12,7 @@ Requires: from firebase.config import db
 """
 
 from firebase.config import db  # your existing Firestore db instance
+from firebase.local_mirror import stamped
 from typing import Tuple
 
 # Legacy gauge-number → mm mapping (as used in your app)
@@ -121,7 +122,7 @@ def convert_range(start_code: str, end_code: str):
             continue
 
         # Update to mm (float), keep field name 'gauge'
-        db.collection("products").document(snap.id).update({"gauge": float(mm)})
+        db.collection("products").document(snap.id).update(stamped({"gauge": float(mm)}))
         updated += 1
         touched_ids.append(snap.id)
         print(f"+ {item_code}: {g_raw} → {mm} mm (updated)")
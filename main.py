@@ -1,9 +1,12 @@
 import sys
+import multiprocessing
 from PyQt5.QtCore import Qt, QCoreApplication
 from PyQt5.QtWidgets import QApplication
 from ui.bootstrap import AppBootstrap
 
 if __name__ == "__main__":
+    # Needed by the nesting portfolio's process pool in the frozen build
+    multiprocessing.freeze_support()
     QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     bootstrap = AppBootstrap(app)
@@ -2,6 +2,7 @@
 # Run with your Firebase Admin SDK env (same as firebase.config)
 
 from firebase.config import db
+from firebase.local_mirror import stamped
 
 def fetch_admin_branches():
     """
@@ -70,7 +71,7 @@ def backfill_all_products_qty_using_admin_branches():
             qty[branch] = branch_map
 
         if changed:
-            batch.update(db.collection("products").document(doc.id), {"qty": qty})
+            batch.update(db.collection("products").document(doc.id), stamped({"qty": qty}))
             ops += 1
             updated_docs += 1
 
@@ -20,6 +20,8 @@ from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 
 from firebase.config import db
+from firebase.local_mirror import local_mirror, stamped
+from firebase.catalog import discard, documents
 from firebase_admin import firestore
 
 import datetime
@@ -27,7 +29,6 @@ import re
 import uuid
 import csv
 import os
-import json  # <-- offline cache
 
 
 # ------------------------------------------------
@@ -201,7 +202,7 @@ def _post_opening_balance_je(db_ref, user_data: dict, account_id: str, account_n
             "current_balance": 0.0
         }
         doc_ref = db_ref.collection("accounts").document()
-        doc_ref.set(equity_account)
+        doc_ref.set(stamped(equity_account))
         equity_account_id = doc_ref.id
         equity_account_name = "System Offset Account"
 
@@ -240,12 +241,52 @@ def _post_opening_balance_je(db_ref, user_data: dict, account_id: str, account_n
         "lines_account_ids": [debit_line["account_id"], credit_line["account_id"]],
         "meta": {"kind": "opening_balance"}
     }
-    db_ref.collection("journal_entries").document().set(je_data)
+    db_ref.collection("journal_entries").document().set(stamped(je_data))
 
 
 # ------------------------------------------------
 # Background workers
 # ------------------------------------------------
+def _in_branches(account_docs, branches):
+    """(id, data) pairs of accounts shared with any of `branches` (all when none given)."""
+    wanted = set(branches or [])
+    return [
+        (acc_id, data) for acc_id, data in account_docs
+        if not wanted or wanted.intersection((data or {}).get("branch") or [])
+    ]
+
+
+def _account_rows(account_docs):
+    """(rows, parent_map, active_count, inactive_count) for the tree, from (id, data) pairs."""
+    rows = []
+    parent_map = {}
+    active_count = 0
+    inactive_count = 0
+
+    for acc_id, data in account_docs:
+        data = data or {}
+
+        if "current_balance" in data:
+            base_balance = float(data.get("current_balance", 0.0) or 0.0)
+        else:
+            opening = data.get("opening_balance") or {}
+            opening_amount = float(opening.get("amount", 0.0) or 0.0)
+            opening_type = (opening.get("type", "debit") or "debit").lower()
+            if data.get("type") in ("Asset", "Expense"):
+                base_balance = opening_amount if opening_type == "debit" else -opening_amount
+            else:
+                base_balance = -opening_amount if opening_type == "debit" else opening_amount
+
+        rows.append((acc_id, data, base_balance))
+        parent_map[acc_id] = data.get("parent")
+        if data.get("active", True):
+            active_count += 1
+        else:
+            inactive_count += 1
+
+    return rows, parent_map, active_count, inactive_count
+
+
 class AccountsLoader(QThread):
     loaded = pyqtSignal(list, dict, int, int)  # rows, parent_map, active_cnt, inactive_cnt
     failed = pyqtSignal(str)
@@ -259,47 +300,19 @@ class AccountsLoader(QThread):
 
     def run(self):
         try:
-            fields = ["name", "code", "type", "branch", "active", "is_posting",
-                      "parent", "current_balance", "opening_balance"]
-            
             # Only load accounts for the user's branch(es)
-            if self.branches:
-                q = db.collection("accounts") \
-                      .where("branch", "array_contains_any", self.branches) \
-                      .select(fields)
-                account_docs = q.get()
+            live = documents("accounts")
+            if live.live:
+                # Kept current by the realtime listener: no Firestore reads
+                account_docs = live.items()
             else:
-                # Fallback (should not happen if every user has at least one branch)
-                account_docs = db.collection("accounts").select(fields).get()
-
-            rows = []
-            parent_map = {}
-            active_count = 0
-            inactive_count = 0
+                # Local mirror: reads only the accounts changed since the last sync
+                mirror = local_mirror()
+                mirror.pull("accounts")
+                account_docs = mirror.rows("accounts")
+            account_docs = _in_branches(account_docs, self.branches)
 
-            for doc in account_docs:
-                data = doc.to_dict() or {}
-                acc_id = doc.id
-
-                if "current_balance" in data:
-                    base_balance = float(data.get("current_balance", 0.0) or 0.0)
-                else:
-                    opening = data.get("opening_balance") or {}
-                    opening_amount = float(opening.get("amount", 0.0) or 0.0)
-                    opening_type = (opening.get("type", "debit") or "debit").lower()
-                    if data.get("type") in ("Asset", "Expense"):
-                        base_balance = opening_amount if opening_type == "debit" else -opening_amount
-                    else:
-                        base_balance = -opening_amount if opening_type == "debit" else opening_amount
-
-                rows.append((acc_id, data, base_balance))
-                parent_map[acc_id] = data.get("parent")
-                if data.get("active", True):
-                    active_count += 1
-                else:
-                    inactive_count += 1
-
-            self.loaded.emit(rows, parent_map, active_count, inactive_count)
+            self.loaded.emit(*_account_rows(account_docs))
         except Exception as e:
             self.failed.emit(str(e))
 
@@ -337,9 +350,9 @@ class _SaveAccountWorker(QThread):
                     return
 
             if is_new:
-                doc_ref.set(doc)
+                doc_ref.set(stamped(doc))
             else:
-                doc_ref.update(doc)
+                doc_ref.update(stamped(doc))
 
             if is_new:
                 if opening["has"]:
@@ -353,9 +366,9 @@ class _SaveAccountWorker(QThread):
                         acc_type=acc_type,
                         description=f"Opening balance for {name}"
                     )
-                    doc_ref.update({"current_balance": _signed_opening(acc_type, opening["amount"], opening["type"])})
+                    doc_ref.update(stamped({"current_balance": _signed_opening(acc_type, opening["amount"], opening["type"])}))
                 else:
-                    doc_ref.update({"current_balance": 0.0})
+                    doc_ref.update(stamped({"current_balance": 0.0}))
             else:
                 delta = new_signed - prev_signed
                 if abs(delta) > tol:
@@ -371,7 +384,7 @@ class _SaveAccountWorker(QThread):
                         acc_type=acc_type,
                         description=f"Opening balance adjustment Δ={delta:+,.2f}"
                     )
-                    doc_ref.update({"current_balance": firestore.Increment(delta)})
+                    doc_ref.update(stamped({"current_balance": firestore.Increment(delta)}))
 
             self.ok.emit({"id": doc_id})
         except Exception as e:
@@ -679,64 +692,25 @@ class ChartOfAccounts(QWidget):
         self.refresh()
 
     # ---------- OFFLINE CACHE HELPERS ----------
-    def _app_dir(self) -> str:
-        base = os.environ.get("APPDATA") if os.name == "nt" else os.path.join(os.path.expanduser("~"), ".config")
-        root = os.path.join(base, "PlayWithAayan-ERP_Software", "cache")
-        os.makedirs(root, exist_ok=True)
-        return root
-
-    def _cache_file(self) -> str:
-        return os.path.join(self._app_dir(), "coa_snapshot.json")
-
-    def _save_cache(self, rows, parent_map, active_count, inactive_count):
-        try:
-            serial_rows = [
-                {"id": rid, "data": data, "base_balance": base}
-                for (rid, data, base) in rows
-            ]
-            payload = {
-                "rows": serial_rows,
-                "parent_map": parent_map,
-                "active_count": active_count,
-                "inactive_count": inactive_count
-            }
-            tmp = self._cache_file() + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False)
-            os.replace(tmp, self._cache_file())
-        except Exception:
-            pass
-
     def _load_cache(self):
+        """Tree rows for the user's branch(es) from the local mirror, or None before its first sync."""
         try:
-            if os.path.exists(self._cache_file()):
-                with open(self._cache_file(), "r", encoding="utf-8") as f:
-                    return json.load(f)
+            mirror = local_mirror()
+            if not mirror.synced("accounts"):
+                return None
+            user_branches = self.user_data.get("branch", [])
+            if isinstance(user_branches, str):
+                user_branches = [user_branches]
+            return _account_rows(_in_branches(mirror.rows("accounts"), user_branches))
         except Exception:
-            pass
-        return None
+            return None
 
     def _render_from_cache_if_any(self):
         cached = self._load_cache()
         if not cached:
             return
 
-        rows = [(r["id"], r["data"], r.get("base_balance", 0.0)) for r in cached.get("rows", [])]
-        parent_map = cached.get("parent_map", {})
-        active_count = cached.get("active_count", 0)
-        inactive_count = cached.get("inactive_count", 0)
-
-        # Filter cached rows by current user's branch(es) to avoid showing other branches from an older snapshot
-        user_branches = self.user_data.get("branch", [])
-        if isinstance(user_branches, str):
-            user_branches = [user_branches]
-        if user_branches:
-            ub = set(user_branches)
-            def _has_overlap(acc_branches):
-                return bool(ub & set(acc_branches or []))
-            rows = [(rid, data, base) for (rid, data, base) in rows if _has_overlap(data.get("branch", []))]
-
-        self._on_loaded_accounts(rows, parent_map, active_count, inactive_count)
+        self._on_loaded_accounts(*cached)
         if self._offline_read_only:
             self._set_offline_badge(True)
 
@@ -988,11 +962,7 @@ class ChartOfAccounts(QWidget):
         if cached:
             self._set_offline_badge(True)
             self._apply_offline_lock(True)
-            rows = [(r["id"], r["data"], r.get("base_balance", 0.0)) for r in cached.get("rows", [])]
-            parent_map = cached.get("parent_map", {})
-            active_count = cached.get("active_count", 0)
-            inactive_count = cached.get("inactive_count", 0)
-            self._on_loaded_accounts(rows, parent_map, active_count, inactive_count)
+            self._on_loaded_accounts(*cached)
         else:
             QMessageBox.critical(self, "Load Error", msg)
 
@@ -1076,7 +1046,6 @@ class ChartOfAccounts(QWidget):
             if not self._offline_read_only:
                 self._set_offline_badge(False)
                 self._apply_offline_lock(False)
-                self._save_cache(rows, parent_map, active_count, inactive_count)
             else:
                 self._apply_offline_lock(True)
 
@@ -1244,6 +1213,7 @@ class ChartOfAccounts(QWidget):
         if confirm == QMessageBox.Yes:
             try:
                 db.collection("accounts").document(acc["id"]).delete()
+                discard("accounts", [acc["id"]])
                 self.refresh()
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
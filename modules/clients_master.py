@@ -14,11 +14,12 @@ from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtGui import QKeySequence, QColor, QBrush
 
 from firebase.config import db
+from firebase.catalog import documents
+from firebase.local_mirror import local_mirror, stamped
+from ui.live_sync import live_sync
 from firebase_admin import firestore
 
 import uuid, datetime, re, os, csv, tempfile
-# <<< fastness: tiny stdlib add for cache >>>
-import json
 
 # -----------------------------
 # Styling (UNCHANGED)
@@ -70,50 +71,35 @@ def _is_admin_user(user_data) -> bool:
         return False
 
 # =============================
-# <<< fastness: cache + batching helpers (NEW) >>>
+# <<< fastness: local rows (NEW) >>>
 # =============================
-def _app_cache_dir() -> str:
-    base = os.environ.get("APPDATA") if os.name == "nt" else os.path.join(os.path.expanduser("~"), ".config")
-    root = os.path.join(base, "PlayWithAayan-ERP_Software", "cache")
-    os.makedirs(root, exist_ok=True)
-    return root
-
-def _save_cache_json(filename: str, payload: dict):
-    try:
-        path = os.path.join(_app_cache_dir(), filename)
-        tmp = path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(payload, f)
-        os.replace(tmp, path)
-    except Exception:
-        pass
+def _party_rows(parties, get_account):
+    """Rows ready to paint (with _doc_id and _balance) from (doc_id, data) parties."""
+    rows = []
+    for doc_id, d in parties:
+        d = dict(d)
+        d["_doc_id"] = doc_id
+        acc = get_account(d["coa_account_id"]) if d.get("coa_account_id") else None
+        try:
+            d["_balance"] = float(acc.get("current_balance", 0.0) or 0.0) if acc is not None else None
+        except Exception:
+            d["_balance"] = 0.0
+        rows.append(d)
+    return rows
+
+def _party_rows_from_live():
+    """Rows from the realtime party/account stores, or None while their listeners haven't synced."""
+    parties, accounts = documents("parties"), documents("accounts")
+    if not (parties.live and accounts.live):
+        return None
+    return _party_rows(parties.items(), accounts.get)
 
-def _load_cache_json(filename: str) -> dict:
-    try:
-        path = os.path.join(_app_cache_dir(), filename)
-        if os.path.isfile(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except Exception:
-        pass
-    return {}
-
-def _batch_get_accounts_current_balances(account_ids: set) -> dict:
-    if not account_ids:
-        return {}
-    refs = [db.collection("accounts").document(aid) for aid in account_ids if aid]
-    balances = {}
-    try:
-        for snap in firestore.client().get_all(refs):
-            if snap and getattr(snap, "exists", False):
-                d = snap.to_dict() or {}
-                try:
-                    balances[snap.id] = float(d.get("current_balance", 0.0) or 0.0)
-                except Exception:
-                    balances[snap.id] = 0.0
-    except Exception:
-        pass
-    return balances
+def _party_rows_from_mirror():
+    """Rows from the local mirror as last synced (no network), or None if it has none yet."""
+    mirror = local_mirror()
+    if not mirror.synced("parties"):
+        return None
+    return _party_rows(mirror.rows("parties"), lambda acc_id: mirror.get("accounts", acc_id))
 
 # <<< fastness: background loader (NEW) >>>
 class _PartiesLoader(QThread):
@@ -122,27 +108,13 @@ class _PartiesLoader(QThread):
 
     def run(self):
         try:
-            rows = []
-            account_ids = set()
-            try:
-                stream = db.collection("parties").select(
-                    ["id","name","type","contact_person","phone","branches","active","coa_account_id"]
-                ).stream()
-            except Exception:
-                stream = db.collection("parties").stream()
-
-            for doc in stream:
-                d = doc.to_dict() or {}
-                d["_doc_id"] = doc.id
-                coa = d.get("coa_account_id")
-                if coa:
-                    account_ids.add(coa)
-                rows.append(d)
-
-            bal = _batch_get_accounts_current_balances(account_ids)
-            for r in rows:
-                r["_balance"] = bal.get(r.get("coa_account_id",""), None)
-            self.loaded.emit(rows)
+            rows = _party_rows_from_live()
+            if rows is None:
+                # only what changed since the last sync is read
+                local_mirror().pull("parties")
+                local_mirror().pull("accounts")
+                rows = _party_rows_from_mirror()
+            self.loaded.emit(rows or [])
         except Exception as e:
             self.failed.emit(str(e))
 
@@ -157,6 +129,8 @@ class PartyModule(QWidget):
         self.setStyleSheet(APP_STYLE)
         self._build_ui()
         QTimer.singleShot(0, self.load_parties)
+        live_sync().parties_changed.connect(self._on_live_changed)
+        live_sync().accounts_changed.connect(self._on_live_changed)
 
     # ---------- UI (UNCHANGED) ----------
     def _build_ui(self):
@@ -247,9 +221,12 @@ class PartyModule(QWidget):
     # ---------- Data load (FASTNESS APPLIED, UI/logic preserved) ----------
     def load_parties(self):
         # <<< fastness: cache-first paint (non-blocking) >>>
-        snap = _load_cache_json("parties_snapshot.json")
-        if snap.get("rows"):
-            self._paint_parties(snap["rows"])
+        try:
+            rows = _party_rows_from_mirror()
+        except Exception:
+            rows = None
+        if rows:
+            self._paint_parties(rows)
 
         # <<< fastness: live refresh in background >>>
         self._progress = QProgressDialog("Loading parties…", None, 0, 0, self)
@@ -265,11 +242,21 @@ class PartyModule(QWidget):
         self._loader.failed.connect(self._on_parties_failed)
         self._loader.start()
 
+    def _on_live_changed(self, _ids):
+        # realtime party/balance change: repaint from memory, no progress dialog
+        rows = _party_rows_from_live()
+        if rows is None:
+            return
+        for t in (self.table_customers, self.table_vendors):
+            t.setSortingEnabled(False)
+        self._paint_parties(rows)
+        for t in (self.table_customers, self.table_vendors):
+            t.setSortingEnabled(True)
+
     # <<< fastness: new slots >>> 
     def _on_parties_loaded(self, rows):
         try:
             self._paint_parties(rows)
-            _save_cache_json("parties_snapshot.json", {"rows": rows})
         finally:
             try: self._progress.close()
             except Exception: pass
@@ -485,7 +472,7 @@ class PartyModule(QWidget):
             new_coa_id = dlg.selected_account_id
             if new_coa_id:
                 try:
-                    db.collection("parties").document(doc_id).set({"coa_account_id": new_coa_id}, merge=True)
+                    db.collection("parties").document(doc_id).set(stamped({"coa_account_id": new_coa_id}), merge=True)
                     QMessageBox.information(self, "COA updated", "The COA account was updated successfully.")
                     self.load_parties()
                 except Exception as e:
@@ -863,7 +850,7 @@ class PartyDialog(QDialog):
                     "current_balance": 0.0,
                 }
                 ref = db.collection("accounts").document()
-                ref.set(equity_doc)
+                ref.set(stamped(equity_doc))
                 equity_account_id = ref.id
                 equity_account_name = "System Offset Account"
 
@@ -914,7 +901,7 @@ class PartyDialog(QDialog):
                 "lines_account_ids": [party_line["account_id"], equity_line["account_id"]],
                 "meta": {"kind": "opening_balance", "assume_prev_zero": True},
             }
-            db.collection("journal_entries").document().set(je)
+            db.collection("journal_entries").document().set(stamped(je))
         except Exception as e:
             QMessageBox.critical(self, "Journal Error", f"Failed to post JE: {e}")
 
@@ -936,7 +923,7 @@ class PartyDialog(QDialog):
                 "active": True, "is_posting": False, "current_balance": 0.0
             }
             ref = db.collection("accounts").document()
-            ref.set(parent_doc)
+            ref.set(stamped(parent_doc))
             return ref.id
 
         if isinstance(branches, str) or branches is None:
@@ -976,7 +963,7 @@ class PartyDialog(QDialog):
             "current_balance": computed_balance
         }
         ref = db.collection("accounts").document()
-        ref.set(coa_data)
+        ref.set(stamped(coa_data))
         return ref.id
 
     def _collect_branches_from_ui(self):
@@ -1042,7 +1029,7 @@ class PartyDialog(QDialog):
                     sel = self._selected_coa_id()
                     if sel and sel != AUTO_CREATE_SENTINEL:
                         payload["coa_account_id"] = sel
-                db.collection("parties").document(self.doc_id).set(payload, merge=True)
+                db.collection("parties").document(self.doc_id).set(stamped(payload), merge=True)
                 self.accept()
             else:
                 party_ref = db.collection("parties").document()
@@ -1061,7 +1048,7 @@ class PartyDialog(QDialog):
 
                 if not use_auto_create and selected_existing_id:
                     payload["coa_account_id"] = selected_existing_id
-                    party_ref.set(payload)
+                    party_ref.set(stamped(payload))
                     self.accept()
                 else:
                     coa_id = self._create_coa_account_for_party(
@@ -1071,7 +1058,7 @@ class PartyDialog(QDialog):
                         branches
                     )
                     payload["coa_account_id"] = coa_id
-                    party_ref.set(payload)
+                    party_ref.set(stamped(payload))
                     try:
                         ob_amount = float(self.edt_opening_bal.text() or 0)
                     except Exception:
@@ -20,6 +20,11 @@ import datetime, os, json
 
 # === Use the user's Firestore setup ===
 from firebase.config import db
+from firebase.catalog import catalog_store, STOCK_MAX_AGE
+from firebase.local_mirror import stamped
+from firebase.inventory import (
+    apply_inventory_moves, describe_moves, CommitUnknown, InsufficientStock, RollbackFailed,
+)
 from firebase_admin import firestore
 
 # === PDF generator modules ===
@@ -57,75 +62,6 @@ QTableWidget { gridline-color: #e6e9f2; }
 QHeaderView::section { background: #f7f9fc; padding: 6px; border: none; border-bottom: 1px solid #e6e9f2; }
 """
 
-# ---- Live availability + transactional inventory helpers ----
-def _get_product_ref_by_code(item_code: str):
-    q = db.collection("products").where("item_code", "==", item_code).limit(1).get()
-    if not q:
-        raise RuntimeError(f"Product not found for code {item_code}")
-    return q[0].reference
-
-def _fetch_live_availability_for_keys(keys):
-    """
-    keys: iterable of tuples (item_code, branch, color, condition)
-    returns: {(item_code, branch, color, condition): live_available_float}
-    """
-    live = {}
-    # Minimize reads: one query per unique item_code
-    from collections import defaultdict
-    by_code = defaultdict(list)
-    for code, br, col, cond in keys:
-        by_code[code].append((code, br, col, cond))
-
-    for code, targets in by_code.items():
-        q = db.collection("products").where("item_code", "==", code).limit(1).get()
-        if not q:
-            for tup in targets:
-                live[tup] = 0.0
-            continue
-        d = q[0].to_dict() or {}
-        qty = d.get("qty") or {}
-        for _, br, col, cond in targets:
-            live[(code, br, col, cond)] = float(((qty.get(br) or {}).get(col) or {}).get(cond) or 0.0)
-    return live
-
-def _tx_mutate_qty(item_code: str,
-                   dec_branch: str, color: str, condition: str, dec_qty: float,
-                   inc_branch: str = None, inc_color: str = None, inc_condition: str = None, inc_qty: float = 0.0):
-    """
-    Single Firestore transaction on the product doc:
-      - Decrement dec_branch/color/condition by dec_qty (preventing negatives)
-      - Optionally increment inc_branch/inc_color/inc_condition by inc_qty
-    """
-    ref = _get_product_ref_by_code(item_code)
-    tr = firestore.client().transaction()
-
-    @firestore.transactional
-    def _do(tx):
-        snap = ref.get(transaction=tx)
-        data = snap.to_dict() or {}
-        qty_map = data.get("qty") or {}
-
-        # current values
-        curr_dec = int(((qty_map.get(dec_branch) or {}).get(color) or {}).get(condition) or 0)
-        new_dec  = curr_dec - int(dec_qty)
-        if new_dec < 0:
-            raise RuntimeError(f"Insufficient stock for {item_code} [{dec_branch}/{color}/{condition}] (have {curr_dec}, need {int(dec_qty)})")
-
-        update = {"qty": {dec_branch: {color: {condition: new_dec}}}}
-
-        if inc_branch and inc_qty > 0:
-            curr_inc = int(((qty_map.get(inc_branch) or {}).get(inc_color or color) or {}).get(inc_condition or condition) or 0)
-            new_inc  = curr_inc + int(inc_qty)
-            # merge the increment path too
-            update["qty"].setdefault(inc_branch, {})
-            update["qty"][inc_branch].setdefault(inc_color or color, {})
-            update["qty"][inc_branch][inc_color or color][inc_condition or condition] = new_inc
-
-        tx.set(ref, update, merge=True)
-
-    _do(tr)
-
-
 def _safe_float(v, default=0.0):
     try:
         return float(v)
@@ -532,8 +468,8 @@ class InventorySelectorDialog(QDialog):
         color_values, cond_values = set(), set()
         want_branch = (self.branch or "").strip() or None
 
-        for snap in db.collection("products").stream():
-            d = snap.to_dict() or {}
+        # Stock shown here is re-checked live before saving
+        for product_id, d in catalog_store().ensure(max_age=STOCK_MAX_AGE).items():
             item_code = (d.get("item_code") or "").strip()
             name = (d.get("name") or "Unnamed").strip()
 
@@ -550,7 +486,7 @@ class InventorySelectorDialog(QDialog):
                     continue
                 color_values.add(color); cond_values.add(cond)
                 row = {
-                    "product_id": snap.id,
+                    "product_id": product_id,
                     "branch": branch,
                     "item_code": item_code,
                     "name": name,
@@ -1084,136 +1020,27 @@ class DeliveryChalanForm(QDialog):
         except Exception:
             pass
 
-        # --- 2) PRE-FLIGHT: recheck live stock for every (item_code, branch, color, condition) ---
-        keys = []
+        # --- 2) Inventory moves: out of the source branch (and into the destination for transfers) ---
+        is_transfer = mode == "Inventory Transfer" and dest_branch and dest_branch != branch
+        moves = []
         for it in (self.items or []):
             code = str(it.get("item_code") or "").strip()
-            col  = str(it.get("color") or "No Color")
-            cond = str(it.get("condition") or "New")
-            qty  = _safe_float(it.get("qty", 0), 0.0)
-            if code and qty > 0:
-                keys.append((code, branch, col, cond))
-        if not keys:
+            color = str(it.get("color") or "No Color")
+            cond  = str(it.get("condition") or "New")
+            qty   = _safe_float(it.get("qty", 0), 0.0)
+            if not code or qty <= 0:
+                continue
+            moves.append((code, branch, color, cond, -qty))
+            if is_transfer:
+                moves.append((code, dest_branch, color, cond, qty))
+        if not moves:
             QMessageBox.warning(self, "Missing Items", "Please select at least one valid item with qty > 0.")
             return
 
-        try:
-            live = _fetch_live_availability_for_keys(keys)
-        except Exception as e:
-            QMessageBox.warning(self, "Inventory", f"Could not fetch live availability:\n{e}")
-            return
-
-        problems = []
-        for it in (self.items or []):
-            code = str(it.get("item_code") or "").strip()
-            col  = str(it.get("color") or "No Color")
-            cond = str(it.get("condition") or "New")
-            need = _safe_float(it.get("qty", 0), 0.0)
-            have = float(live.get((code, branch, col, cond), 0.0))
-            if need > have + 1e-9:
-                problems.append(f"{code} / {col} / {cond}: need {need:g}, have {have:g}")
-        if problems:
-            QMessageBox.information(
-                self, "Inventory changed",
-                "Some items no longer have enough stock:\n\n- " + "\n- ".join(problems) + "\n\nPlease adjust and try again."
-            )
-            return
-
-        # --- 3) TRANSACTIONAL MUTATION: decrement (and increment for transfers) per product ---
-        # We apply each product change in its own Firestore transaction via _tx_mutate_qty.
-        # To be safe against cross-user races, we keep a log and attempt best-effort rollback if any step fails.
-        applied = []  # list of tuples for rollback: (code, branch, color, cond, dec_qty, inc_branch, inc_color, inc_cond, inc_qty)
-        try:
-            for it in self.items:
-                code = str(it.get("item_code") or "").strip()
-                color = str(it.get("color") or "No Color")
-                cond  = str(it.get("condition") or "New")
-                qty   = _safe_float(it.get("qty", 0), 0.0)
-                if not code or qty <= 0:
-                    continue
-
-                if mode == "Inventory Transfer" and dest_branch and dest_branch != branch:
-                    # atomic dec @ source + inc @ dest (same transaction on the product doc)
-                    _tx_mutate_qty(
-                        item_code=code,
-                        dec_branch=branch, color=color, condition=cond, dec_qty=qty,
-                        inc_branch=dest_branch, inc_color=color, inc_condition=cond, inc_qty=qty
-                    )
-                    applied.append((code, branch, color, cond, qty, dest_branch, color, cond, qty))
-                else:
-                    # chalan out: just decrement from source
-                    _tx_mutate_qty(
-                        item_code=code,
-                        dec_branch=branch, color=color, condition=cond, dec_qty=qty
-                    )
-                    applied.append((code, branch, color, cond, qty, None, None, None, 0.0))
-        except Exception as e:
-            # Best-effort rollback for anything we already applied
-            try:
-                for code, dec_br, col, cnd, q, inc_br, inc_col, inc_cnd, inc_q in reversed(applied):
-                    # Reverse what we did:
-                    # If it was a transfer: dec dest, inc back to source
-                    if inc_br and inc_q > 0:
-                        try:
-                            _tx_mutate_qty(
-                                item_code=code,
-                                dec_branch=inc_br, color=inc_col, condition=inc_cnd, dec_qty=inc_q,
-                                inc_branch=dec_br, inc_color=col, inc_condition=cnd, inc_qty=q
-                            )
-                        except Exception:
-                            pass
-                    else:
-                        # Plain chalan: add back to source
-                        try:
-                            _tx_mutate_qty(
-                                item_code=code,
-                                dec_branch=dec_br, color=col, condition=cnd, dec_qty= -q  # negative dec = increment
-                            )
-                        except Exception:
-                            pass
-            finally:
-                QMessageBox.warning(self, "Inventory", f"Could not update inventory:\n{e}\n\nNo DC was saved.")
-                return
-
-        # --- 4) If we are here, inventory is successfully adjusted. Build & save the DC document. ---
-        payload = {
-            "dc_no": dc_number,
-            "date": self.date_edit.date().toString("yyyy-MM-dd"),
-            "branch": branch,
-
-            "vehicle_no": (self.vehicle_no.text() or "").strip(),
-            "vehicle_person": vehicle_person_name,
-            "vehicle_person_account_id": vehicle_person_account_id,
-
-            "delivery_fare": delivery_fare,
-            "delivery_fare_payer": delivery_fare_payer,
-
-            "delivery_location": delivery_location_text,
-            "notes": (self.notes.toPlainText() or "").strip(),
-            "physical_dc_no": physical_dc_no,
-            "items": self.items,
-            "created_at": firestore.SERVER_TIMESTAMP,
-            "created_by": str((self.user_data or {}).get("name", "")).strip().lower(),
-
-            "mode": mode,
-            "transfer_to_branch": dest_branch,
-        }
-
-        chalan_ref = db.collection("delivery_chalans").document()
-        try:
-            chalan_ref.set(payload)
-        except Exception as e:
-            # Extremely rare: doc save failed after inventory mutated.
-            # We won't attempt to roll back inventory again here (already succeeded); instead, inform the user.
-            QMessageBox.warning(
-                self, "Saved Partially",
-                f"Inventory updated but Delivery Chalan save failed:\n{e}\n\n"
-                "Please contact admin with this message. You can manually reconstruct the DC from recent activity."
-            )
-            return
-
-        # --- 5) Post Delivery Fare JE if Sender Will Pay (unchanged logic, but now after DC is saved) ---
-        if delivery_fare_payer == "Sender Will Pay" and delivery_fare > 0 and vehicle_person_account_id:
+        # --- 3) Delivery Fare JE if Sender Will Pay: resolve the offset account up front ---
+        post_fare = delivery_fare_payer == "Sender Will Pay" and delivery_fare > 0 and vehicle_person_account_id
+        je_ref = None
+        if post_fare:
             try:
                 # Find or create Opening Balances Equity (type **Equity/Asset** as per your existing logic)
                 eq_q = db.collection("accounts").where("slug", "==", "opening_balances_equity").limit(1).get()
@@ -1221,10 +1048,8 @@ class DeliveryChalanForm(QDialog):
                     equity_id = eq_q[0].id
                     eq_doc = eq_q[0].to_dict() or {}
                     equity_name = eq_doc.get("name", "System Offset Account")
-                    equity_type = eq_doc.get("type", "Asset")
                 else:
                     # Fallback create (mirrors existing logic)
-                    from re import sub as _re_sub
                     def _generate_code_once(acc_type):
                         prefix = {"Asset":"1","Liability":"2","Equity":"3","Income":"4","Expense":"5"}.get(acc_type, "9")
                         counter_ref = db.collection("meta").document("account_code_counters")
@@ -1266,74 +1091,125 @@ class DeliveryChalanForm(QDialog):
                         "current_balance": 0.0
                     }
                     ref = db.collection("accounts").document()
-                    ref.set(equity_doc)
+                    ref.set(stamped(equity_doc))
                     equity_id = ref.id
                     equity_name = "System Offset Account"
-                    equity_type = "Asset"
-
-                # Current balances (for balance_before snapshots)
-                def _curr_bal(acc_id):
-                    try: a = db.collection("accounts").document(acc_id).get().to_dict() or {}; return float(a.get("current_balance", 0.0) or 0.0)
-                    except Exception: return 0.0
-
-                # Vehicle/employee account
-                try:
-                    vp_snap = db.collection("accounts").document(vehicle_person_account_id).get()
-                    vp_doc = vp_snap.to_dict() or {}
-                    vp_type = (vp_doc.get("type") or "Liability")
-                    vp_pre  = float(vp_doc.get("current_balance", 0.0) or 0.0)
-                except Exception:
-                    vp_type = "Liability"; vp_pre = 0.0
-
-                debit_line = {
-                    "account_id": equity_id, "account_name": equity_name,
-                    "debit": delivery_fare, "credit": 0.0, "balance_before": _curr_bal(equity_id),
-                }
-                credit_line = {
-                    "account_id": vehicle_person_account_id, "account_name": vehicle_person_name or "Vehicle Person",
-                    "debit": 0.0, "credit": delivery_fare, "balance_before": vp_pre,
-                }
+            except Exception as e:
+                QMessageBox.warning(self, "Delivery Fare", f"Could not prepare the Delivery Fare journal entry:\n{e}\n\nNo DC was saved.")
+                return
+            je_ref = db.collection("journal_entries").document()
 
-                def _net_change(acc_type, debit, credit):
-                    return (debit - credit) if acc_type in ["Asset", "Expense"] else (credit - debit)
-
-                vp_net = _net_change(vp_type, credit_line["debit"], credit_line["credit"])
-
-                date_py = self.date_edit.date().toPyDate()
-                je_date = datetime.datetime.combine(date_py, datetime.datetime.min.time())
-                branch_val = self.user_data.get("branch")
-                branch_val = (branch_val[0] if isinstance(branch_val, list) and branch_val else branch_val) or branch
-
-                je = {
-                    "date": je_date,
-                    "created_at": firestore.SERVER_TIMESTAMP,
-                    "created_by": self.user_data.get("email", "system"),
-                    "reference_no": f"JE-DC-{dc_number}",
-                    "purpose": "Delivery Fare",
-                    "branch": branch_val,
-                    "description": f"Delivery Fare for {dc_number}",
-                    "lines": [debit_line, credit_line],
-                    "lines_account_ids": [debit_line["account_id"], credit_line["account_id"]],
-                    "meta": {"kind": "opening_balance", "dc_no": dc_number}
-                }
+        # --- 4) Build the DC document ---
+        payload = {
+            "dc_no": dc_number,
+            "date": self.date_edit.date().toString("yyyy-MM-dd"),
+            "branch": branch,
 
-                batch = db.batch()
-                je_ref = db.collection("journal_entries").document()
-                batch.set(je_ref, je)
-                batch.update(db.collection("accounts").document(vehicle_person_account_id),
-                            {"current_balance": firestore.Increment(vp_net)})
-                batch.commit()
+            "vehicle_no": (self.vehicle_no.text() or "").strip(),
+            "vehicle_person": vehicle_person_name,
+            "vehicle_person_account_id": vehicle_person_account_id,
 
-                # Link JE back to DC
-                chalan_ref.update({"fare_je_id": je_ref.id})
-            except Exception as e:
-                # Non-fatal: DC already saved; just inform user
-                print("Failed to post Delivery Fare JE:", e)
+            "delivery_fare": delivery_fare,
+            "delivery_fare_payer": delivery_fare_payer,
+
+            "delivery_location": delivery_location_text,
+            "notes": (self.notes.toPlainText() or "").strip(),
+            "physical_dc_no": physical_dc_no,
+            "items": self.items,
+            "created_at": firestore.SERVER_TIMESTAMP,
+            "created_by": str((self.user_data or {}).get("name", "")).strip().lower(),
+
+            "mode": mode,
+            "transfer_to_branch": dest_branch,
+        }
+        if je_ref is not None:
+            payload["fare_je_id"] = je_ref.id
+        chalan_ref = db.collection("delivery_chalans").document()
+
+        def _records(tx):
+            """DC doc (+ fare JE and vehicle person balance), written with the stock in one transaction."""
+            writes = [("set", chalan_ref, payload)]
+            if je_ref is None:
+                return writes
+
+            # Current balances (for balance_before snapshots), read inside the transaction
+            vp_ref = db.collection("accounts").document(vehicle_person_account_id)
+            eq_ref = db.collection("accounts").document(equity_id)
+            accounts = {snap.id: (snap.to_dict() or {}) for snap in tx.get_all([vp_ref, eq_ref]) if snap.exists}
+            vp_doc = accounts.get(vehicle_person_account_id, {})
+            vp_type = (vp_doc.get("type") or "Liability")
+            vp_pre  = float(vp_doc.get("current_balance", 0.0) or 0.0)
+            eq_pre  = float(accounts.get(equity_id, {}).get("current_balance", 0.0) or 0.0)
+
+            debit_line = {
+                "account_id": equity_id, "account_name": equity_name,
+                "debit": delivery_fare, "credit": 0.0, "balance_before": eq_pre,
+            }
+            credit_line = {
+                "account_id": vehicle_person_account_id, "account_name": vehicle_person_name or "Vehicle Person",
+                "debit": 0.0, "credit": delivery_fare, "balance_before": vp_pre,
+            }
+
+            def _net_change(acc_type, debit, credit):
+                return (debit - credit) if acc_type in ["Asset", "Expense"] else (credit - debit)
+
+            vp_net = _net_change(vp_type, credit_line["debit"], credit_line["credit"])
+
+            date_py = self.date_edit.date().toPyDate()
+            je_date = datetime.datetime.combine(date_py, datetime.datetime.min.time())
+            branch_val = self.user_data.get("branch")
+            branch_val = (branch_val[0] if isinstance(branch_val, list) and branch_val else branch_val) or branch
+
+            je = {
+                "date": je_date,
+                "created_at": firestore.SERVER_TIMESTAMP,
+                "created_by": self.user_data.get("email", "system"),
+                "reference_no": f"JE-DC-{dc_number}",
+                "purpose": "Delivery Fare",
+                "branch": branch_val,
+                "description": f"Delivery Fare for {dc_number}",
+                "lines": [debit_line, credit_line],
+                "lines_account_ids": [debit_line["account_id"], credit_line["account_id"]],
+                "meta": {"kind": "opening_balance", "dc_no": dc_number}
+            }
+            writes.append(("set", je_ref, stamped(je)))
+            writes.append(("update", vp_ref, stamped({"current_balance": firestore.Increment(vp_net)})))
+            return writes
+
+        # --- 5) ONE TRANSACTION: every product (re-checked live), the DC and the fare JE, all or nothing ---
+        try:
+            apply_inventory_moves(moves, extra=_records)
+        except InsufficientStock as e:
+            QMessageBox.information(
+                self, "Inventory changed",
+                "Some items no longer have enough stock:\n\n- " + "\n- ".join(e.shortages) + "\n\nPlease adjust and try again."
+            )
+            return
+        except RollbackFailed as e:
+            QMessageBox.critical(
+                self, "Inventory",
+                f"Could not update inventory:\n{e.cause}\n\nNo DC was saved, but these stock changes could not be "
+                "undone and need manual correction:\n\n- " + "\n- ".join(describe_moves(e.stranded))
+            )
+            return
+        except CommitUnknown as e:
+            # The DC is written in the last transaction: if it exists, everything landed
+            try:
+                saved = chalan_ref.get().exists
+            except Exception:
+                saved = None
+            if not saved:
                 QMessageBox.warning(
-                    self,
-                    "Saved with warning",
-                    f"Chalan {dc_number} saved, but the Delivery Fare journal entry could not be posted.\n{e}"
+                    self, "Inventory",
+                    f"The connection dropped while saving:\n{e.cause}\n\n"
+                    + ("The DC was not saved, but stock" if saved is False else "The DC and stock")
+                    + f" may have changed for: {', '.join(e.codes)}.\n"
+                    "Check Delivery Chalans and stock before trying again."
                 )
+                return
+        except Exception as e:
+            QMessageBox.warning(self, "Inventory", f"Could not update inventory:\n{e}\n\nNo DC was saved.")
+            return
 
         # --- 6) Done ---
         QMessageBox.information(self, "Saved", f"Delivery Chalan {dc_number} created and inventory updated.")
@@ -13,6 +13,7 @@ from PyQt5.QtCore import Qt, QTimer, QDate, QThread, pyqtSignal
 from PyQt5.QtGui import QKeySequence, QColor, QBrush
 
 from firebase.config import db
+from firebase.local_mirror import stamped
 from firebase_admin import firestore
 
 import uuid, datetime, re, os, csv, tempfile, json
@@ -647,7 +648,7 @@ class EmployeeDialog(QDialog):
             "parent": None, "branch": branches_list, "description": f"System-generated parent for {name.lower()}",
             "active": True, "is_posting": False, "current_balance": 0.0
         }
-        ref = db.collection("accounts").document(); ref.set(parent_doc); return ref.id
+        ref = db.collection("accounts").document(); ref.set(stamped(parent_doc)); return ref.id
 
     def _create_employee_coa(self, emp_name, branches):
         if isinstance(branches, str) or branches is None:
@@ -660,7 +661,7 @@ class EmployeeDialog(QDialog):
             "parent": parent_id, "branch": branches, "description": f"Auto-generated for employee {emp_name}",
             "active": True, "is_posting": True, "opening_balance": None, "current_balance": 0.0
         }
-        ref = db.collection("accounts").document(); ref.set(child); return ref.id, child["name"]
+        ref = db.collection("accounts").document(); ref.set(stamped(child)); return ref.id, child["name"]
 
     def _post_opening_advance_je(self, employee_account_id, employee_name, amount):
         try:
@@ -691,7 +692,7 @@ class EmployeeDialog(QDialog):
                     "current_balance": 0.0
                 }
                 ref = db.collection("accounts").document()
-                ref.set(equity_doc)
+                ref.set(stamped(equity_doc))
                 equity_id = ref.id
                 equity_name = "System Offset Account"
 
@@ -722,12 +723,12 @@ class EmployeeDialog(QDialog):
                 "lines_account_ids": [debit_line["account_id"], credit_line["account_id"]],
                 "meta": {"kind": "opening_balance", "subtype": "opening_advance", "assume_prev_zero": True}
             }
-            db.collection("journal_entries").document().set(je)
+            db.collection("journal_entries").document().set(stamped(je))
 
-            db.collection("accounts").document(employee_account_id).update({
+            db.collection("accounts").document(employee_account_id).update(stamped({
                 "current_balance": firestore.Increment(-amount),
                 "opening_balance": {"amount": amount, "type": "debit"}
-            })
+            }))
 
         except Exception as e:
             QMessageBox.critical(self, "Journal Error", f"Failed to post opening advance JE: {e}")
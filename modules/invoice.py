@@ -7,6 +7,8 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QDate
 from firebase.config import db
+from firebase.catalog import catalog_store
+from firebase.local_mirror import stamped
 from modules.clients_master import PartyDialog
 from firebase_admin import firestore
 import datetime
@@ -214,30 +216,20 @@ class InvoiceModule(QWidget):
         self.product_dict.clear()
         loader = self._show_loader("Loading products…")
         try:
-            main_id = next(
-                (d.id for d in db.collection("product_main_categories").stream()
-                 if d.to_dict().get("name") == "Finished Products"),
-                None
-            )
-            if main_id:
-                sub_ids = [d.id for d in db.collection("product_sub_categories")
-                           .where("main_id", "==", main_id).stream()]
-            else:
-                sub_ids = []
+            store = catalog_store().ensure()
+            main_id = store.main_id("Finished Products")
 
             def fmt(x):
                 return int(x) if float(x).is_integer() else round(float(x), 2)
 
-            for doc in db.collection("products").stream():
-                p = doc.to_dict()
-                if p.get("sub_id") not in sub_ids:
-                    continue
+            for doc_id, p in (store.products_in_main(main_id) if main_id else []):
+                p = dict(p)
                 L, W, H = fmt(p.get("length", 0)), fmt(p.get("width", 0)), fmt(p.get("height", 0))
                 size = f"{L}{p.get('length_unit','')}×{W}{p.get('width_unit','')}"
                 if H:
                     size += f"×{H}{p.get('height_unit','')}"
                 label = f"{p.get('item_code','')} - {p.get('name','')} - {size} - {p.get('gauge')}G"
-                p["label"], p["id"] = label, doc.id
+                p["label"], p["id"] = label, doc_id
                 self.product_dict[label] = p
                 self.products.append(p)
         finally:
@@ -790,7 +782,7 @@ class InvoiceModule(QWidget):
             # --- Quotation: save only ---
             if doc_type == "Quotation":
                 inv_ref = db.collection("invoices").document()
-                inv_ref.set(invoice_doc)
+                inv_ref.set(stamped(invoice_doc))
                 QMessageBox.information(self, "Saved", f"Quotation {inv_no} saved.")
                 self.close()
                 return
@@ -820,7 +812,7 @@ class InvoiceModule(QWidget):
 
             # 3) Save doc first
             inv_ref = db.collection("invoices").document()
-            inv_ref.set(invoice_doc)
+            inv_ref.set(stamped(invoice_doc))
 
             # 4) Post Revenue JE (virtual credit line, real AR debit → updates AR only)
             self._post_revenue_against_opening_equity(
@@ -914,10 +906,10 @@ class InvoiceModule(QWidget):
         # Apply AR balance increment only (Assets rule: debit - credit)
         net_change = float(amount) if ar_type in ["Asset", "Expense"] else -float(amount)
 
-        db.collection("journal_entries").add(je)
-        db.collection("accounts").document(ar_account_id).update({
+        db.collection("journal_entries").add(stamped(je))
+        db.collection("accounts").document(ar_account_id).update(stamped({
             "current_balance": firestore.Increment(net_change)
-        })
+        }))
         
     def _post_revenue_against_opening_equity(self, invoice_ref_id, client_id, amount, description=""):
         # Revenue JE (NO virtual lines):
@@ -972,7 +964,7 @@ class InvoiceModule(QWidget):
                 "subtype": "Equity",
             }
             doc_ref = db.collection("accounts").document()
-            doc_ref.set(equity_account)
+            doc_ref.set(stamped(equity_account))
             equity_account_id = doc_ref.id
             equity_account_name = "Opening Balances Equity"
             equity_doc = equity_account
@@ -1023,11 +1015,11 @@ class InvoiceModule(QWidget):
             equity_account_id: _net(eq_doc, 0.0, float(amount)),
         }
 
-        db.collection("journal_entries").add(je)
+        db.collection("journal_entries").add(stamped(je))
         for acc_id, delta in updates.items():
-            db.collection("accounts").document(acc_id).update({
+            db.collection("accounts").document(acc_id).update(stamped({
                 "current_balance": firestore.Increment(delta)
-            })
+            }))
 
     def _post_payment_journal(self, invoice_ref_id, client_id, received_account_id, amount, description=""):
         """
@@ -1090,11 +1082,11 @@ class InvoiceModule(QWidget):
         }
 
         # Commit: add JE, then increment balances
-        db.collection("journal_entries").add(je)
+        db.collection("journal_entries").add(stamped(je))
         for acc_id, delta in updates.items():
-            db.collection("accounts").document(acc_id).update({
+            db.collection("accounts").document(acc_id).update(stamped({
                 "current_balance": firestore.Increment(delta)
-            })
+            }))
 
 
     # ======== EDIT SUPPORT (load + update) ========
@@ -1267,7 +1259,7 @@ class InvoiceModule(QWidget):
         payload["status"] = ("Open" if (payload["type"] == "Quotation" or balance > 0.01) else "Paid")
 
         try:
-            db.collection("invoices").document(self._loaded_doc_id).set(payload, merge=True)
+            db.collection("invoices").document(self._loaded_doc_id).set(stamped(payload), merge=True)
             QMessageBox.information(self, "Updated", "Invoice updated.")
             self.close()
         except Exception as e:
@@ -1355,7 +1347,7 @@ class InvoiceModule(QWidget):
             "current_balance": 0.0
         }
         doc_ref = db.collection("accounts").document()
-        doc_ref.set(account)
+        doc_ref.set(stamped(account))
         return doc_ref.id
 
     def _post_invoice_journal(self, invoice_ref_id, invoice_data):
@@ -1424,8 +1416,8 @@ class InvoiceModule(QWidget):
                     net = float(l.get("debit", 0)) - float(l.get("credit", 0))
                 else:
                     net = float(l.get("credit", 0)) - float(l.get("debit", 0))
-                tx.update(acc_ref, {"current_balance": firestore.Increment(net)})
-            tx.set(je_ref, je)
+                tx.update(acc_ref, stamped({"current_balance": firestore.Increment(net)}))
+            tx.set(je_ref, stamped(je))
 
         txn_post(transaction)
 
@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QDoubleValidator, QColor
 from firebase.config import db
+from firebase.local_mirror import stamped
 import uuid
 import datetime
 from firebase_admin import firestore
@@ -532,11 +533,11 @@ class JournalEntryForm(QWidget):
             # Atomically create the JE and bump both accounts
             batch = db.batch()
             je_ref = db.collection("journal_entries").document()
-            batch.set(je_ref, entry)
+            batch.set(je_ref, stamped(entry))
 
             for acc_id, net in balance_updates.items():
                 acc_ref = db.collection("accounts").document(acc_id)
-                batch.update(acc_ref, {"current_balance": firestore.Increment(net)})
+                batch.update(acc_ref, stamped({"current_balance": firestore.Increment(net)}))
 
             batch.commit()
 
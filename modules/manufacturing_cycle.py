@@ -1,18 +1,34 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QListWidget, QListWidgetItem,
     QGraphicsScene, QGraphicsView, QGraphicsRectItem, QHBoxLayout, QGraphicsTextItem, QGraphicsEllipseItem,
-    QComboBox, QMessageBox, QTabWidget, QCheckBox, QSpinBox, QProgressDialog, QApplication, QGraphicsLineItem, QSizePolicy, QGraphicsItem
+    QComboBox, QMessageBox, QTabWidget, QCheckBox, QSpinBox, QDoubleSpinBox, QProgressDialog, QApplication, QGraphicsLineItem, QSizePolicy, QGraphicsItem
 )
-from PyQt5.QtGui import QBrush, QColor, QPen, QPainter, QFont, QTransform
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QBrush, QColor, QPen, QPainter, QFont, QTransform, QStaticText
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF, QThread, pyqtSignal
 from firebase.config import db
+from firebase.catalog import catalog_store, STOCK_MAX_AGE
+from ui.live_sync import live_sync
 from uuid import uuid4
 from firebase_admin import firestore
 from fractions import Fraction
-from collections import Counter
-from math import ceil
+from collections import Counter, deque
+import time
 from itertools import permutations
 from collections import defaultdict
+from nesting import bounds, geometry, jobs, leftovers, occupancy, plan_codec, rowfill
+from nesting.engines import ENGINES, DEFAULT_ENGINE, SkylineEngine, layout_area
+from nesting.guillotine import cut_sequence
+from nesting.multisheet import plan_order
+from nesting.portfolio import PortfolioRun
+from nesting.layout_cache import shared_cache
+from nesting.cutstock import Stock, plan_cuts
+from nesting.remnants import WASTE_SUBCATEGORY, RemnantIndex, group_key, plan_with_remnants
+from nesting.incremental import IncrementalSkyline
+from nesting.jobs import Cancelled, NestJob
+
+MAX_PIPE_PATTERNS = 12  # distinct cutting patterns drawn side by side
+MIN_LABEL_PIXELS = 4    # block labels smaller than this on screen are not drawn
+PROGRESS_INTERVAL = 0.05  # seconds between nesting progress updates
 
 class PannableGraphicsView(QGraphicsView):
     def __init__(self, scene=None):
@@ -67,7 +83,8 @@ class DraggableBlock(QGraphicsRectItem):
     def mouseMoveEvent(self, event):
         super().mouseMoveEvent(event)
         if self.callback:
-            self.callback("preview", self.label, self.pos(), self)  # send ghost-only update
+            # Scene position of the block's centre, wherever it started
+            self.callback("preview", self.label, self.sceneBoundingRect().center(), self)  # send ghost-only update
         
     def mousePressEvent(self, event):
         if self.callback:
@@ -77,16 +94,107 @@ class DraggableBlock(QGraphicsRectItem):
     def mouseReleaseEvent(self, event):
         super().mouseReleaseEvent(event)
         if self.callback:
-            self.callback("drop", self.label, self.pos())  # Send final drop
+            self.callback("drop", self.label, self.sceneBoundingRect().center())  # Send final drop
             
     def _send_reorder_request(self):
         if self.callback:
             self.callback("dragging", self.label, self.pos())
 
 
+class BlockLabel(QGraphicsItem):
+    """
+    Centred label of a block, drawn from a shared QStaticText (laid out once
+    per text and size). Skipped when zoomed out so far it can't be read.
+    """
+    _texts = {}     # (text, font size) -> (QStaticText, QFont)
+
+    def __init__(self, parent=None, color=Qt.black):
+        super().__init__(parent)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(10)
+        self.color = QColor(color)
+        self.font_size = 6
+        self.static = None
+        self.font = None
+        self.center = QPointF()
+        self.turned = False
+        self.bounds = QRectF()
+
+    @classmethod
+    def text_for(cls, text, font_size):
+        key = (text, font_size)
+        cached = cls._texts.get(key)
+        if cached is None:
+            if len(cls._texts) > 4096:
+                cls._texts.clear()
+            font = QFont("Arial", font_size)
+            static = QStaticText(text)
+            static.prepare(QTransform(), font)
+            cached = cls._texts[key] = (static, font)
+        return cached
+
+    def set_label(self, text, block_rect, font_size, turned):
+        self.prepareGeometryChange()
+        self.static, self.font = self.text_for(text, font_size)
+        self.font_size = font_size
+        self.center = block_rect.center()
+        self.turned = turned
+
+        size = self.static.size()
+        w, h = (size.height(), size.width()) if turned else (size.width(), size.height())
+        self.bounds = QRectF(self.center.x() - w / 2, self.center.y() - h / 2, w, h).united(block_rect)
+
+    def boundingRect(self):
+        return self.bounds
+
+    def paint(self, painter, option, widget=None):
+        if self.static is None:
+            return
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if self.font_size * lod < MIN_LABEL_PIXELS:
+            return
+        size = self.static.size()
+        painter.save()
+        painter.setFont(self.font)
+        painter.setPen(self.color)
+        painter.translate(self.center)
+        if self.turned:
+            painter.rotate(-90)
+        painter.drawStaticText(QPointF(-size.width() / 2, -size.height() / 2), self.static)
+        painter.restore()
+
+
+class NestingWorker(QThread):
+    """Runs one NestJob off the GUI thread. A cancelled job emits nothing."""
+    progress = pyqtSignal(int, int, int)    # job id, pieces done, total
+    finished_ok = pyqtSignal(int, object)   # job id, (used, unplaced, cut_tree)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self._last_progress = 0.0
+
+    def _report(self, done, total):
+        now = time.monotonic()
+        if now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.progress.emit(self.job.id, done, total)
+
+    def run(self):
+        try:
+            result = self.job.run(progress=self._report)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.failed.emit(self.job.id, str(e))
+            return
+        self.finished_ok.emit(self.job.id, result)
+
+
 
 class ManufacturingModule(QWidget):
-    def __init__(self, edit_data=None, doc_id=None):
+    def __init__(self, edit_data=None, doc_id=None, load_catalog=True):
         super().__init__()
         self.setWindowTitle("📏 Manufacturing Module")
         self.resize(1300, 800)
@@ -99,10 +207,26 @@ class ManufacturingModule(QWidget):
         self.products = []
         self.subcategories = []
         self.hidden_blocks = []
+        self.block_items = []       # DraggableBlocks on the canvas, in layout order
+        self.ghosts = []            # pooled drag-preview blocks
+        self.ghost_state = None     # (label, insert index) the ghosts show
+        self.summary_item = None
+        self.summary_key = None
+        self.shear_items = []       # pooled guillotine shear lines
+        self.canvas_scale = 1.0
+        self.canvas_sheet = None    # sheet the static layer (grid, outline) was drawn for
+        self.incremental = None     # IncrementalSkyline for drag reordering
+        self.nest_job = None        # newest background NestJob; older results are dropped
+        self.nest_context = None
+        self.nest_workers = set()
+        self.background_nesting = True
 
         self.init_ui()
-        self.load_subcategories()
-        self.load_products()
+        # A render-only instance (order viewer drawing a saved plan) needs no stock
+        if load_catalog:
+            self.load_subcategories()
+            self.load_products()
+            live_sync().products_changed.connect(self.on_products_changed)
 
         if self.edit_data:
             self.load_existing_order()
@@ -207,6 +331,70 @@ class ManufacturingModule(QWidget):
         # Add to layout
         left_layout.addLayout(button_row)
 
+        # Nesting engine selector
+        engine_row = QHBoxLayout()
+        engine_row.addWidget(QLabel("Nesting Engine:"))
+        self.engine_dropdown = QComboBox()
+        for key, engine_cls in ENGINES.items():
+            self.engine_dropdown.addItem(engine_cls.title, key)
+        self.engine_dropdown.setCurrentIndex(self.engine_dropdown.findData(DEFAULT_ENGINE))
+        self.engine_dropdown.setToolTip("Placement strategy used to lay cuts out on the sheet.")
+        engine_row.addWidget(self.engine_dropdown, stretch=1)
+        engine_row.addWidget(QLabel("Kerf:"))
+        self.kerf_input = QDoubleSpinBox()
+        self.kerf_input.setRange(0.0, 0.5)
+        self.kerf_input.setDecimals(4)
+        self.kerf_input.setSingleStep(0.0625)
+        self.kerf_input.setSuffix(" in")
+        self.kerf_input.setToolTip("Blade kerf left between neighbouring cuts.")
+        engine_row.addWidget(self.kerf_input)
+        left_layout.addLayout(engine_row)
+        self.nest_status = QLabel("")
+        self.nest_status.setStyleSheet("color: #555;")
+        left_layout.addWidget(self.nest_status)
+        # Achieved yield against the best any layout could do
+        self.bound_status = QLabel("")
+        self.bound_status.setStyleSheet("color: #555;")
+        left_layout.addWidget(self.bound_status)
+        self.last_cut_tree = None
+
+        self.order_nest_btn = QPushButton("📦 Nest Whole Order")
+        self.order_nest_btn.setToolTip("Pack the cuts of every sheet tab using the same raw item onto as few sheets as possible.")
+        self.order_nest_btn.clicked.connect(self.nest_whole_order)
+        order_row = QHBoxLayout()
+        order_row.addWidget(self.order_nest_btn, stretch=1)
+        self.remnant_toggle = QCheckBox("♻️ Use Remnants")
+        self.remnant_toggle.setToolTip("Cut from matching \"Waste Raw Material\" sheets before opening full sheets.")
+        self.remnant_toggle.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        order_row.addWidget(self.remnant_toggle, stretch=0)
+        left_layout.addLayout(order_row)
+        self.remnant_index = None
+        # Re-read remnant stock each time the option is switched on
+        self.remnant_toggle.toggled.connect(lambda _: setattr(self, "remnant_index", None))
+
+        # Heuristic portfolio: engines x piece orders x rotations, best yield wins
+        portfolio_row = QHBoxLayout()
+        self.portfolio_btn = QPushButton("🏁 Find Best Layout")
+        self.portfolio_btn.setToolTip("Try many engines, cut orders and rotations in parallel and keep the best yield.")
+        self.portfolio_btn.clicked.connect(self.run_portfolio_layout)
+        portfolio_row.addWidget(self.portfolio_btn, stretch=1)
+        portfolio_row.addWidget(QLabel("Budget:"))
+        self.budget_input = QDoubleSpinBox()
+        self.budget_input.setRange(0.5, 30.0)
+        self.budget_input.setSingleStep(0.5)
+        self.budget_input.setValue(2.0)
+        self.budget_input.setSuffix(" s")
+        portfolio_row.addWidget(self.budget_input)
+        left_layout.addLayout(portfolio_row)
+        self.portfolio_status = QLabel("")
+        self.portfolio_status.setStyleSheet("color: #555;")
+        left_layout.addWidget(self.portfolio_status)
+        self.portfolio_run = None
+        self.portfolio_context = None
+        self.portfolio_timer = QTimer(self)
+        self.portfolio_timer.setInterval(50)
+        self.portfolio_timer.timeout.connect(self.poll_portfolio)
+
         # Action buttons
         # self.auto_btn = QPushButton("⚙️ Auto Layout")
         # self.auto_btn.clicked.connect(self.auto_optimize_sheet) # Function to be defined
@@ -254,6 +442,8 @@ class ManufacturingModule(QWidget):
         self.item_dropdown.currentIndexChanged.connect(self.on_item_changed)
         self.raw_qty_input.textChanged.connect(self.on_raw_qty_changed)
         self.item_dropdown.currentIndexChanged.connect(self.show_empty_raw)
+        self.engine_dropdown.currentIndexChanged.connect(self.show_empty_raw)
+        self.kerf_input.valueChanged.connect(self.show_empty_raw)
 
         self.add_new_sheet()
         
@@ -298,22 +488,13 @@ class ManufacturingModule(QWidget):
         # No cuts: draw empty pipe or sheet
         subcat = self.subcategory_dropdown.currentText().lower()
 
-        def to_inches(val, unit):
-            unit = unit.lower()
-            if unit == 'ft':
-                return float(val) * 12
-            elif unit == 'mm':
-                return float(val) / 25.4
-            return float(val)
-
         if "pipe" in subcat:
-            height = to_inches(item.get("height", 0), item.get("height_unit", "inch"))
+            height = geometry.to_inches(item.get("height", 0), item.get("height_unit", "inch"))
             if height <= 0:
                 return
             self.draw_pipe_stack([height])  # Blank full-height pipe
         else:
-            sheet_w = to_inches(item.get("width", 0), item.get("width_unit", "inch"))
-            sheet_h = to_inches(item.get("length", 0), item.get("length_unit", "inch"))
+            sheet_w, sheet_h = self.sheet_size_inches(item)
             self.draw_canvas(sheet_w, sheet_h, [])  # Blank sheet
         
         self.populate_soot_dropdowns()
@@ -365,6 +546,26 @@ class ManufacturingModule(QWidget):
         self.sheet_tabs.setCurrentIndex(0)
         self.load_sheet_data()
         
+    def on_products_changed(self, ids):
+        """Realtime update: keep the chosen raw sheets' available qty current (no redraw)."""
+        store = catalog_store()
+        changed = set(ids)
+        if self.remnant_index is not None:
+            # A remnant was cut, sold or added: re-read them on the next plan
+            waste_ids = {i for i, d in store.sub_categories().items() if d.get("name") == WASTE_SUBCATEGORY}
+            if any((store.product(i) or {}).get("sub_id") in waste_ids for i in changed) \
+                    or not changed.isdisjoint(self.remnant_index.product_ids()):
+                self.remnant_index = None
+        for sheet in self.sheet_data.values():
+            raw_item = sheet.get("raw_item")
+            if not raw_item or raw_item.get("id") not in changed:
+                continue
+            product_data = store.product(raw_item["id"]) or {}
+            qty_data = product_data.get("qty", {})
+            raw_item["available_qty"] = (
+                qty_data.get(raw_item.get("branch"), {}).get(raw_item.get("color"), {}).get(raw_item.get("condition"), 0)
+            )
+
     def refresh_raw_quantities(self):
         loader = self.show_loader(self, "Refreshing", "Fetching updated quantities...")
 
@@ -382,12 +583,17 @@ class ManufacturingModule(QWidget):
                 if not all([raw_id, branch, color, condition]):
                     continue
 
-                # 🔄 Fetch latest data from Firestore
-                doc = db.collection("products").document(raw_id).get()
-                if not doc.exists:
-                    continue
-
-                product_data = doc.to_dict()
+                # 🔄 Latest data: the live catalog while its listener runs, else Firestore
+                store = catalog_store()
+                if store.live:
+                    product_data = store.product(raw_id)
+                    if product_data is None:
+                        continue
+                else:
+                    doc = db.collection("products").document(raw_id).get()
+                    if not doc.exists:
+                        continue
+                    product_data = doc.to_dict()
                 qty_data = product_data.get("qty", {})
 
                 updated_qty = qty_data.get(branch, {}).get(color, {}).get(condition, 0)
@@ -761,6 +967,11 @@ class ManufacturingModule(QWidget):
             self.bracket_checkbox.setDisabled(True)
             self.sort_toggle.setDisabled(True)
             self.sort_toggle.setToolTip("Sorting not applicable in pipe mode.")
+            self.engine_dropdown.setDisabled(True)
+            self.order_nest_btn.setDisabled(True)
+            self.remnant_toggle.setDisabled(True)
+            self.portfolio_btn.setDisabled(True)
+            self.kerf_input.setDisabled(False)
 
         else:
             # Sheet mode: enable width and bracket
@@ -770,6 +981,11 @@ class ManufacturingModule(QWidget):
             self.cut_length.setPlaceholderText("Width")
             self.sort_toggle.setDisabled(False)
             self.sort_toggle.setToolTip("Enable to auto-sort cut sizes")
+            self.engine_dropdown.setDisabled(False)
+            self.order_nest_btn.setDisabled(False)
+            self.remnant_toggle.setDisabled(False)
+            self.portfolio_btn.setDisabled(False)
+            self.kerf_input.setDisabled(False)
 
             self.bracket_checkbox.setDisabled(False)
             
@@ -795,6 +1011,8 @@ class ManufacturingModule(QWidget):
         return [p for key in sorted_keys for p in grouped[key]]
     
     def simulate_cutting(self):
+        # The cuts or the sheet changed: a portfolio still searching the old ones must not draw
+        self.cancel_portfolio()
         index = self.item_dropdown.currentIndex()
         if index < 0:
             QMessageBox.warning(self, "No Sheet Selected", "Please select a raw material item.")
@@ -803,139 +1021,220 @@ class ManufacturingModule(QWidget):
         item_data = self.item_dropdown.itemData(index)  # ✅ Define early
 
         if self.is_pipe_selected():
+            self.cancel_nesting()
+            self.bound_status.setText("")
             self.simulate_pipe_cutting(item_data)
             return
 
         try:
-            raw_length = float(item_data.get("length", 0))
-            raw_width = float(item_data.get("width", 0))
-            length_unit = item_data.get("length_unit", "inch").lower()
-            width_unit = item_data.get("width_unit", "inch").lower()
-
-            def convert_to_inches(value, unit):
-                if unit == "ft":
-                    return value * 12
-                elif unit == "mm":
-                    return value / 25.4
-                return value  # already inch
-
-            sheet_w = convert_to_inches(raw_width, width_unit)
-            sheet_h = convert_to_inches(raw_length, length_unit)
+            sheet_w, sheet_h = self.sheet_size_inches(item_data)
 
             raw_cuts = self.sheet_data.get(self.sheet_tabs.currentIndex(), {}).get("cuts", [])
-            # Step 1: Sort cuts using smart grouping if on
-            if self.sort_toggle.isChecked():
-                sorted_cuts = self.smart_group_sort(raw_cuts)
-            else:
-                sorted_cuts = raw_cuts[:]
-
-            # Step 2: Convert to (w, h, label, is_bracket)
-            cuts_for_placement = [
-                (
-                    self.parse_inches(c[2]),
-                    self.parse_inches(c[3]),
-                    f"{c[2]} x {c[3]}",
-                    c[4]
-                )
-                for c in sorted_cuts if len(c) == 5
-            ]
-            self.sheet_data[self.sheet_tabs.currentIndex()]["sheet_width"] = sheet_w
-            self.sheet_data[self.sheet_tabs.currentIndex()]["sheet_height"] = sheet_h
-            used_rects, unplaced = self.place_rectangles(sheet_w, sheet_h, cuts_for_placement)
-            if not used_rects:
+            tab = self.sheet_tabs.currentIndex()
+            self.sheet_data[tab]["sheet_width"] = sheet_w
+            self.sheet_data[tab]["sheet_height"] = sheet_h
+
+            job, sorted_cuts = self.sheet_nest_job(sheet_w, sheet_h, raw_cuts)
+            context = (tab, sheet_w, sheet_h, sorted_cuts)
+            result = shared_cache().get(job.cache_key())
+            if result is None and self.background_nesting:
+                self.start_nesting(job, context)
                 return
-            
-            self.draw_canvas(sheet_w, sheet_h, used_rects)
-            
-            # ✅ Always update cut_list with visual highlighting
-            # ✅ Count how many times each label was placed
-            placed_label_counts = Counter([
-                f"{label} - Bracket" if is_bracket else label
-                for _, _, _, _, label, is_bracket in used_rects
-            ])
 
-            self.cut_list.clear()
+            self.cancel_nesting()
+            if result is None:
+                result = job.run()
+                shared_cache().put(job.cache_key(), *result)
+            self.show_layout(context, result, job)
 
-            for c in sorted_cuts:
-                if len(c) == 5:
-                    label = f"{c[2]} x {c[3]}"
-                    if c[4]:
-                        label += " - Bracket"
+        except Exception as e:
+            print("Simulation error:", e)
 
-                    item = QListWidgetItem(label)
+    def sheet_nest_job(self, sheet_w, sheet_h, raw_cuts):
+        """(NestJob, cuts in placement order) for one tab's cut list."""
+        # Step 1: Sort cuts using smart grouping if on
+        if self.sort_toggle.isChecked():
+            # Canonical input order → the layout depends only on the cut multiset (cacheable)
+            sorted_cuts = self.smart_group_sort(sorted(raw_cuts, key=lambda c: [str(v) for v in c]))
+        else:
+            sorted_cuts = raw_cuts[:]
 
-                    if placed_label_counts[label] > 0:
-                        placed_label_counts[label] -= 1  # Mark one as placed
-                    else:
-                        item.setBackground(QColor("#ffe6e6"))  # 🔴 Light red
-                        item.setToolTip("❌ Not placed on sheet")
+        # Step 2: Convert to (w, h, label, is_bracket)
+        cuts_for_placement = [
+            (
+                self.parse_inches(c[2]),
+                self.parse_inches(c[3]),
+                f"{c[2]} x {c[3]}",
+                c[4]
+            )
+            for c in sorted_cuts if len(c) == 5
+        ]
+        job = self.make_nest_job(sheet_w, sheet_h, cuts_for_placement, ordered=not self.sort_toggle.isChecked())
+        return job, sorted_cuts
+
+    def show_layout(self, context, result, job):
+        tab, sheet_w, sheet_h, cuts = context
+        used_rects, unplaced, self.last_cut_tree = result
+        if not used_rects:
+            return
 
-                    self.cut_list.addItem(item)
+        self.draw_canvas(sheet_w, sheet_h, used_rects, cut_tree=self.last_cut_tree)
+        self.update_cut_list(cuts, used_rects)
+        self.show_layout_gap(sheet_w, sheet_h, cuts, used_rects)
+        self.remember_layout(context, used_rects, self.last_cut_tree, job.engine_key, job.kerf)
+
+    @staticmethod
+    def layout_key(sheet_w, sheet_h, cuts):
+        """Sheet size and cut multiset a layout was nested for."""
+        return (sheet_w, sheet_h, sorted(repr(c) for c in cuts if len(c) == 5))
+
+    def remember_layout(self, context, used, tree, engine, kerf):
+        """Keep the layout drawn for a tab so the order saves exactly what was shown."""
+        tab, sheet_w, sheet_h, cuts = context
+        sheet = self.sheet_data.get(tab)
+        if sheet is None:
+            return
+        sheet["shown_layout"] = {
+            "key": self.layout_key(sheet_w, sheet_h, cuts),
+            "used": list(used), "tree": tree, "engine": engine, "kerf": kerf,
+        }
 
+    def show_layout_gap(self, sheet_w, sheet_h, cuts, used_rects):
+        """Yield against its upper bound, and the fewest sheets all the tab's cuts could need."""
+        pieces = [(self.parse_inches(c[2]), self.parse_inches(c[3])) for c in cuts if len(c) == 5]
+        achieved = layout_area(used_rects) / (sheet_w * sheet_h)
+        best = bounds.yield_bound(sheet_w, sheet_h, pieces)
+        text = f"Yield {achieved * 100:.1f}% · bound {best * 100:.1f}%"
+        text += " ✅ optimal" if achieved >= best - 1e-9 else f" · gap {(best - achieved) * 100:.1f} pts"
+        sheets = bounds.l2_bound(sheet_w, sheet_h, pieces)
+        if sheets > 1:
+            text += f" · all cuts need ≥ {sheets} sheets"
+        self.bound_status.setText(text)
+
+    # ---------- background nesting ----------
+    def make_nest_job(self, sheet_w, sheet_h, rectangles, fallback_allowed=True, ordered=True):
+        """NestJob with the engine, kerf and sort options picked in the UI."""
+        return NestJob(
+            sheet_w, sheet_h, rectangles,
+            engine_key=self.engine_dropdown.currentData() or DEFAULT_ENGINE,
+            kerf=self.kerf_inches(), presort=self.sort_toggle.isChecked(),
+            fallback_allowed=fallback_allowed, ordered=ordered,
+        )
+
+    def start_nesting(self, job, context):
+        """Run `job` on a worker thread; it supersedes any job still running."""
+        self.cancel_nesting()
+        self.nest_job = job
+        self.nest_context = context
+
+        worker = NestingWorker(job, parent=self)
+        worker.progress.connect(self.on_nest_progress)
+        worker.finished_ok.connect(self.on_nest_finished)
+        worker.failed.connect(self.on_nest_failed)
+        worker.finished.connect(lambda w=worker: self.forget_nest_worker(w))
+        self.nest_workers.add(worker)
+        self.nest_status.setText("⏳ Nesting...")
+        worker.start()
+
+    def cancel_nesting(self):
+        self.cancel_portfolio()
+        if self.nest_job is not None:
+            self.nest_job.cancel()
+            self.nest_job = None
+            self.nest_context = None
+            self.nest_status.setText("")
+
+    def forget_nest_worker(self, worker):
+        self.nest_workers.discard(worker)
+        worker.deleteLater()
+
+    def is_current_job(self, job_id):
+        return self.nest_job is not None and self.nest_job.id == job_id
+
+    def on_nest_progress(self, job_id, done, total):
+        if self.is_current_job(job_id):
+            self.nest_status.setText(f"⏳ Nesting {done}/{total} cuts...")
+
+    def on_nest_finished(self, job_id, result):
+        if not self.is_current_job(job_id):
+            return      # cuts changed while it ran
+        job, context = self.nest_job, self.nest_context
+        self.nest_job = None
+        self.nest_context = None
+        self.nest_status.setText("")
+
+        shared_cache().put(job.cache_key(), *result)
+        if context[0] != self.sheet_tabs.currentIndex() or self.is_pipe_selected():
+            return
+        try:
+            self.show_layout(context, result, job)
         except Exception as e:
             print("Simulation error:", e)
+
+    def on_nest_failed(self, job_id, message):
+        if not self.is_current_job(job_id):
+            return
+        self.nest_job = None
+        self.nest_context = None
+        self.nest_status.setText("")
+        print("Nesting error:", message)
+
+    def closeEvent(self, event):
+        # Worker threads must not outlive the window
+        self.cancel_nesting()
+        for worker in list(self.nest_workers):
+            worker.wait()
+        super().closeEvent(event)
+
+    def sheet_size_inches(self, item_data):
+        """(width, length) of a raw sheet item in inches, floored onto the 1/16" grid."""
+        raw_length = float(item_data.get("length", 0))
+        raw_width = float(item_data.get("width", 0))
+        sheet_w = geometry.to_inches(raw_width, item_data.get("width_unit", "inch"))
+        sheet_h = geometry.to_inches(raw_length, item_data.get("length_unit", "inch"))
+        return geometry.snap_down(sheet_w), geometry.snap_down(sheet_h)
+
+    def kerf_inches(self):
+        return geometry.snap(self.kerf_input.value())
+
+    def update_cut_list(self, sorted_cuts, used_rects):
+        # ✅ Always update cut_list with visual highlighting
+        # ✅ Count how many times each label was placed
+        placed_label_counts = Counter([
+            f"{label} - Bracket" if is_bracket else label
+            for _, _, _, _, label, is_bracket in used_rects
+        ])
+
+        self.cut_list.clear()
+
+        for c in sorted_cuts:
+            if len(c) == 5:
+                label = f"{c[2]} x {c[3]}"
+                if c[4]:
+                    label += " - Bracket"
+
+                item = QListWidgetItem(label)
+
+                if placed_label_counts[label] > 0:
+                    placed_label_counts[label] -= 1  # Mark one as placed
+                else:
+                    item.setBackground(QColor("#ffe6e6"))  # 🔴 Light red
+                    item.setToolTip("❌ Not placed on sheet")
+
+                self.cut_list.addItem(item)
             
     
     def to_mixed_fraction(self, value):
-        inches = int(value)
-        fraction = Fraction(value - inches).limit_denominator(16)
-        if fraction == 0:
-            return f"{inches}"
-        return f"{inches} {fraction.numerator}/{fraction.denominator}"
+        return geometry.format_inches(value)
 
     def scan_waste_blocks(self, sheet_w, sheet_h, rects, scan_direction="top", resolution=8):
-        grid_w = int(sheet_w * resolution)
-        grid_h = int(sheet_h * resolution)
-        used = [[False for _ in range(grid_w)] for _ in range(grid_h)]
-
-        for x, y, w, h, *_ in rects:
-            for dx in range(ceil(w * resolution)):
-                for dy in range(ceil(h * resolution)):
-                    px = int((x * resolution) + dx)
-                    py = int((y * resolution) + dy)
-                    if 0 <= px < grid_w and 0 <= py < grid_h:
-                        used[py][px] = True
-
-        visited = [[False for _ in range(grid_w)] for _ in range(grid_h)]
-        waste_blocks = []
-
-        y_range = range(grid_h) if scan_direction == "top" else range(grid_h - 1, -1, -1)
-
-        for y in y_range:
-            for x in range(grid_w):
-                if not used[y][x] and not visited[y][x]:
-                    max_w = 0
-                    while x + max_w < grid_w and not used[y][x + max_w] and not visited[y][x + max_w]:
-                        max_w += 1
-
-                    max_h = 1
-                    done = False
-                    while True:
-                        next_y = y + max_h if scan_direction == "top" else y - max_h
-                        if next_y < 0 or next_y >= grid_h:
-                            break
-                        for dx in range(max_w):
-                            if used[next_y][x + dx] or visited[next_y][x + dx]:
-                                done = True
-                                break
-                        if done:
-                            break
-                        max_h += 1
-
-                    for dy in range(max_h):
-                        for dx in range(max_w):
-                            yy = y + dy if scan_direction == "top" else y - dy
-                            visited[yy][x + dx] = True
-
-                    top_y = y if scan_direction == "top" else y - max_h + 1
-                    # Convert back to inches
-                    waste_blocks.append((x / resolution, top_y / resolution, max_w / resolution, max_h / resolution))
-
-        return waste_blocks
+        # Vectorized occupancy grid (same blocks as the old nested-list scan)
+        return occupancy.scan_waste_blocks(sheet_w, sheet_h, rects, scan_direction=scan_direction, resolution=resolution)
 
     
-    def find_all_waste_blocks(self, sheet_w, sheet_h, rects):
-        return self.scan_waste_blocks(sheet_w, sheet_h, rects, scan_direction="bottom")
+    def find_all_waste_blocks(self, sheet_w, sheet_h, rects, min_size=0.0):
+        # Few large leftovers from the cut geometry (the grid flood split L-shapes into slivers)
+        return leftovers.free_rectangles(sheet_w, sheet_h, rects, min_size=min_size)
     
     def on_block_event(self, event_type, label, pos=None, block=None):
         if event_type == "start":
@@ -949,228 +1248,204 @@ class ManufacturingModule(QWidget):
             self.handle_block_drop(pos, label)
             
     def remove_ghost(self):
-        if hasattr(self, "ghosts"):
-            for g in self.ghosts:
-                self.scene.removeItem(g)
-            self.ghosts = []
-            
-        # Unhide real layout blocks
-        if hasattr(self, "hidden_blocks"):
-            for item in self.hidden_blocks:
-                item.setVisible(True)
-            self.hidden_blocks = []
-            
-    def show_ghost_preview(self, pos, label, block):
-        self.remove_ghost()
-        # Safely get reference to the actual dragging block (to exclude from hiding)
-        self.current_drag_block = block
-        # Hide real blocks temporarily
-        ghost_sources = []
-        for item in self.scene.items():
-            if isinstance(item, QGraphicsRectItem) and hasattr(item, "label"):
-                if item is self.current_drag_block:
-                    continue  # the one being dragged — keep visible
-                if item.label == label:
-                    ghost_sources.append(item)  # same label — use as ghost reference
-                    item.setVisible(False)     # hide original
-                    self.hidden_blocks.append(item)
-                else:
-                    item.setVisible(False)     # unrelated — hide
-                    self.hidden_blocks.append(item)
-
-        index = self.sheet_tabs.currentIndex()
-        cuts = self.sheet_data[index]["cuts"]
+        for g in self.ghosts:
+            self.scene.removeItem(g)
+        self.ghosts = []
+        self.ghost_state = None
 
-        # Step 1: Rebuild reordered cut list
-        old_idx = next(
-            (i for i, c in enumerate(cuts)
-            if len(c) == 5 and (f"{c[2]} x {c[3]}" == label or f"{c[2]} x {c[3]} - Bracket" == label)),
-            None
-        )
-        if old_idx is None:
-            return
-
-        items = [item for item in self.scene.items() if isinstance(item, QGraphicsRectItem) and hasattr(item, "label")]
-        item_map = [(item.sceneBoundingRect().center().y(), item.label) for item in items]
-        item_map.sort(key=lambda x: x[0])
-
-        drop_y = pos.y()
-        insert_idx = next((i for i, (cy, _) in enumerate(item_map) if drop_y < cy), len(item_map))
-
-        # Count how many times this label occurs in cuts
-        label_full = label
-        label_total = sum(
-            1 for c in cuts
-            if f"{c[2]} x {c[3]}" == label or f"{c[2]} x {c[3]} - Bracket" == label
-        )
-
-        # Remove all copies of this label from visual label list
-        visual_labels = [lbl for _, lbl in item_map if lbl != label_full]
-
-        # Insert all copies of the dragged label at the calculated position
-        for _ in range(label_total):
-            visual_labels.insert(insert_idx, label_full)
+        # Unhide real layout blocks
+        for item in self.hidden_blocks:
+            item.setVisible(True)
+        self.hidden_blocks = []
 
-        label_counter = Counter(visual_labels)
-        used_cuts = Counter()
-        simulated_cuts = []
+    def clear_canvas(self):
+        """Empty the scene and forget every item that pointed into it."""
+        self.scene.clear()
+        self.canvas.resetTransform()
+        self.block_items = []
+        self.ghosts = []
+        self.hidden_blocks = []
+        self.ghost_state = None
+        self.summary_item = None
+        self.summary_key = None
+        self.shear_items = []
+        self.canvas_sheet = None
+
+    def cut_label(self, cut):
+        return f"{cut[2]} x {cut[3]}"
+
+    def cuts_to_rectangles(self, cuts):
+        """Sheet cuts → (w, h, label, is_bracket) pieces in the same order."""
+        return [
+            (self.parse_inches(c[2]), self.parse_inches(c[3]), self.cut_label(c), c[4])
+            for c in cuts if len(c) == 5
+        ]
 
-        # Make a working copy of cuts we can iterate multiple times
-        remaining_cuts = cuts.copy()
+    def drop_order(self, cuts, label, drop_y):
+        """
+        Cut order after dropping `label` at scene height drop_y: the blocks
+        top to bottom, with every cut of that label moved to the drop point.
+        Cuts that are not on the sheet keep their place at the end.
+        Returns (new_cuts, insert_index).
+        """
+        centers = sorted((item.sceneBoundingRect().center().y(), item.label) for item in self.block_items)
+        insert_idx = next((i for i, (cy, _) in enumerate(centers) if drop_y < cy), len(centers))
 
-        for lbl in visual_labels:
-            for i, c in enumerate(remaining_cuts):
-                if c is None:
-                    continue
-                label_c = f"{c[2]} x {c[3]}"
-                if c[4]:
-                    label_c += " - Bracket"
+        by_label = defaultdict(deque)
+        others = []
+        for c in cuts:
+            if len(c) == 5:
+                by_label[self.cut_label(c)].append(c)
+            else:
+                others.append(c)
+        moved = list(by_label.pop(label, ()))
 
-                if label_c == lbl and used_cuts[label_c] < label_counter[label_c]:
-                    simulated_cuts.append(c)
-                    used_cuts[label_c] += 1
-                    remaining_cuts[i] = None  # Mark this cut as used
-                    break  # Move to next lbl
+        order = [by_label[lbl].popleft() for _, lbl in centers if lbl != label and by_label.get(lbl)]
+        insert_idx = min(insert_idx, len(order))
+        order[insert_idx:insert_idx] = moved
+        order.extend(c for queue in by_label.values() for c in queue)
+        return order + others, insert_idx
 
-        # Step 2: Build rectangles from simulated cuts
-        rectangles = [
-            (
-                self.parse_inches(c[2]),
-                self.parse_inches(c[3]),
-                f"{c[2]} x {c[3]}",
-                c[4]
-            )
-            for c in simulated_cuts
-        ]
+    def relayout(self, sheet_w, sheet_h, rectangles, fallback_allowed=True):
+        """
+        run_nesting for a reordered cut list: with the skyline engine only the
+        pieces from the first changed position on are placed again.
+        """
+        key = self.engine_dropdown.currentData() or DEFAULT_ENGINE
+        if key != SkylineEngine.key:
+            return self.run_nesting(sheet_w, sheet_h, rectangles, fallback_allowed=fallback_allowed)
+
+        kerf = self.kerf_inches()
+        if self.incremental is None or not self.incremental.matches(sheet_w, sheet_h, kerf):
+            self.incremental = IncrementalSkyline(sheet_w, sheet_h, kerf=kerf)
+        used, unplaced = self.incremental.layout(rectangles)
+        if unplaced and fallback_allowed:
+            return self.run_nesting(sheet_w, sheet_h, rectangles, fallback_allowed=True)
+        self.last_cut_tree = None
+        return used, unplaced
 
+    def show_ghost_preview(self, pos, label, block):
+        index = self.sheet_tabs.currentIndex()
         sheet_info = self.sheet_data.get(index, {})
         sheet_w = sheet_info.get("sheet_width")
         sheet_h = sheet_info.get("sheet_height")
-        if not sheet_w or not sheet_h:
+        if not sheet_w or not sheet_h or not self.block_items:
             return
 
-        canvas_h = 700
-        scale = canvas_h / sheet_h
+        new_cuts, insert_idx = self.drop_order(sheet_info.get("cuts", []), label, pos.y())
+        # Most mouse moves don't change where the block would land
+        if self.ghost_state == (label, insert_idx):
+            return
+        self.ghost_state = (label, insert_idx)
+
+        # Hide the real layout (except the block being dragged) while previewing
+        if not self.hidden_blocks:
+            self.current_drag_block = block
+            for item in self.block_items:
+                if item is not block:
+                    item.setVisible(False)
+                    self.hidden_blocks.append(item)
 
-        layout, _ = self.place_rectangles(sheet_w, sheet_h, rectangles, fallback_allowed=False)
-
-        self.ghosts = []  # Reset
-        for x, y, w, h, lbl, is_bracket in layout:
-            block = QGraphicsRectItem(x * scale, y * scale, w * scale, h * scale)
-            block.setZValue(100)
-            block.setBrush(QBrush(QColor(100, 100, 255, 40)))
-            block.setPen(QPen(Qt.darkBlue, 1))
-            block.setFlag(QGraphicsItem.ItemIsMovable, False)
-            block.setFlag(QGraphicsItem.ItemIsSelectable, False)
-            self.scene.addItem(block)
-            self.ghosts.append(block)
-
-            # Label
-            label_item = QGraphicsTextItem(lbl, block)
-            font_size = max(6, min(14, int(min(w, h) * scale * 0.2)))
-            label_item.setFont(QFont("Arial", font_size))
-            label_item.setDefaultTextColor(QColor(30, 30, 30, 120))  # faded black
-            label_item.setZValue(101)
-
-            label_rect = label_item.boundingRect()
-            if h > w:
-                transform = QTransform()
-                transform.translate((x + w / 2) * scale, (y + h / 2) * scale)
-                transform.rotate(-90)
-                transform.translate(-label_rect.width() / 2, -label_rect.height() / 2)
-                label_item.setTransform(transform)
-            else:
-                label_item.setPos((x + w / 2) * scale - label_rect.width() / 2,
-                                (y + h / 2) * scale - label_rect.height() / 2)
+        layout, _ = self.relayout(sheet_w, sheet_h, self.cuts_to_rectangles(new_cuts), fallback_allowed=False)
+        self.update_ghosts(layout)
 
-            # Bracket diagonal
-            if is_bracket:
-                x_px = x * scale
-                y_px = y * scale
-                w_px = w * scale
-                h_px = h * scale
-                offset = 15
-
-                if w_px > h_px:
-                    x1 = x_px
-                    y1 = y_px + offset
-                    x2 = x_px + w_px
-                    y2 = y_px + h_px - offset
-                else:
-                    x1 = x_px + w_px - offset
-                    y1 = y_px
-                    x2 = x_px + offset
-                    y2 = y_px + h_px
+    def update_ghosts(self, layout):
+        """Move the pooled ghost blocks onto `layout`; unchanged ones are not touched."""
+        for i, rect in enumerate(layout):
+            if i < len(self.ghosts):
+                ghost = self.ghosts[i]
+                if ghost.layout_rect == rect:
+                    continue
+            else:
+                ghost = QGraphicsRectItem()
+                ghost.setZValue(100)
+                ghost.setBrush(QBrush(QColor(100, 100, 255, 40)))
+                ghost.setPen(QPen(Qt.darkBlue, 1))
+                ghost.setFlag(QGraphicsItem.ItemIsMovable, False)
+                ghost.setFlag(QGraphicsItem.ItemIsSelectable, False)
+                self.scene.addItem(ghost)
+                self.ghosts.append(ghost)
+            self.apply_block_rect(ghost, rect, self.canvas_scale, text_color=QColor(30, 30, 30, 120))
+
+        for ghost in self.ghosts[len(layout):]:
+            self.scene.removeItem(ghost)
+        del self.ghosts[len(layout):]
+
+    def apply_block_rect(self, item, rect, scale, text_color=Qt.black):
+        """Put a block (real or ghost) on `rect`, with its centred label and bracket diagonal."""
+        x, y, w, h, label, is_bracket = rect
+        item.setPos(0, 0)
+        item.setRect(x * scale, y * scale, w * scale, h * scale)
+        item.label = label
+        item.layout_rect = rect
+
+        label_item = getattr(item, "label_item", None)
+        if label_item is None:
+            label_item = BlockLabel(item, text_color)
+            item.label_item = label_item
+        font_size = max(6, min(14, int(min(w, h) * scale * 0.2)))
+        # Tall blocks get the label turned -90 around the center
+        label_item.set_label(label, item.rect(), font_size, turned=h > w)
+
+        # Diagonal if bracket (a child, so it travels with the block while dragging)
+        line = getattr(item, "bracket_line", None)
+        if is_bracket:
+            x_px = x * scale
+            y_px = y * scale
+            w_px = w * scale
+            h_px = h * scale
+            offset = 15
+
+            if w_px > h_px:
+                x1, y1, x2, y2 = x_px, y_px + offset, x_px + w_px, y_px + h_px - offset
+            else:
+                x1, y1, x2, y2 = x_px + w_px - offset, y_px, x_px + offset, y_px + h_px
 
-                line = QGraphicsLineItem(x1, y1, x2, y2)
+            if line is None:
+                line = QGraphicsLineItem(item)
                 line.setPen(QPen(QColor("#2c3e50"), 1.5, Qt.SolidLine))
-                self.scene.addItem(line)
-                self.ghosts.append(line)
-
+                item.bracket_line = line
+            line.setLine(x1, y1, x2, y2)
+            line.setVisible(True)
+        elif line is not None:
+            line.setVisible(False)
 
-            
     def live_reorder_blocks(self, pos, label):
         try:
             index = self.sheet_tabs.currentIndex()
             cuts = self.sheet_data[index]["cuts"]
 
-            # Step 1: Get current cut index
-            old_idx = next(
-                (i for i, c in enumerate(cuts)
-                if len(c) == 5 and (f"{c[2]} x {c[3]}" == label or f"{c[2]} x {c[3]} - Bracket" == label)),
-                None
-            )
-            if old_idx is None:
-                return
-
-            # Step 2: Get visual center Y of all items
-            items = [item for item in self.scene.items() if isinstance(item, QGraphicsRectItem)]
-            item_map = []
-
-            for item in items:
-                if hasattr(item, "label"):
-                    center_y = item.sceneBoundingRect().center().y()
-                    item_map.append((center_y, item.label))
-
-            # Step 3: Sort visually top-to-bottom
-            item_map.sort(key=lambda x: x[0])
-
-            drop_y = pos.y()
-            insert_idx = 0
-            for i, (cy, lbl) in enumerate(item_map):
-                if drop_y < cy:
-                    insert_idx = i
-                    break
-                insert_idx = i + 1
-
-            # Rebuild label order
-            label_full = label
-            label_total = sum(
-                1 for c in cuts
-                if f"{c[2]} x {c[3]}" == label or f"{c[2]} x {c[3]} - Bracket" == label
-            )
-
-            # Remove all existing occurrences of the label from visual list
-            visual_labels = [lbl for _, lbl in item_map if lbl != label_full]
-
-            # Insert all instances at drop index
-            for _ in range(label_total):
-                visual_labels.insert(insert_idx, label_full)
-
-            # Build new cuts list from label order
-            new_cuts = []
-            for lbl in visual_labels:
-                match = next((c for c in cuts if f"{c[2]} x {c[3]}" == lbl or f"{c[2]} x {c[3]} - Bracket" == lbl), None)
-                if match:
-                    new_cuts.append(match)
-
-            # Replace cuts list and redraw layout
+            new_cuts, _ = self.drop_order(cuts, label, pos.y())
             self.sheet_data[index]["cuts"] = new_cuts
-            self.simulate_cutting()
+            self.cancel_nesting()
+            if not self.patch_canvas(new_cuts):
+                self.simulate_cutting()
 
         except Exception as e:
             print("Live reorder error:", e)
 
+    def patch_canvas(self, cuts):
+        """
+        Lay the current sheet out again after a reorder with the incremental
+        skyline. False if that is not possible (other engine, a piece needs
+        the row-fill fallback, no sheet drawn) and a full nesting is needed.
+        """
+        sheet_info = self.sheet_data.get(self.sheet_tabs.currentIndex(), {})
+        sheet_w = sheet_info.get("sheet_width")
+        sheet_h = sheet_info.get("sheet_height")
+        if not self.block_items or self.canvas_sheet != (sheet_w, sheet_h):
+            return False
+        if (self.engine_dropdown.currentData() or DEFAULT_ENGINE) != SkylineEngine.key:
+            return False
+
+        used, unplaced = self.relayout(sheet_w, sheet_h, self.cuts_to_rectangles(cuts), fallback_allowed=False)
+        if not used or unplaced:
+            return False
+        self.draw_canvas(sheet_w, sheet_h, used, cut_tree=self.last_cut_tree)
+        self.update_cut_list(cuts, used)
+        context = (self.sheet_tabs.currentIndex(), sheet_w, sheet_h, cuts)
+        self.remember_layout(context, used, self.last_cut_tree, SkylineEngine.key, self.kerf_inches())
+        return True
 
     def handle_block_drop(self, pos, label):
         self.live_reorder_blocks(pos, label)
@@ -1233,14 +1508,41 @@ class ManufacturingModule(QWidget):
         #     print("Drag reorder error (smart snap):", e)
 
 
-    def draw_canvas(self, sheet_w, sheet_h, rects):
-        self.scene.clear()
-        self.canvas.resetTransform()
-
+    def draw_canvas(self, sheet_w, sheet_h, rects, cut_tree=None, waste_blocks=None):
+        """
+        Retained drawing: the sheet (grid, outline, title) is drawn once per
+        sheet size; blocks, shear lines and the summary are diffed against
+        what is already on the scene, so a redraw costs what changed.
+        """
         canvas_h = 700
         scale = canvas_h / sheet_h
         canvas_w = sheet_w * scale
 
+        if self.canvas_sheet != (sheet_w, sheet_h):
+            self.clear_canvas()
+            self.draw_sheet_background(sheet_w, sheet_h, scale)
+            self.canvas_sheet = (sheet_w, sheet_h)
+            self.canvas_scale = scale
+        self.remove_ghost()
+
+        self.sync_blocks(rects, scale)
+
+        # Guillotine shear lines (dashed, darker for earlier stages)
+        shear_cuts = cut_sequence(cut_tree) if cut_tree is not None and rects else []
+        self.sync_shear_lines(shear_cuts, scale)
+
+        # Summary (waste scan only when the layout changed)
+        summary_key = (tuple(map(tuple, rects)), tuple(shear_cuts))
+        if summary_key != self.summary_key:
+            self.summary_item.setPlainText(self.canvas_summary(sheet_w, sheet_h, rects, shear_cuts, waste_blocks))
+            self.summary_key = summary_key
+
+        self.canvas.setSceneRect(-20, -60, canvas_w + 250, sheet_h * scale + 100)
+
+    def draw_sheet_background(self, sheet_w, sheet_h, scale):
+        canvas_h = sheet_h * scale
+        canvas_w = sheet_w * scale
+
         # Subtle background grid every 6 inches (horizontal + vertical)
         grid_pen = QPen(QColor("#ecf0f1"), 1, Qt.DotLine)
         for y in range(0, int(sheet_h) + 1, 6):
@@ -1262,68 +1564,73 @@ class ManufacturingModule(QWidget):
         sheet_rect.setPen(QPen(Qt.black, 2))
         self.scene.addItem(sheet_rect)
 
-        used_area = 0
-        index = self.sheet_tabs.currentIndex()
-        cuts_with_labels = self.sheet_data.get(index, {}).get("cuts", [])
-
-        for i, (x, y, w, h, label, is_bracket) in enumerate(rects):
-            used_area += w * h
-            rect_item = DraggableBlock(x, y, w, h, label, is_bracket, scale, callback=self.on_block_event)
-            rect_item.setBrush(QBrush(QColor("#74b9ff")))
-            rect_item.setPen(QPen(Qt.darkBlue, 1))
-            self.scene.addItem(rect_item)
-
-            # Match original cut label
-            original_label = label
-            
+        # Summary text, filled in by draw_canvas
+        info = QGraphicsTextItem()
+        info.setDefaultTextColor(Qt.darkRed)
+        info.setFont(QFont("Arial", 9))
+        info.setPos(canvas_w + 20, 10)
+        self.scene.addItem(info)
+        self.summary_item = info
 
-            min_dim = min(w, h)
-            font_size = max(6, min(14, int(min_dim * scale * 0.2)))
+        # Title
+        title = QGraphicsTextItem("Sheet Cutting Visualization")
+        title.setFont(QFont("Arial", 14, QFont.Bold))
+        title.setDefaultTextColor(Qt.darkBlue)
+        title.setPos(10, -30)
+        self.scene.addItem(title)
 
-            label = QGraphicsTextItem(original_label, rect_item)
-            label.setAcceptedMouseButtons(Qt.NoButton)
-            font = QFont("Arial", font_size)
-            label.setFont(font)
-            label.setDefaultTextColor(Qt.black)
-            label.setZValue(10)
-
-            label_rect = label.boundingRect()
-
-            if h > w:
-                # Rotate -90 around center
-                transform = QTransform()
-                transform.translate((x + w / 2) * scale, (y + h / 2) * scale)
-                transform.rotate(-90)
-                transform.translate(-label_rect.width() / 2, -label_rect.height() / 2)
-                label.setTransform(transform)
+    def sync_blocks(self, rects, scale):
+        """Keep blocks already on their spot, move reused ones onto the rest, add/remove the difference."""
+        in_place = defaultdict(deque)
+        spare = []
+        for item in self.block_items:
+            if item.pos().isNull():
+                in_place[item.layout_rect].append(item)
             else:
-                label.setPos((x + w / 2) * scale - label_rect.width() / 2,
-                            (y + h / 2) * scale - label_rect.height() / 2)
-
-            # Draw diagonal if bracket
-            if is_bracket:
-                x_px = x * scale
-                y_px = y * scale
-                w_px = w * scale
-                h_px = h * scale
-                offset = 15
-
-                if w_px > h_px:
-                    x1 = x_px
-                    y1 = y_px + offset
-                    x2 = x_px + w_px
-                    y2 = y_px + h_px - offset
-                else:
-                    x1 = x_px + w_px - offset
-                    y1 = y_px
-                    x2 = x_px + offset
-                    y2 = y_px + h_px
+                spare.append(item)      # dragged off its spot
+
+        items = [None] * len(rects)
+        todo = []
+        for i, rect in enumerate(rects):
+            queue = in_place.get(rect)
+            if queue:
+                items[i] = queue.popleft()
+            else:
+                todo.append(i)
+        spare.extend(item for queue in in_place.values() for item in queue)
 
-                line = QGraphicsLineItem(x1, y1, x2, y2)
-                line.setPen(QPen(QColor("#2c3e50"), 1.5, Qt.SolidLine))
+        for i in todo:
+            if spare:
+                item = spare.pop()
+            else:
+                x, y, w, h, label, is_bracket = rects[i]
+                item = DraggableBlock(x, y, w, h, label, is_bracket, scale, callback=self.on_block_event)
+                self.scene.addItem(item)
+            self.apply_block_rect(item, rects[i], scale)
+            items[i] = item
+
+        for item in spare:
+            self.scene.removeItem(item)
+        self.block_items = items
+
+    def sync_shear_lines(self, shear_cuts, scale):
+        stage_colors = {1: "#d63031", 2: "#e17055", 3: "#fdcb6e"}
+        for i, (stage, x1, y1, x2, y2) in enumerate(shear_cuts):
+            if i < len(self.shear_items):
+                line = self.shear_items[i]
+            else:
+                line = QGraphicsLineItem()
+                line.setZValue(20)
                 self.scene.addItem(line)
+                self.shear_items.append(line)
+            line.setLine(x1 * scale, y1 * scale, x2 * scale, y2 * scale)
+            line.setPen(QPen(QColor(stage_colors.get(stage, "#b2bec3")), 1.5, Qt.DashLine))
 
-        # === Summary ===
+        for line in self.shear_items[len(shear_cuts):]:
+            self.scene.removeItem(line)
+        del self.shear_items[len(shear_cuts):]
+
+    def canvas_summary(self, sheet_w, sheet_h, rects, shear_cuts=None, waste_blocks=None):
         # Count cut usage
         usage_counter = Counter()
         for i, (x, y, w, h, label, is_bracket) in enumerate(rects):
@@ -1340,11 +1647,17 @@ class ManufacturingModule(QWidget):
             for label, count in usage_counter.items():
                 lines.append(f"  {label} = {count}")
 
-        # ✅ Add spacing + waste block sizes if any
-        if rects:
-            waste_blocks = self.find_all_waste_blocks(int(sheet_w), int(sheet_h), rects)
-        else:
-            waste_blocks = []
+        if shear_cuts:
+            per_stage = Counter(stage for stage, *_ in shear_cuts)
+            lines.append("")
+            lines.append(f"Shear cuts: {len(shear_cuts)}")
+            for stage in sorted(per_stage):
+                lines.append(f"  Stage {stage} = {per_stage[stage]}")
+
+        # ✅ Add spacing + waste block sizes if any (a saved plan brings its own)
+        if waste_blocks is None:
+            waste_blocks = (self.find_all_waste_blocks(sheet_w, sheet_h, rects, min_size=leftovers.MIN_LEFTOVER)
+                            if rects else [])
 
         if waste_blocks:
             lines.append("")
@@ -1353,76 +1666,12 @@ class ManufacturingModule(QWidget):
                 h_str = self.to_mixed_fraction(h)
                 lines.append(f"Waste Block {i}: {w_str} x {h_str} inch")
 
-        # Render summary
-        info = QGraphicsTextItem("\n".join(lines))
-        info.setDefaultTextColor(Qt.darkRed)
-        info.setFont(QFont("Arial", 9))
-        info.setPos(canvas_w + 20, 10)
-        self.scene.addItem(info)
-
-        # Title
-        title = QGraphicsTextItem("Sheet Cutting Visualization")
-        title.setFont(QFont("Arial", 14, QFont.Bold))
-        title.setDefaultTextColor(Qt.darkBlue)
-        title.setPos(10, -30)
-        self.scene.addItem(title)
+        return "\n".join(lines)
 
-        self.canvas.setSceneRect(-20, -60, canvas_w + 250, sheet_h * scale + 100)
-        
     def auto_optimize_sheet(self, sheet_w, sheet_h, rectangles):
-        def dp_find_best_row(pieces, max_width):
-            n = len(pieces)
-            dp = [{} for _ in range(n + 1)]
-            dp[0][0] = (0, [])
-
-            for i in range(1, n + 1):
-                w0, h0, label, is_bracket = pieces[i - 1]
-                orientations = [(w0, h0), (h0, w0)]
-                for prev_w, (total, items) in dp[i - 1].items():
-                    for w, h in orientations:
-                        new_w = prev_w + w
-                        if new_w <= max_width:
-                            new_total = total + w
-                            new_items = items + [(w, h, label, is_bracket, i - 1)]
-                            if new_w not in dp[i] or dp[i][new_w][0] < new_total:
-                                dp[i][new_w] = (new_total, new_items)
-                    if prev_w not in dp[i] or dp[i][prev_w][0] < total:
-                        dp[i][prev_w] = (total, items)
-
-            best_total = 0
-            best_items = []
-            for total, items in dp[n].values():
-                if total > best_total:
-                    best_total = total
-                    best_items = items
-
-            if not best_items:
-                return None
+        # Best-width rows via a 1/16" bounded-knapsack DP (identical cuts grouped)
+        return rowfill.fill_rows(sheet_w, sheet_h, rectangles)
 
-            used_indexes = [idx for *_, idx in best_items]
-            used_items = [pieces[i] for i in used_indexes]
-            row = [item[:4] for item in best_items]
-            return used_items, row
-
-        parsed = [tuple(cut) for cut in rectangles]
-        y_cursor = 0
-        layout = []
-
-        while parsed:
-            result = dp_find_best_row(parsed, sheet_w)
-            if not result:
-                break
-            used_items, row = result
-            row_height = max(h for _, h, _, _ in row)
-            if y_cursor + row_height > sheet_h:
-                break
-            layout.extend(row)
-            for item in used_items:
-                parsed.remove(item)
-            y_cursor += row_height
-
-        return [(w, h, label, is_bracket) for w, h, label, is_bracket in layout]
-        
     # def place_rectangles(self, sheet_w, sheet_h, rectangles, fallback_allowed=True):
     #     used = []
     #     current_y = 0
@@ -1525,74 +1774,228 @@ class ManufacturingModule(QWidget):
     #                     break
         
         
-    def place_rectangles(self, sheet_w, sheet_h, rectangles, fallback_allowed=True):
-        from math import ceil
+    def run_nesting(self, sheet_w, sheet_h, rectangles, fallback_allowed=True, ordered=True):
+        """Lay out cuts with the engine picked in the UI, on this thread (skyline keeps the DP fallback)."""
+        job = self.make_nest_job(sheet_w, sheet_h, rectangles, fallback_allowed=fallback_allowed, ordered=ordered)
+        cache_key = job.cache_key()
+        result = shared_cache().get(cache_key)
+        if result is None:
+            result = job.run()
+            shared_cache().put(cache_key, *result)
+        used, unplaced, self.last_cut_tree = result
+        return used, unplaced
 
-        used = []
-        unplaced = []
-        step = 0.125        # Resolution (1/8 inch)
-        kerf = 0.0          # Space between cuts
+    def run_portfolio_layout(self):
+        """Start (or stop) a portfolio search for the current tab; results stream in via poll_portfolio."""
+        if self.portfolio_run and not self.portfolio_run.done:
+            self.portfolio_run.cancel()
+            return
 
-        map_width = int(sheet_w / step)
-        height_map = [0.0] * map_width  # Stores Y-height at each X-step
+        index = self.item_dropdown.currentIndex()
+        if index < 0 or self.is_pipe_selected():
+            QMessageBox.warning(self, "No Sheet Selected", "Please select a raw sheet item.")
+            return
 
-        def fits_at(x_idx, w_steps, rect_w, rect_h):
-            x = x_idx * step
-            max_y = max(height_map[x_idx:x_idx + w_steps])
-            if max_y + rect_h > sheet_h:
-                return None
-            return x, max_y  # x and y position to place
-
-        def update_height_map(x_idx, w_steps, new_top):
-            for i in range(x_idx, x_idx + w_steps):
-                height_map[i] = new_top
-
-        def try_place(w, h):
-            w_steps = int(ceil((w + kerf) / step))
-            best_x_idx = None
-            best_y = None
-
-            for x_idx in range(0, map_width - w_steps + 1):
-                result = fits_at(x_idx, w_steps, w, h)
-                if result:
-                    x, y = result
-                    if best_y is None or y < best_y or (y == best_y and x < best_x_idx * step):
-                        best_x_idx = x_idx
-                        best_y = y
-
-            if best_x_idx is not None:
-                x = best_x_idx * step
-                y = best_y
-                update_height_map(best_x_idx, w_steps, y + h + kerf)
-                return x, y
-            return None
+        try:
+            sheet_w, sheet_h = self.sheet_size_inches(self.item_dropdown.itemData(index))
+        except (TypeError, ValueError):
+            QMessageBox.warning(self, "Invalid Sheet", "Raw item has no usable sheet dimensions.")
+            return
 
-        for w, h, label, is_bracket in rectangles:
-            placed = False
+        tab = self.sheet_tabs.currentIndex()
+        cuts = [c for c in self.sheet_data.get(tab, {}).get("cuts", []) if len(c) == 5]
+        if not cuts:
+            return
+        rectangles = [(self.parse_inches(c[2]), self.parse_inches(c[3]), f"{c[2]} x {c[3]}", c[4]) for c in cuts]
 
-            # Try original orientation
-            pos = try_place(w, h)
+        self.cancel_nesting()
+        self.portfolio_run = PortfolioRun(
+            sheet_w, sheet_h, rectangles, kerf=self.kerf_inches(), budget=self.budget_input.value()
+        )
+        self.portfolio_context = (tab, sheet_w, sheet_h, cuts)
+        self.portfolio_btn.setText("⏹ Stop")
+        self.portfolio_status.setText("⏳ Searching...")
+        self.portfolio_timer.start()
+
+    def cancel_portfolio(self):
+        # poll_portfolio sees it done on its next tick and resets the button
+        if self.portfolio_run is not None and not self.portfolio_run.done:
+            self.portfolio_run.cancel()
+
+    def portfolio_is_current(self):
+        """True while the portfolio's tab is shown with the sheet and cuts it was started for."""
+        tab, sheet_w, sheet_h, cuts = self.portfolio_context
+        if tab != self.sheet_tabs.currentIndex():
+            return False
+        sheet = self.sheet_data.get(tab) or {}
+        size = (sheet.get("sheet_width", sheet_w), sheet.get("sheet_height", sheet_h))
+        return self.layout_key(*size, sheet.get("cuts", [])) == self.layout_key(sheet_w, sheet_h, cuts)
+
+    def poll_portfolio(self):
+        run = self.portfolio_run
+        if run is None:
+            self.portfolio_timer.stop()
+            return
 
-            # Try rotated
-            if not pos and w != h:
-                pos = try_place(h, w)
-                if pos:
-                    w, h = h, w  # apply rotation
+        tab, sheet_w, sheet_h, cuts = self.portfolio_context
+        current = self.portfolio_is_current()
+        if not current:
+            run.cancel()    # other sheet shown, or its cuts changed; don't draw over it
+
+        better = run.poll()
+        if better is not None and current:
+            self.last_cut_tree = better.tree
+            self.draw_canvas(sheet_w, sheet_h, better.used, cut_tree=better.tree)
+            self.update_cut_list(cuts, better.used)
+            self.remember_layout(self.portfolio_context, better.used, better.tree, better.candidate[0], run.kerf)
+
+        best = run.best
+        summary = f"{run.tried}/{run.total} tried · {run.elapsed:.1f}s"
+        if best is not None:
+            engine, ordering, rotation = best.candidate
+            summary = f"Best {best.yield_ratio * 100:.1f}% ({ENGINES[engine].title} · {ordering} · {rotation}) · " + summary
+            if run.optimal:
+                summary = "Optimal · " + summary
+            else:
+                summary += f" · bound {run.yield_bound * 100:.1f}%"
+        self.portfolio_status.setText(("✅ " if run.done else "⏳ ") + summary)
 
-            if pos:
-                x, y = pos
-                used.append((x, y, w, h, label, is_bracket))
-                placed = True
+        if run.done:
+            self.portfolio_timer.stop()
+            self.portfolio_btn.setText("🏁 Find Best Layout")
 
-            # Fallback optimizer
-            if not placed and fallback_allowed:
-                optimized = self.auto_optimize_sheet(sheet_w, sheet_h, rectangles)
-                return self.place_rectangles(sheet_w, sheet_h, optimized, fallback_allowed=False)
+    def nest_whole_order(self):
+        """Pack every tab that uses the current raw item together and report the sheet count."""
+        index = self.item_dropdown.currentIndex()
+        if index < 0 or self.is_pipe_selected():
+            QMessageBox.warning(self, "No Sheet Selected", "Please select a raw sheet item.")
+            return
 
-            if not placed:
-                unplaced.append(label)
+        item_data = self.item_dropdown.itemData(index)
+        variant_key = lambda raw: f"{raw.get('id')}|{raw.get('branch')}|{raw.get('color')}|{raw.get('condition')}"
+        target = variant_key(item_data)
 
-        return used, unplaced
+        try:
+            sheet_w, sheet_h = self.sheet_size_inches(item_data)
+        except (TypeError, ValueError):
+            QMessageBox.warning(self, "Invalid Sheet", "Raw item has no usable sheet dimensions.")
+            return
+
+        # Each tab's layout is cut raw_qty times, so its pieces repeat raw_qty times
+        pieces = []
+        tabs = []
+        planned_sheets = 0
+        for tab_index in sorted(self.sheet_data):
+            sheet = self.sheet_data[tab_index]
+            raw = sheet.get("raw_item") or {}
+            if not raw or variant_key(raw) != target:
+                continue
+            try:
+                repeat = max(1, int(float(sheet.get("raw_qty") or 1)))
+            except ValueError:
+                repeat = 1
+            cuts = [c for c in sheet.get("cuts", []) if len(c) == 5]
+            if not cuts:
+                continue
+            tabs.append(f"Sheet {tab_index + 1}")
+            planned_sheets += repeat
+            for _ in range(repeat):
+                for c in cuts:
+                    pieces.append((self.parse_inches(c[2]), self.parse_inches(c[3]), f"{c[2]} x {c[3]}", c[4]))
+
+        if not pieces:
+            QMessageBox.information(self, "Nest Whole Order", "No cuts found for this raw item.")
+            return
+
+        use_remnants = self.remnant_toggle.isChecked()
+        if use_remnants and self.remnant_index is None:
+            self.load_remnant_index()
+
+        loader = self.show_loader(self, "Nesting Order", f"Packing {len(pieces)} cuts...")
+        try:
+            key = self.engine_dropdown.currentData() or DEFAULT_ENGINE
+            remnant_plan = None
+            if use_remnants and self.remnant_index is not None:
+                remnant_key = group_key(item_data.get("metal_type"), item_data.get("gauge"),
+                                        item_data.get("branch"), item_data.get("color"), item_data.get("condition"))
+                remnant_plan = plan_with_remnants(sheet_w, sheet_h, pieces, self.remnant_index, remnant_key,
+                                                  engine_key=key, kerf=self.kerf_inches())
+                plan = remnant_plan.order_plan
+            else:
+                plan = plan_order(sheet_w, sheet_h, pieces, engine_key=key, kerf=self.kerf_inches())
+        finally:
+            loader.close()
+
+        lines = [
+            f"Raw item: {item_data.get('name', '')} ({self.to_mixed_fraction(sheet_w)} x {self.to_mixed_fraction(sheet_h)})",
+            f"Tabs: {', '.join(tabs)}",
+            f"Cuts: {len(pieces)}",
+            "",
+            f"Sheets needed: {plan.sheets_needed}  (currently planned: {planned_sheets})",
+            f"Lower bound: {plan.lower_bound} sheets  "
+            + ("(optimal)" if plan.optimal else f"(gap {plan.sheet_gap})"),
+            f"Overall yield: {plan.total_yield * 100:.1f}%  [{plan.strategy.upper()}]",
+            "",
+        ]
+        if remnant_plan is not None:
+            if remnant_plan.uses:
+                lines.append(
+                    f"♻️ {remnant_plan.cuts_on_remnants} cuts on {len(remnant_plan.uses)} remnant sheet(s), "
+                    f"{remnant_plan.remnant_area / 144:.1f} sq ft"
+                )
+                lines.append(
+                    f"♻️ Full sheets: {remnant_plan.sheets_needed} instead of {remnant_plan.baseline.sheets_needed} "
+                    f"(saved {remnant_plan.sheets_saved})"
+                )
+                remnant_counts = Counter(id(u.remnant) for u in remnant_plan.uses)
+                listed = {id(u.remnant): u.remnant for u in remnant_plan.uses}
+                for n, (rid, remnant) in enumerate(listed.items()):
+                    if n == 5:
+                        lines.append(f"    … {len(listed) - 5} more remnants")
+                        break
+                    lines.append(
+                        f"    {remnant.ref.get('item_code', '')} {self.to_mixed_fraction(remnant.w)} x "
+                        f"{self.to_mixed_fraction(remnant.h)} × {remnant_counts[rid]}"
+                    )
+            else:
+                lines.append("♻️ No matching remnant in stock fits these cuts.")
+            lines.append("")
+
+        for n, sheet_plan in enumerate(plan.sheets, start=1):
+            leftovers = sheet_plan.leftovers()
+            lines.append(f"Sheet {n}: {len(sheet_plan.used)} cuts, yield {sheet_plan.yield_ratio * 100:.1f}%")
+            for x, y, w, h in leftovers[:3]:
+                lines.append(f"    leftover {self.to_mixed_fraction(w)} x {self.to_mixed_fraction(h)}")
+            if len(leftovers) > 3:
+                lines.append(f"    … {len(leftovers) - 3} more leftovers")
+        if plan.unplaced:
+            lines.append("")
+            lines.append(f"⚠️ Too large for this sheet: {', '.join(sorted(set(plan.unplaced)))}")
+
+        QMessageBox.information(self, "Nest Whole Order", "\n".join(lines))
+
+    def load_remnant_index(self):
+        """Index every in-stock "Waste Raw Material" sheet (one query for the whole subcategory)."""
+        loader = self.show_loader(self, "Loading", "Fetching remnant sheets...")
+        try:
+            store = catalog_store().ensure(max_age=STOCK_MAX_AGE)
+            waste_ids = [i for i, d in store.sub_categories().items() if d.get("name") == WASTE_SUBCATEGORY]
+            products = []
+            for sub_id in waste_ids:
+                for doc_id, data in store.products_in_sub(sub_id):
+                    data = dict(data)
+                    data["id"] = doc_id
+                    products.append(data)
+            self.remnant_index = RemnantIndex.from_products(products)
+        except Exception as e:
+            print("Remnant load error:", e)
+            self.remnant_index = None
+        finally:
+            loader.close()
+
+    def place_rectangles(self, sheet_w, sheet_h, rectangles, fallback_allowed=True, kerf=0.0):
+        # Skyline bottom-left with the row-fill fallback (Qt-free, also used by the nesting worker)
+        return jobs.place_rectangles(sheet_w, sheet_h, rectangles, fallback_allowed=fallback_allowed, kerf=kerf)
 
 
 
@@ -1601,16 +2004,13 @@ class ManufacturingModule(QWidget):
         self.subcategory_dropdown.clear()
         self.subcategory_dropdown.addItem("Select Raw Material Type")
         try:
-            raw_main_id = None
-            for doc in db.collection("product_main_categories").stream():
-                if doc.to_dict().get("name") == "Raw Material":
-                    raw_main_id = doc.id
-                    break
+            store = catalog_store().ensure()
+            raw_main_id = store.main_id("Raw Material")
             if not raw_main_id:
                 return
-            for doc in db.collection("product_sub_categories").where("main_id", "==", raw_main_id).stream():
-                data = doc.to_dict()
-                data["id"] = doc.id
+            for sub_id in store.sub_ids(raw_main_id):
+                data = dict(store.sub_categories()[sub_id])
+                data["id"] = sub_id
                 self.subcategories.append(data)
                 self.subcategory_dropdown.addItem(data.get("name", "Unnamed"))
         except Exception:
@@ -1632,67 +2032,69 @@ class ManufacturingModule(QWidget):
         self.item_dropdown.clear()
 
         try:
-            query = db.collection("products").where("sub_id", "==", subcat_id)
-            for doc in query.stream():
-                data = doc.to_dict()
-                base_id = doc.id
-                qty = data.get("qty", {})
-
-                for branch, colors in qty.items():
-                    for color, conditions in colors.items():
-                        for condition, amount in conditions.items():
-                            variant = data.copy()
-                            variant["id"] = base_id
-                            variant["branch"] = branch
-                            variant["color"] = color
-                            variant["condition"] = condition
-                            variant["available_qty"] = amount
-                            self.items.append(variant)
-
-                            # Get fields safely
-                            item_code = variant.get("item_code", "")
-                            name = variant.get("name", "Unnamed")
-                            length = variant.get("length", 0)
-                            length_unit = variant.get("length_unit", "")
-                            width = variant.get("width", 0)
-                            width_unit = variant.get("width_unit", "")
-                            metal_type = variant.get("metal_type", "").upper()
-
-                            label = (
-                                f"{item_code} - {name} "
-                                f"({length} {length_unit} x {width} {width_unit}) - "
-                                f"{metal_type} | {color} - {condition} ({branch}) - Q{amount}"
-                            )
-
-                            self.item_dropdown.addItem(label, variant)
+            for variant in self.sub_variants(subcat_id):
+                self.items.append(variant)
+
+                # Get fields safely
+                item_code = variant.get("item_code", "")
+                name = variant.get("name", "Unnamed")
+                length = variant.get("length", 0)
+                length_unit = variant.get("length_unit", "")
+                width = variant.get("width", 0)
+                width_unit = variant.get("width_unit", "")
+                metal_type = variant.get("metal_type", "").upper()
+
+                label = (
+                    f"{item_code} - {name} "
+                    f"({length} {length_unit} x {width} {width_unit}) - "
+                    f"{metal_type} | {variant['color']} - {variant['condition']} ({variant['branch']}) - Q{variant['available_qty']}"
+                )
+
+                self.item_dropdown.addItem(label, variant)
 
         except Exception as e:
             print("Error loading items:", e)
 
+    @staticmethod
+    def sub_variants(subcat_id):
+        """Every stock variant (product × branch × color × condition) of a subcategory."""
+        variants = []
+        store = catalog_store().ensure(max_age=STOCK_MAX_AGE)
+        for base_id, data in store.products_in_sub(subcat_id):
+            for branch, colors in data.get("qty", {}).items():
+                for color, conditions in colors.items():
+                    for condition, amount in conditions.items():
+                        variant = data.copy()
+                        variant["id"] = base_id
+                        variant["branch"] = branch
+                        variant["color"] = color
+                        variant["condition"] = condition
+                        variant["available_qty"] = amount
+                        variants.append(variant)
+        return variants
+
+    def tab_variants(self, sheet):
+        """sub_variants() of the subcategory a tab's raw item comes from."""
+        sub_id = (sheet.get("raw_item") or {}).get("sub_id")
+        if not sub_id:
+            sub_id = next((c["id"] for c in self.subcategories if c.get("name") == sheet.get("raw_subcat")), None)
+        return self.sub_variants(sub_id) if sub_id else []
+
 
     def load_products(self):
         self.products = []
         loader = self.show_loader(self, "Loading", "Fetching finished products...")
         try:
-            finished_main_id = None
-            for doc in db.collection("product_main_categories").stream():
-                if doc.to_dict().get("name") == "Finished Products":
-                    finished_main_id = doc.id
-                    break
+            store = catalog_store().ensure()
+            finished_main_id = store.main_id("Finished Products")
             if not finished_main_id:
                 return
 
-            finished_sub_ids = []
-            for doc in db.collection("product_sub_categories").where("main_id", "==", finished_main_id).stream():
-                finished_sub_ids.append(doc.id)
-
             # Load finished products directly without variants
-            for doc in db.collection("products").stream():
-                data = doc.to_dict()
-                data["id"] = doc.id
-
-                if data.get("sub_id") in finished_sub_ids:
-                    self.products.append(data)
+            for doc_id, data in store.products_in_main(finished_main_id):
+                data = dict(data)
+                data["id"] = doc_id
+                self.products.append(data)
 
             self.filter_products()
         except Exception as e:
@@ -1740,61 +2142,395 @@ class ManufacturingModule(QWidget):
         subcat_name = self.subcategory_dropdown.currentText().lower()
         return "pipe" in subcat_name or "tube" in subcat_name
 
+    def pipe_stock_options(self, item_data, variants=None):
+        """
+        Pipe lengths on hand that can stand in for the selected pipe: same
+        size, gauge and metal, same colour / condition, same branch, out of
+        `variants` (default: the items listed for the current subcategory).
+        The selected item comes first so its item code names its length.
+        """
+        keys = ("width", "width_unit", "gauge", "metal_type", "color", "condition", "branch")
+
+        def same_pipe(v):
+            return all(str(v.get(k, "")).strip().lower() == str(item_data.get(k, "")).strip().lower() for k in keys)
+
+        candidates = sorted(
+            (v for v in (self.items if variants is None else variants) if same_pipe(v)),
+            key=lambda v: v.get("id") != item_data.get("id")
+        ) or [item_data]
+
+        by_length = {}
+        for v in candidates:
+            try:
+                length = geometry.snap_down(geometry.to_inches(float(v.get("height", 0)), v.get("height_unit", "ft")))
+                qty = max(0, int(float(v.get("available_qty", 0) or 0)))
+            except (TypeError, ValueError):
+                continue
+            if length <= 0:
+                continue
+            key = round(length, 4)
+            if key in by_length:
+                by_length[key].qty += qty
+            else:
+                label = f"{round(length / 12, 2)} ft ({v.get('item_code', '')})"
+                by_length[key] = Stock(length, qty, ref=v, label=label)
+        return list(by_length.values())
+
     def simulate_pipe_cutting(self, item_data):
         try:
-            raw_height = float(item_data.get("height", 0))
-            height_unit = item_data.get("height_unit", "ft").lower()
+            tab = self.sheet_tabs.currentIndex()
+            cuts = self.sheet_data.get(tab, {}).get("cuts", [])
 
-            def convert_to_inches(val, unit):
-                if unit == "ft":
-                    return val * 12
-                elif unit == "mm":
-                    return val / 25.4
-                return val
+            # Each tab's cut list is cut raw_qty times
+            pipe_qty = 1
+            try:
+                pipe_qty = max(1, int(float(self.raw_qty_input.text())))
+            except (TypeError, ValueError):
+                pass
+            plan, short = self.plan_pipe_cuts(cuts, item_data, pipe_qty)
+            if tab in self.sheet_data:
+                # Keep the plan drawn for the tab so the order saves exactly what was shown
+                self.sheet_data[tab]["shown_pipe_plan"] = {
+                    "key": self.pipe_plan_key(cuts, item_data, pipe_qty), "plan": plan, "short": short,
+                }
 
-            pipe_h = convert_to_inches(raw_height, height_unit)
+            if plan.unplaced:
+                QMessageBox.warning(
+                    self, "Overcut",
+                    f"{len(plan.unplaced)} cut(s) are longer than any pipe in stock."
+                )
 
-            cuts = self.sheet_data.get(self.sheet_tabs.currentIndex(), {}).get("cuts", [])
-            cut_heights = []
+            if not plan.pipes:
+                self.show_empty_pipe(item_data)
+                return
 
-            for c in cuts:
-                try:
-                    if isinstance(c, (tuple, list)):
-                        if len(c) >= 1:
-                            val = str(c[0])
-                        else:
-                            continue
+            self.draw_pipe_plan(plan, item_data, pipe_qty, short)
+
+        except Exception as e:
+            print("Pipe simulation error:", e)
+
+    def pipe_plan_key(self, cuts, item_data, pipe_qty):
+        """Cuts, raw pipe, kerf and pipe count a pipe plan was made for."""
+        raw = tuple(str(item_data.get(k, "")) for k in ("id", "branch", "color", "condition"))
+        return (tuple(repr(c) for c in cuts), raw, self.kerf_inches(), pipe_qty)
+
+    def plan_pipe_cuts(self, cuts, item_data, pipe_qty=1, variants=None):
+        """
+        (CutPlan, short) for a tab's pipe cuts; short = planned on more pipes
+        than are in stock. `variants` as for pipe_stock_options().
+        """
+        pipe_cuts = []
+
+        for c in cuts:
+            try:
+                if isinstance(c, (tuple, list)):
+                    if len(c) >= 1:
+                        val = str(c[0])
+                        label = f"{c[1]}\"" if len(c) >= 2 else f"{c[0]}\""
                     else:
-                        val = str(c)
+                        continue
+                else:
+                    val = str(c)
+                    label = f"{c}\""
 
-                    h_inch = self.parse_inches(val)  # always in inches now
-                    cut_heights.append(h_inch)
-                except Exception as e:
-                    print("Cut parse error:", c, e)
-                    continue
+                h_inch = self.parse_inches(val)  # always in inches now
+                pipe_cuts.append((h_inch, label))
+            except Exception as e:
+                print("Cut parse error:", c, e)
+                continue
+        demand = pipe_cuts * pipe_qty
+
+        stocks = self.pipe_stock_options(item_data, variants)
+        kerf = self.kerf_inches()
+        plan = plan_cuts(demand, stocks, kerf=kerf)
+
+        # Not enough pipes on hand: show what it would take anyway
+        short = False
+        if plan.unplaced:
+            unlimited = [Stock(s.length, None, s.ref, s.label) for s in stocks]
+            relaxed = plan_cuts(demand, unlimited, kerf=kerf)
+            if len(relaxed.unplaced) < len(plan.unplaced):
+                plan, short = relaxed, True
+        return plan, short
+
+    # ---------- saved plans ----------
+    @staticmethod
+    def is_pipe_sheet(sheet):
+        subcat = str(sheet.get("raw_subcat") or "").lower()
+        return "pipe" in subcat or "tube" in subcat
+
+    def order_nest_job(self, sheet):
+        """NestJob a tab still needs before its plan can be saved; None if its drawn layout stands."""
+        raw = sheet.get("raw_item") or {}
+        cuts = sheet.get("cuts", [])
+        if not raw or not cuts or self.is_pipe_sheet(sheet):
+            return None
+        sheet_w, sheet_h = self.sheet_size_inches(raw)
+        shown = sheet.get("shown_layout")
+        if shown and shown["key"] == self.layout_key(sheet_w, sheet_h, cuts):
+            return None
+        # Never drawn, or the cuts changed since: nest with the current settings
+        return self.sheet_nest_job(sheet_w, sheet_h, cuts)[0]
 
-            segments = []
-            used = 0
-            for h in cut_heights:
-                if used + h > pipe_h:
-                    QMessageBox.warning(self, "Overcut", "Cut exceeds pipe length.")
-                    break
-                segments.append(h)
-                used += h
+    def nest_order_sheets(self, then):
+        """
+        Nest every tab order_nest_job() asks for on worker threads, behind a
+        progress dialog that can cancel, then call then({tab: (job, result)}).
+        Cancelling calls nothing.
+        """
+        nested, pending = {}, {}
+        for tab, sheet in self.sheet_data.items():
+            job = self.order_nest_job(sheet)
+            if job is None:
+                continue
+            result = shared_cache().get(job.cache_key())
+            if result is not None:
+                nested[tab] = (job, result)
+            else:
+                pending[job.id] = (tab, job)
+        if not pending:
+            then(nested)
+            return
 
-            remaining = pipe_h - used
-            if remaining > 0:
-                segments.append(remaining)
+        dialog = QProgressDialog("Nesting sheets for the order...", "Cancel", 0, len(pending), self)
+        dialog.setWindowTitle("Sending Order")
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        state = {"left": len(pending), "over": False}
+
+        def settle(job_id):
+            pending.pop(job_id, None)
+            state["left"] -= 1
+            dialog.setValue(dialog.maximum() - state["left"])
+            if state["left"] == 0 and not state["over"]:
+                state["over"] = True
+                dialog.close()
+                then(nested)
+
+        def on_progress(job_id, done, total):
+            if job_id in pending and not state["over"]:
+                dialog.setLabelText(f"Nesting sheet {pending[job_id][0] + 1}: {done}/{total} cuts...")
+
+        def on_finished(job_id, result):
+            if job_id not in pending:
+                return
+            tab, job = pending[job_id]
+            shared_cache().put(job.cache_key(), *result)
+            nested[tab] = (job, result)
+            settle(job_id)
 
-            self.draw_pipe_stack(segments)
+        def on_failed(job_id, message):
+            if job_id not in pending:
+                return
+            print("Nesting error:", message)      # that tab is saved without a plan
+            settle(job_id)
+
+        def on_cancel():
+            if state["over"]:
+                return
+            state["over"] = True
+            for _, job in pending.values():
+                job.cancel()
+
+        dialog.canceled.connect(on_cancel)
+        for _, job in list(pending.values()):
+            worker = NestingWorker(job, parent=self)
+            worker.progress.connect(on_progress)
+            worker.finished_ok.connect(on_finished)
+            worker.failed.connect(on_failed)
+            worker.finished.connect(lambda w=worker: self.forget_nest_worker(w))
+            self.nest_workers.add(worker)
+            worker.start()
+        dialog.show()
+
+    def encode_sheet_plan(self, sheet, nested=None):
+        """
+        Compact final layout of one tab for the order document, or None if it
+        has nothing to cut. A tab saves the layout or pipe plan it drew; else
+        a sheet tab saves `nested` ((job, result) from nest_order_sheets) and
+        a pipe tab is planned again.
+        """
+        raw = sheet.get("raw_item") or {}
+        cuts = sheet.get("cuts", [])
+        if not raw or not cuts:
+            return None
+
+        if self.is_pipe_sheet(sheet):
+            try:
+                pipe_qty = max(1, int(float(sheet.get("raw_qty") or 1)))
+            except (TypeError, ValueError):
+                pipe_qty = 1
+            shown = sheet.get("shown_pipe_plan")
+            if shown and shown["key"] == self.pipe_plan_key(cuts, raw, pipe_qty):
+                plan, short = shown["plan"], shown["short"]
+            else:
+                # Never drawn, or changed since: plan against this tab's own pipe stock
+                plan, short = self.plan_pipe_cuts(cuts, raw, pipe_qty, self.tab_variants(sheet))
+            if not plan.pipes:
+                return None
+            diameter = geometry.to_inches(raw.get("width", 0), raw.get("width_unit", "inch"))
+            return plan_codec.encode_pipe_plan(plan, diameter, pipe_qty, short)
+
+        sheet_w, sheet_h = self.sheet_size_inches(raw)
+        shown = sheet.get("shown_layout")
+        if shown and shown["key"] == self.layout_key(sheet_w, sheet_h, cuts):
+            used, tree, engine, kerf = shown["used"], shown["tree"], shown["engine"], shown["kerf"]
+        elif nested is not None:
+            job, (used, _, tree) = nested
+            engine, kerf = job.engine_key, job.kerf
+        else:
+            return None
+        if not used:
+            return None
+        # Same leftovers the order viewer stocks when the order completes
+        waste = self.find_all_waste_blocks(sheet_w, sheet_h, used, min_size=leftovers.MIN_LEFTOVER)
+        return plan_codec.encode_sheet_layout(sheet_w, sheet_h, used, waste, tree, engine=engine, kerf=kerf)
+
+    def show_saved_plan(self, layout):
+        """Draw a plan saved on the order as-is: no nesting, no stock reads."""
+        if layout.get("kind") == "pipe":
+            plan, diameter, pipe_qty, short = plan_codec.decode_pipe_plan(layout)
+            self.draw_pipe_plan(plan, {"width": diameter, "width_unit": "inch"}, pipe_qty, short)
+            return
+        sheet_w, sheet_h, used, waste, tree = plan_codec.decode_sheet_layout(layout)
+        self.last_cut_tree = tree
+        self.draw_canvas(sheet_w, sheet_h, used, cut_tree=tree, waste_blocks=waste)
+
+    def show_empty_pipe(self, item_data):
+        height = geometry.to_inches(item_data.get("height", 0), item_data.get("height_unit", "ft"))
+        if height > 0:
+            self.draw_pipe_stack([height])
+
+    def draw_pipe_plan(self, plan, item_data, pipe_qty=1, short=False):
+        """Every distinct cutting pattern as a pipe side by side (× repeat), plus a stock summary."""
+        self.clear_canvas()
+
+        try:
+            pipe_diameter = geometry.to_inches(item_data.get("width", 0), item_data.get("width_unit", "inch"))
+
+            patterns = plan.patterns()
+            shown = patterns[:MAX_PIPE_PATTERNS]
+            longest = max(p.stock.length for p, _ in shown)
+
+            canvas_h = 700
+            scale = canvas_h / longest
+            visual_diameter = min(max(pipe_diameter * scale, 36), 80)
+            column_w = visual_diameter + 90
+            x_start = 70
+            y_offset = 70
+
+            segment_colors = [
+                "#00a8ff", "#9c88ff", "#fbc531", "#4cd137", "#e84118",
+                "#00cec9", "#fd79a8", "#e17055", "#fab1a0", "#6c5ce7"
+            ]
+            colors = {}
+
+            def color_for(length):
+                key = round(length, 4)
+                if key not in colors:
+                    colors[key] = QColor(segment_colors[len(colors) % len(segment_colors)])
+                return colors[key]
+
+            for col, (pipe, repeat) in enumerate(shown):
+                x = x_start + col * column_w
+                visual_length = pipe.stock.length * scale
+
+                header = QGraphicsTextItem(f"× {repeat}\n{pipe.stock.label}")
+                header.setFont(QFont("Arial", 9, QFont.Bold))
+                header.setDefaultTextColor(Qt.darkBlue)
+                header.setPos(x - 10, y_offset - 48)
+                self.scene.addItem(header)
+
+                shadow = QGraphicsRectItem(x + 4, y_offset + 4, visual_diameter, visual_length)
+                shadow.setBrush(QBrush(QColor(0, 0, 0, 40)))
+                shadow.setPen(QPen(Qt.NoPen))
+                self.scene.addItem(shadow)
+
+                body = QGraphicsRectItem(x, y_offset, visual_diameter, visual_length)
+                body.setBrush(QBrush(QColor("#dfe6e9")))
+                body.setPen(QPen(Qt.black, 2))
+                self.scene.addItem(body)
+
+                y_cursor = y_offset
+                for length, label in pipe.cuts:
+                    seg_px = length * scale
+                    cut = QGraphicsRectItem(x, y_cursor, visual_diameter, seg_px)
+                    cut.setBrush(QBrush(color_for(length)))
+                    cut.setPen(QPen(Qt.darkGray, 1))
+                    cut.setZValue(1)
+                    cut.setToolTip(label)
+                    self.scene.addItem(cut)
+
+                    if seg_px >= 14:
+                        text = QGraphicsTextItem(label)
+                        text.setDefaultTextColor(Qt.black)
+                        text.setFont(QFont("Arial", 8))
+                        text.setPos(x + visual_diameter + 4, y_cursor + seg_px / 2 - 9)
+                        self.scene.addItem(text)
+
+                    y_cursor += seg_px + pipe.kerf * scale
+
+                if pipe.remnant > 0:
+                    remnant_str = self.to_mixed_fraction(geometry.snap_down(pipe.remnant)) + '"'
+                    rem_px = pipe.remnant * scale
+                    rest = QGraphicsRectItem(x, y_offset + visual_length - rem_px, visual_diameter, rem_px)
+                    rest.setBrush(QBrush(QColor("#b2bec3"), Qt.BDiagPattern))
+                    rest.setPen(QPen(Qt.darkGray, 1, Qt.DashLine))
+                    rest.setZValue(1)
+                    rest.setToolTip(f"Leftover {remnant_str}")
+                    self.scene.addItem(rest)
+
+                    if rem_px >= 14:
+                        text = QGraphicsTextItem(f"↳ {remnant_str}")
+                        text.setDefaultTextColor(Qt.darkGray)
+                        text.setFont(QFont("Arial", 8))
+                        text.setPos(x + visual_diameter + 4, y_offset + visual_length - rem_px / 2 - 9)
+                        self.scene.addItem(text)
+
+            # Summary
+            stock_lines = [f"{stock.label}: {count}" for stock, count in plan.stock_counts()]
+            method = f"{plan.method} (optimal)" if plan.optimal else plan.method
+            legend_lines = [
+                f"Pipes Needed: {plan.pipes_needed}  (entered: {pipe_qty})",
+                *stock_lines,
+                "–",
+                f"Total Cuts: {sum(len(p.cuts) for p in plan.pipes)}",
+                f"Yield: {plan.yield_ratio * 100:.1f}%",
+                f"Scrap: {round(plan.scrap / 12, 2)} ft",
+                f"Leftovers ≥ 6\": {len(plan.remnants())}",
+                f"Plan: {method}",
+                f"Bound: {plan.bound[0]} pipes, {round(plan.bound[1] / 12, 2)} ft"
+                + ("" if plan.optimal else f" (gap {plan.pipe_gap} pipes, ≤ {plan.yield_bound * 100:.1f}% yield)"),
+            ]
+            if len(patterns) > len(shown):
+                legend_lines.append(f"+ {len(patterns) - len(shown)} more pattern(s) not drawn")
+            if short:
+                legend_lines.append("⚠ Not enough pipes in stock")
+            if plan.unplaced:
+                legend_lines.append(f"❌ {len(plan.unplaced)} cut(s) too long")
+
+            legend_x = x_start + len(shown) * column_w + 10
+            legend = QGraphicsTextItem("\n".join(legend_lines))
+            legend.setFont(QFont("Arial", 10))
+            legend.setDefaultTextColor(Qt.red if short or plan.unplaced else Qt.black)
+            legend.setPos(legend_x, y_offset)
+            self.scene.addItem(legend)
+
+            title = QGraphicsTextItem("Pipe Cutting Plan")
+            title.setFont(QFont("Arial", 14, QFont.Bold))
+            title.setDefaultTextColor(Qt.darkBlue)
+            title.setPos(20, -10)
+            self.scene.addItem(title)
+
+            self.canvas.setSceneRect(0, -20, legend_x + 260, y_offset + canvas_h + 60)
 
         except Exception as e:
-            print("Pipe simulation error:", e)
+            print("Pipe plan view error:", e)
 
-            
     def draw_pipe_stack(self, segments):
-        self.scene.clear()
-        self.canvas.resetTransform()
+        self.clear_canvas()
 
         try:
             index = self.item_dropdown.currentIndex()
@@ -1805,15 +2541,8 @@ class ManufacturingModule(QWidget):
             length_unit = item_data.get("height_unit", "ft").lower()
             diameter_unit = item_data.get("width_unit", "inch").lower()
 
-            def convert_to_inches(val, unit):
-                if unit == "ft":
-                    return val * 12
-                elif unit == "mm":
-                    return val / 25.4
-                return val
-
-            pipe_length_in = convert_to_inches(pipe_length, length_unit)
-            pipe_diameter_in = convert_to_inches(pipe_diameter, diameter_unit)
+            pipe_length_in = geometry.to_inches(pipe_length, length_unit)
+            pipe_diameter_in = geometry.to_inches(pipe_diameter, diameter_unit)
 
             # Canvas size and scaling
             canvas_h = 700
@@ -1976,29 +2705,10 @@ class ManufacturingModule(QWidget):
 
     def parse_inches(self, val):
         """
-        Converts strings like '60"', '60.25', '60 1/4"', or '1/2' to float inches.
+        Converts strings like '60"', '60.25', '60 1/4"', '1/2' or '1220mm' to
+        inches on the 1/16" grid (memoized in nesting.geometry).
         """
-        import re
-        from fractions import Fraction
-
-        val = val.replace('"', '').replace('inch', '').strip()
-
-        # First, try to directly parse float (handles "60", "60.0", "48.25")
-        try:
-            return float(val)
-        except ValueError:
-            pass
-
-        # Try fraction formats: "60 1/4" or just "1/4"
-        match = re.match(r"^(\d+)?(?:\s+)?(\d+/\d+)$", val)
-        if match:
-            whole = int(match.group(1)) if match.group(1) else 0
-            frac = Fraction(match.group(2))
-            return float(whole + frac)
-
-        # fallback
-        print(f"Invalid inch input: '{val}'")
-        return 0
+        return geometry.parse_inches(val)
     
     
     def send_to_manufacturing(self):
@@ -2094,9 +2804,14 @@ class ManufacturingModule(QWidget):
             if reply == QMessageBox.No:
                 return  # user cancelled the submission
 
+        # 2. Nest the tabs whose layout was never drawn (off the GUI thread), then save
+        self.nest_order_sheets(self.save_order)
+
+    def save_order(self, nested):
+        """Build the order's batches, with each tab's final plan, and upload it."""
         # 2. Build Batches
         batches = []
-        for sheet in self.sheet_data.values():
+        for tab, sheet in self.sheet_data.items():
             raw = sheet.get("raw_item", {})
             raw_ref = db.collection("products").document(raw.get("id", ""))
             cuts = []
@@ -2144,6 +2859,14 @@ class ManufacturingModule(QWidget):
                 "cuts": cuts,
                 "products": products
             })
+            # Final placements, so viewers and the stock update never re-nest
+            try:
+                layout = self.encode_sheet_plan(sheet, nested.get(tab))
+            except Exception as e:
+                print("Layout encode error:", e)
+                layout = None
+            if layout:
+                batches[-1]["layout"] = layout
 
         # 3. Final Upload
         payload = {
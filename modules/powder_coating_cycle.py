@@ -24,6 +24,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate, QTimer
 from PyQt5.QtGui import QFont
 from firebase.config import db
+from firebase.catalog import catalog_store, STOCK_MAX_AGE
+from firebase.local_mirror import stamped
+from firebase.product_index import product_index
 from firebase_admin import firestore
 import os, sys, tempfile, shutil
 import tempfile, os
@@ -404,8 +407,8 @@ class InventorySelectorDialog(QDialog):
         color_values, cond_values = set(), set()
         want_branch = (self.branch or "").strip() or None
 
-        for snap in db.collection("products").stream():
-            d = snap.to_dict() or {}
+        # Stock shown here is re-checked live before saving
+        for _, d in catalog_store().ensure(max_age=STOCK_MAX_AGE).items():
             item_code = (d.get("item_code") or "").strip()
             name = (d.get("name") or "Unnamed").strip()
 
@@ -1021,23 +1024,25 @@ def _export_gate_pass_pdf(pcid: str, bill_ref: str, branch: str, vendor_name: st
 
 
 # -------- Inventory (products.qty[branch][color][condition]) --------
-def _get_product_doc_by_code(item_code: str):
-    q = db.collection("products").where("item_code", "==", item_code).limit(1).get()
-    if not q:
+def _get_product_doc_by_code(item_code: str, transaction=None):
+    """Live snapshot of the product carrying item_code (read in `transaction` if given)."""
+    snap = product_index().fetch([item_code], transaction=transaction).get(str(item_code).strip())
+    if snap is None:
         raise RuntimeError(f"Product not found for code {item_code}")
-    return q[0].reference
+    return snap
 
 def _tx_update_qty(item_code: str, branch: str, color: str, condition: str, delta: float, allow_negative: bool = False):
     """
     Transactionally adjust nested qty; prevents negatives unless allowed.
     Uses set(merge=True) with minimal nested maps to avoid field path escaping.
     """
-    ref = _get_product_doc_by_code(item_code)
     tr = firestore.client().transaction()
 
     @firestore.transactional
     def _do(tx):
-        snap = ref.get(transaction=tx)
+        # resolved inside the transaction: a deleted or re-coded product is never written
+        snap = _get_product_doc_by_code(item_code, transaction=tx)
+        ref = snap.reference
         data = snap.to_dict() or {}
         qty = data.get("qty") or {}
 
@@ -1047,7 +1052,7 @@ def _tx_update_qty(item_code: str, branch: str, color: str, condition: str, delt
             raise RuntimeError(f"Insufficient stock for {item_code} [{branch}/{color}/{condition}] (have {curr}, need {abs(int(delta))})")
 
         update_map = {"qty": {branch: {color: {condition: newv}}}}
-        tx.set(ref, update_map, merge=True)
+        tx.set(ref, stamped(update_map), merge=True)
 
     _do(tr)
 
@@ -1095,7 +1100,7 @@ def _ensure_system_offset_account(user_data):
             "current_balance": 0.0,
         }
         ref = db.collection("accounts").document()
-        ref.set(equity_doc)
+        ref.set(stamped(equity_doc))
         equity_account_id = ref.id
         equity_account_name = "System Offset Account"
     return equity_account_id, equity_account_name
@@ -1137,10 +1142,10 @@ def _post_pc_bill_je(user_data, branch, vendor_party_id, vendor_name, total_amou
         "meta": {"kind": "opening_balance"}
     }
     je_ref = db.collection("journal_entries").document()
-    je_ref.set(je)
+    je_ref.set(stamped(je))
 
     # Only update Vendor A/P balance; leave System Offset at 0
-    db.collection("accounts").document(vendor_acc_id).update({"current_balance": firestore.Increment(float(total_amount))})
+    db.collection("accounts").document(vendor_acc_id).update(stamped({"current_balance": firestore.Increment(float(total_amount))}))
     return je_ref.id
 
 def _post_payment_je(user_data, bill_ref, cashbank_account_id, pcid, amount):
@@ -1175,11 +1180,11 @@ def _post_payment_je(user_data, bill_ref, cashbank_account_id, pcid, amount):
         "lines_account_ids": [debit_line["account_id"], credit_line["account_id"]],
         "meta": {"kind": "powder_coating_payment"}
     }
-    je_ref = db.collection("journal_entries").document(); je_ref.set(je)
+    je_ref = db.collection("journal_entries").document(); je_ref.set(stamped(je))
 
     # Update balances: Vendor (debit -> less negative), Cash/Bank (credit -> reduce asset)
-    db.collection("accounts").document(vendor_acc_id).update({"current_balance": firestore.Increment(-float(amount))})
-    db.collection("accounts").document(cashbank_account_id).update({"current_balance": firestore.Increment(-float(amount))})
+    db.collection("accounts").document(vendor_acc_id).update(stamped({"current_balance": firestore.Increment(-float(amount))}))
+    db.collection("accounts").document(cashbank_account_id).update(stamped({"current_balance": firestore.Increment(-float(amount))}))
     return je_ref.id
 
 def _fetch_live_availability_for_pc(branch: str, items):
@@ -1187,25 +1192,20 @@ def _fetch_live_availability_for_pc(branch: str, items):
     items: list of dicts with item_code, src_color, condition, qty
     Returns a dict {(code, branch, color, condition): live_available_float}
     """
-    from collections import defaultdict
-    by_code = defaultdict(list)
+    targets = []
     for it in (items or []):
         code = str(it.get("item_code") or "")
         col  = str(it.get("src_color") or "No Color")
         cond = str(it.get("condition") or "New")
         if code:
-            by_code[code].append((code, branch, col, cond))
+            targets.append((code, branch, col, cond))
+    # every product in one get_all
+    snaps = product_index().fetch(code for code, _, _, _ in targets)
     live = {}
-    for code, targets in by_code.items():
-        q = db.collection("products").where("item_code", "==", code).limit(1).get()
-        if not q:
-            for tup in targets:
-                live[tup] = 0.0
-            continue
-        d = q[0].to_dict() or {}
-        qty = d.get("qty") or {}
-        for _, br, col, cond in targets:
-            live[(code, br, col, cond)] = float(((qty.get(br) or {}).get(col) or {}).get(cond) or 0.0)
+    for code, br, col, cond in targets:
+        snap = snaps.get(code.strip())
+        qty = ((snap.to_dict() or {}).get("qty") or {}) if snap is not None else {}
+        live[(code, br, col, cond)] = float(((qty.get(br) or {}).get(col) or {}).get(cond) or 0.0)
     return live
 
 # ============ Windows & Dialogs (UI restyled to match view_inventory theme) ============
@@ -12,6 +12,9 @@ from PyQt5.QtCore import Qt, QSize, QUrl
 from PyQt5.QtWidgets import QScrollArea, QDialog, QVBoxLayout
 from PyQt5.QtGui import QIcon, QKeySequence
 from firebase.config import db
+from firebase.local_mirror import stamped
+from firebase.catalog import discard
+from firebase.product_index import product_index
 import pandas as pd
 from urllib.parse import urlparse, unquote
 
@@ -406,10 +409,10 @@ class ProductsPage(QWidget):
             # Clear Firestore refs regardless of blob deletion success
             try:
                 from firebase_admin import firestore
-                db.collection("products").document(doc_id).update({
+                db.collection("products").document(doc_id).update(stamped({
                     "image_url": firestore.DELETE_FIELD,
                     "image_path": firestore.DELETE_FIELD
-                })
+                }))
             except Exception as e:
                 loader.close()
                 QMessageBox.critical(self, "Firestore Error", f"Failed clearing image refs: {e}")
@@ -496,10 +499,10 @@ class ProductsPage(QWidget):
                 return
 
             # Save link + storage path to Firestore
-            db.collection("products").document(doc_id).update({
+            db.collection("products").document(doc_id).update(stamped({
                 "image_url": url,
                 "image_path": remote_path
-            })
+            }))
 
             QMessageBox.information(self, "Image Added", "Upload complete and URL saved.")
 
@@ -1158,6 +1161,7 @@ class ProductsPage(QWidget):
         if index >= 0:
             doc_id = self.categories[index][0]
             db.collection("product_main_categories").document(doc_id).delete()
+            discard("product_main_categories", [doc_id])
             self.refresh_categories()
 
     def add_subcategory(self):
@@ -1180,6 +1184,7 @@ class ProductsPage(QWidget):
         if index >= 0:
             doc_id = self.subcategories[index][0]
             db.collection("product_sub_categories").document(doc_id).delete()
+            discard("product_sub_categories", [doc_id])
             self.refresh_subcategories()
 
     def add_item(self):
@@ -1218,13 +1223,13 @@ class ProductsPage(QWidget):
             item_data = self.get_item_data()
 
             # Add item to the database first (without item code initially)
-            doc_ref = db.collection("products").add(item_data)[1]  # Add item to Firestore
+            doc_ref = db.collection("products").add(stamped(item_data))[1]  # Add item to Firestore
             
             # Now that the item is added, update the item code in Firestore
-            doc_ref.update({"item_code": new_code})  # Ensure the item code is updated in Firebase
+            doc_ref.update(stamped({"item_code": new_code}))  # Ensure the item code is updated in Firebase
             
             # Now update the qty after the item is confirmed in the database
-            doc_ref.update({"qty": qty})  # Update with the quantity
+            doc_ref.update(stamped({"qty": qty}))  # Update with the quantity
 
             # Update the autocomplete list & refresh the completer
             self._refresh_name_autocomplete_if_needed(item_data.get("name", ""))
@@ -1243,7 +1248,7 @@ class ProductsPage(QWidget):
             data.pop("qty", None)  # prevent qty update on edit
             data.pop("sub_id", None) 
             data.pop("item_code", None)  
-            db.collection("products").document(doc_id).update(data)
+            db.collection("products").document(doc_id).update(stamped(data))
             self.refresh_items(preserve_selection=True)
         loader.close()
 
@@ -1253,6 +1258,7 @@ class ProductsPage(QWidget):
         if index >= 0:
             doc_id = self.items[index][0]
             db.collection("products").document(doc_id).delete()
+            discard("products", [doc_id])
             self.refresh_items()
             self.clear_fields()
         loader.close()
@@ -1322,7 +1328,7 @@ class ProductsPage(QWidget):
 
             # ⬆ Upload all grouped products
             for product in products.values():
-                db.collection("products").add(product)
+                db.collection("products").add(stamped(product))
 
             QMessageBox.information(self, "Success", f"{len(products)} items imported successfully.")
         loader.close()
@@ -1732,7 +1738,7 @@ class ProductsPage(QWidget):
         # ------------------------------------------------------------------
         loader = self.show_loader(self, "Updating Qty", "Applying changes...")
         try:
-            db.collection("products").document(doc_id).update(updates)
+            db.collection("products").document(doc_id).update(stamped(updates))
             QMessageBox.information(self, "Success", "Quantities updated!")
             self.refresh_items(preserve_selection=True)
         except Exception as e:
@@ -1750,13 +1756,12 @@ class ProductsPage(QWidget):
         loader = self.show_loader(self, "Searching", f"Looking up product {code}...")
 
         try:
-            query = db.collection("products").where("item_code", "==", code).get()
-            if not query:
+            product_doc = product_index().fetch([code]).get(code)
+            if product_doc is None:
                 QMessageBox.information(self, "Not Found", f"No product found with code {code}.")
                 loader.close()
                 return
 
-            product_doc = query[0]
             product_data = product_doc.to_dict()
             sub_id = product_data.get("sub_id")
 
@@ -5,6 +5,8 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QDateTime
 from firebase.config import db
+from firebase.local_mirror import stamped
+from firebase.product_index import product_index
 
 class StockAdjustment(QWidget):
     def __init__(self, user_data, dashboard=None):
@@ -293,8 +295,8 @@ class StockAdjustment(QWidget):
             loader.show()
             QApplication.processEvents()
 
-            # 🔍 Query by item_code field
-            docs = db.collection("products").where("item_code", "==", item_code).stream()
+            # 🔍 Look up by item_code (index, then one document read)
+            docs = list(product_index().fetch([item_code]).values())
             found = False
             for doc in docs:
                 found = True
@@ -421,7 +423,7 @@ class StockAdjustment(QWidget):
 
             qty_data.setdefault(branch, {}).setdefault(color, {})[condition] = qty
 
-        ref.update({"qty": qty_data})
+        ref.update(stamped({"qty": qty_data}))
 
         old_qty_data = data.get("qty", {})
         updates_to_log = []
@@ -708,7 +710,7 @@ class StockAdjustment(QWidget):
             # Revert to old_qty
             if branch in qty_data and color in qty_data[branch] and condition in qty_data[branch][color]:
                 qty_data[branch][color][condition] = old_qty
-                ref.update({"qty": qty_data})
+                ref.update(stamped({"qty": qty_data}))
                 db.collection("stock_adjustment").document(doc_id).delete()
 
                 loader.close()
@@ -6,69 +6,92 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QUrl, QPoint
 from PyQt5.QtGui import QFont, QKeySequence
 from firebase.config import db
+from firebase.catalog import catalog_store, STOCK_MAX_AGE
+from firebase.local_mirror import local_mirror
+from ui.live_sync import live_sync
 from fpdf import FPDF
 import pandas as pd
 from datetime import datetime
 import os
-import json  # cache
 
 # ---------------- Worker Thread: fetch inventory from Firestore (no UI freeze) ----------------
+def _inventory_item(doc_id, data):
+    # copied: the catalog's dicts are shared with other windows
+    data = dict(data)
+    # ✅ make sure these keys always exist
+    data.setdefault("image_url", "")
+    data.setdefault("item_code", "")
+    data["doc_id"] = doc_id
+    return data
+
+
+def _inventory_payload(main_docs, sub_docs, product_docs):
+    """Everything the inventory view shows, from (doc_id, data) pairs of the three collections."""
+    gauges, colors = set(), set()
+    main_categories = {}   # name -> id
+    sub_categories = {}    # sub_id -> main_id
+    all_items = []
+
+    # main categories
+    for doc_id, data in main_docs:
+        name = data.get("name", "")
+        if name:
+            main_categories[name] = doc_id
+
+    # sub categories
+    sub_id_to_name = {}                 # sub_id -> subcategory name
+    sub_names_by_main = {}              # main_id -> set(names)
+    for doc_id, data in sub_docs:
+        main_id = data.get("main_id")
+        name = (data.get("name") or "").strip()
+        sub_categories[doc_id] = main_id
+        sub_id_to_name[doc_id] = name
+        if main_id and name:
+            sub_names_by_main.setdefault(main_id, set()).add(name)
+
+    # products
+    for doc_id, data in product_docs:
+        data = _inventory_item(doc_id, data)
+        all_items.append(data)
+        gauges.add(str(data.get("gauge", "")))
+        qty = data.get("qty", {}) or {}
+        for branch_data in qty.values():
+            if isinstance(branch_data, dict):
+                for color_name, blob in branch_data.items():
+                    if isinstance(blob, dict):
+                        colors.add((color_name or "").strip().lower())
+
+    return {
+        "main_categories": main_categories,
+        "sub_categories": sub_categories,
+        "sub_id_to_name": sub_id_to_name,                          # NEW
+        "sub_names_by_main": {k: sorted(v) for k, v in sub_names_by_main.items()},  # NEW
+        "all_items": all_items,
+        "gauges": sorted(gauges),
+        "colors": sorted(colors),
+        "main_category_names": sorted(main_categories.keys()),
+    }
+
+
 class _InventoryLoaderWorker(QThread):
     finished_ok = pyqtSignal(dict)
     failed = pyqtSignal(str)
 
+    def __init__(self, force=False, parent=None):
+        super().__init__(parent)
+        self.force = force
+
     def run(self):
         try:
-            gauges, colors = set(), set()
-            main_categories = {}   # name -> id
-            sub_categories = {}    # sub_id -> main_id
-            all_items = []
-
-            # main categories
-            for doc in db.collection("product_main_categories").stream():
-                data = doc.to_dict() or {}
-                name = data.get("name", "")
-                if name:
-                    main_categories[name] = doc.id
-
-            # sub categories
-            sub_id_to_name = {}                 # sub_id -> subcategory name
-            sub_names_by_main = {}              # main_id -> set(names)
-            for doc in db.collection("product_sub_categories").stream():
-                data = doc.to_dict() or {}
-                main_id = data.get("main_id")
-                name = (data.get("name") or "").strip()
-                sub_categories[doc.id] = main_id
-                sub_id_to_name[doc.id] = name
-                if main_id and name:
-                    sub_names_by_main.setdefault(main_id, set()).add(name)
-
-            # products
-            for doc in db.collection("products").stream():
-                data = doc.to_dict() or {}
-                # ✅ make sure these keys always exist
-                data.setdefault("image_url", "")
-                data.setdefault("item_code", "")
-                data["doc_id"] = doc.id
-                all_items.append(data)
-                gauges.add(str(data.get("gauge", "")))
-                qty = data.get("qty", {}) or {}
-                for branch_data in qty.values():
-                    if isinstance(branch_data, dict):
-                        for color_name, blob in branch_data.items():
-                            if isinstance(blob, dict):
-                                colors.add((color_name or "").strip().lower())
-
-            payload = {
-                "main_categories": main_categories,
-                "sub_categories": sub_categories,
-                "sub_id_to_name": sub_id_to_name,                          # NEW
-                "sub_names_by_main": {k: sorted(v) for k, v in sub_names_by_main.items()},  # NEW
-                "all_items": all_items,
-                "gauges": sorted(gauges),
-                "colors": sorted(colors),
-                "main_category_names": sorted(main_categories.keys()),
-            }
+            store = catalog_store()
+            if self.force:
+                store.refresh()
+            else:
+                store.ensure(max_age=STOCK_MAX_AGE)
+
+            payload = _inventory_payload(
+                store.main_categories().items(), store.sub_categories().items(), store.items()
+            )
             admin_branches = []
             try:
                 for admin in db.collection("users").where("role", "==", "admin").limit(1).stream():
@@ -196,7 +219,7 @@ class ViewInventory(QWidget):
         
         # --- REFRESH BUTTON ---
         refresh_btn = QPushButton("⟳ Refresh")
-        refresh_btn.clicked.connect(self.reload_async)
+        refresh_btn.clicked.connect(lambda: self.reload_async(force=True))
         header_layout.addWidget(refresh_btn)
         
         export_btn = QPushButton("Export")
@@ -341,6 +364,8 @@ class ViewInventory(QWidget):
         # 1) Render cached snapshot instantly (if available), 2) then refresh online in background
         self._render_from_cache_if_any()
         self.reload_async()
+        # 3) then patch only the products that change
+        live_sync().products_changed.connect(self._on_products_changed)
         
     def eventFilter(self, source, event):
         if source == self.table.viewport():
@@ -407,32 +432,17 @@ class ViewInventory(QWidget):
     def show_not_allowed_warning(self):
         QMessageBox.warning(self, "Not Allowed", "You do not have permission to perform this action.")
         
-    def _app_dir(self) -> str:
-        base = os.environ.get("APPDATA") if os.name == "nt" else os.path.join(os.path.expanduser("~"), ".config")
-        root = os.path.join(base, "PlayWithAayan-ERP_Software", "cache")
-        os.makedirs(root, exist_ok=True)
-        return root
-
-    def _cache_file(self) -> str:
-        return os.path.join(self._app_dir(), "inventory_snapshot.json")
-
-    def _save_cache(self, payload: dict):
-        try:
-            tmp = self._cache_file() + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False)
-            os.replace(tmp, self._cache_file())
-        except Exception:
-            pass
-
     def _load_cache(self) -> dict:
+        # Offline copy: straight from the local mirror, no network
         try:
-            if os.path.exists(self._cache_file()):
-                with open(self._cache_file(), "r", encoding="utf-8") as f:
-                    return json.load(f)
+            mirror = local_mirror()
+            if not mirror.synced("products"):
+                return {}
+            return _inventory_payload(
+                mirror.rows("product_main_categories"), mirror.rows("product_sub_categories"), mirror.rows("products")
+            )
         except Exception:
-            pass
-        return {}
+            return {}
 
     def set_offline_mode(self, read_only: bool):
         # Toggle offline mode; close any running loader and show cache immediately
@@ -453,7 +463,7 @@ class ViewInventory(QWidget):
             # back online: hide badge
             self._set_offline_badge(False)
             # optionally refresh online again
-            self.reload_async()
+            self.reload_async(force=True)
 
     # ---------------- UI loader ----------------
     # def get_admin_branches(self):
@@ -518,17 +528,34 @@ class ViewInventory(QWidget):
             self._set_offline_badge(True)
 
     # ---------------- Async reload (no UI freeze) ----------------
-    def reload_async(self):
+    def reload_async(self, force=False):
         # If externally marked offline, don’t hit network and do NOT show loader
         if self._offline_read_only:
             return
 
-        self._loader = _InventoryLoaderWorker()
+        self._loader = _InventoryLoaderWorker(force=force)
         self._loader.finished_ok.connect(self._on_loaded_ok)
         self._loader.failed.connect(self._on_loaded_fail)
         self._loader_dialog = self.show_loader(self, "Loading Inventory", "Fetching latest inventory…")
         self._loader.start()
 
+    def _on_products_changed(self, ids):
+        """Realtime update: swap in just the changed products and redraw."""
+        if not self.all_items:
+            return
+        store = catalog_store()
+        changed = set(ids)
+        items = [it for it in self.all_items if it.get("doc_id") not in changed]
+        for doc_id in ids:
+            data = store.product(doc_id)
+            if data is not None:
+                items.append(_inventory_item(doc_id, data))
+        self.all_items = items
+        self._filtered_dirty = True
+        self._ensure_filtered()
+        self.page_spin.setMaximum(max(1, (len(self._filtered_items) - 1) // self.items_per_page + 1))
+        self.refresh_table()
+
     def _on_loaded_ok(self, payload: dict):
         try:
             if getattr(self, "_loader_dialog", None): self._loader_dialog.close()
@@ -569,9 +596,6 @@ class ViewInventory(QWidget):
         # we are online; hide badge if it was visible
         self._set_offline_badge(False)
 
-        # persist snapshot
-        self._save_cache(payload)
-
     def _on_loaded_fail(self, err: str):
         try:
             if getattr(self, "_loader_dialog", None): self._loader_dialog.close()
@@ -980,15 +1004,11 @@ class ViewInventory(QWidget):
     # (Excel/PDF exports merged: keep offline-safe loader + detailed totals)
     def export_to_excel(self, *_):
         loader = self.show_loader(self, "Exporting Inventory", "Preparing Excel file...")
-        main_categories = {}; sub_categories = {}
-        for doc in db.collection("product_main_categories").stream():
-            main_categories[doc.id] = doc.to_dict().get("name", "")
-        for doc in db.collection("product_sub_categories").stream():
-            data = doc.to_dict(); sub_categories[doc.id] = data.get("main_id", "")
-        all_docs = db.collection("products").stream()
+        store = catalog_store().ensure(max_age=STOCK_MAX_AGE)
+        main_categories = {i: d.get("name", "") for i, d in store.main_categories().items()}
+        sub_categories = {i: d.get("main_id", "") for i, d in store.sub_categories().items()}
         rows = []
-        for doc in all_docs:
-            data = doc.to_dict()
+        for _, data in store.items():
             sub_id = data.get("sub_id", ""); main_id = sub_categories.get(sub_id, "")
             main_category = main_categories.get(main_id, "")
             qty_dict = data.get("qty", {})
@@ -8,6 +8,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QDate, QTimer
 from firebase.config import db
+from firebase.local_mirror import local_mirror, stamped
 from firebase_admin import firestore
 import uuid, csv, os, tempfile, datetime
 import datetime as _dt
@@ -695,20 +696,19 @@ class RecordPaymentDialog(QDialog):
 
             # Update balances for real accounts
             for a_id, inc in increments.items():
-                tx.update(accs.document(a_id), {"current_balance": firestore.Increment(inc)})
+                tx.update(accs.document(a_id), stamped({"current_balance": firestore.Increment(inc)}))
 
             # Create JE and payment
-            tx.set(je_ref, je_doc)
-            tx.set(pay_ref, pay_doc)
+            tx.set(je_ref, stamped(je_doc))
+            tx.set(pay_ref, stamped(pay_doc))
 
             # Update invoice (nested fields via update)
-            tx.update(inv_ref, {
+            tx.update(inv_ref, stamped({
                 "amounts.received": received1,
                 "amounts.balance":  balance1,
                 "status": new_status,
                 "type": new_type,
-                "updated_at": now,
-            })
+            }))
 
         try:
             txn_all(transaction)
@@ -809,8 +809,11 @@ class ViewInvoicesModule(QWidget):
         self._rows = []
         self.table.setRowCount(0)
         try:
-            for doc in db.collection("invoices").stream():
-                self._add_row(doc.id, doc.to_dict() or {})
+            # Local mirror: reads only the invoices changed since the last load
+            mirror = local_mirror()
+            mirror.pull("invoices")
+            for doc_id, data in mirror.rows("invoices"):
+                self._add_row(doc_id, data)
             self._apply_filters()
         except Exception as e:
             QMessageBox.critical(self, "Load Error", f"Failed to load invoices:\n{e}")
@@ -825,9 +828,13 @@ class ViewInvoicesModule(QWidget):
             pid = data.get("client_id") or data.get("party_id")
             try:
                 if pid:
-                    p = db.collection("parties").document(pid).get()
-                    if p.exists:
-                        client_name = p.to_dict().get("name", "(client)")
+                    party = local_mirror().get("parties", pid)
+                    if party is not None:
+                        client_name = party.get("name", "(client)")
+                    else:
+                        p = db.collection("parties").document(pid).get()
+                        if p.exists:
+                            client_name = p.to_dict().get("name", "(client)")
             except Exception:
                 client_name = "(client)"
         client_name = client_name or "(client)"
@@ -7,10 +7,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QDate, Qt, QTimer
 from PyQt5.QtGui import  QFont, QColor
 from firebase.config import db
+from firebase.local_mirror import local_mirror, stamped
 from firebase_admin import firestore
 import datetime
-import os
-import json
 
 from modules.journal_entry import JournalEntryForm
 
@@ -265,140 +264,20 @@ class JournalEntryViewer(QWidget):
         self.hide_loader()
 
     # ===== Offline helpers =====
-    def _app_dir(self) -> str:
-        base = os.environ.get("APPDATA") if os.name == "nt" else os.path.join(os.path.expanduser("~"), ".config")
-        root = os.path.join(base, "PlayWithAayan-ERP_Software", "cache")
-        os.makedirs(root, exist_ok=True)
-        return root
-
-    def _cache_file(self) -> str:
-        return os.path.join(self._app_dir(), "journal_entries_snapshot.json")
-
-    def _save_cache(self):
-        try:
-            serial_entries = []
-            for e in (self.entries_cache or []):
-                serial_lines = []
-                is_opening = ((e.get("meta", {}) or {}).get("kind") == "opening_balance")
-                for ln in (e.get("_lines", []) or []):
-                    acc_id = ln.get("account_id")
-                    acc_name = ln.get("account_name")
-                    d = float(ln.get("debit") or 0)
-                    c = float(ln.get("credit") or 0)
-                    prev = float(ln.get("balance_before") or 0)
-
-                    # account type + signed amount for consistent offline rendering
-                    a_type = self._account_type(acc_id)
-                    is_ob_equity = (acc_name == "Opening Balances Equity")
-                    signed_amt = self._signed_amount(
-                        d, c, a_type,
-                        is_opening=is_opening,
-                        is_ob_equity=is_ob_equity
-                    )
-
-                    serial_lines.append({
-                        "account_id": acc_id,
-                        "account_name": acc_name,
-                        "debit": d,
-                        "credit": c,
-                        "balance_before": prev,
-                        "signed_amt": signed_amt,  # <-- NEW
-                    })
-
-                serial_entries.append({
-                    "doc_id": e.get("doc_id"),
-                    "date_str": e.get("_date_str") or "",
-                    "created_at_str": e.get("_created_at_str") or "",
-                    "reference": e.get("_reference") or "-",
-                    "description": e.get("_description") or "",
-                    "purpose": e.get("_purpose") or "-",
-                    "branch": e.get("_branch") or "-",
-                    "user": e.get("_user") or "-",
-                    "lines": serial_lines,
-                    "debit_sum": float(e.get("_debit_sum") or 0.0),
-                    "credit_sum": float(e.get("_credit_sum") or 0.0),
-                    "meta_kind": (e.get("meta", {}) or {}).get("kind", ""),  # <-- keep OB flag
-                })
-
-            payload = {
-                "entries": serial_entries,
-                "accounts": self.account_map or {},
-                "account_disp": self.account_disp_map or {},
-            }
-            tmp = self._cache_file() + ".tmp"
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False)
-            os.replace(tmp, self._cache_file())
-        except Exception:
-            pass
-
-
-    def _load_cache(self):
+    def _render_from_cache_if_any(self):
+        """Paint accounts and entries from the local mirror, without the network."""
         try:
-            if os.path.exists(self._cache_file()):
-                with open(self._cache_file(), "r", encoding="utf-8") as f:
-                    return json.load(f)
+            mirror = local_mirror()
+            if mirror.synced("accounts"):
+                self._set_account_docs(mirror.rows("accounts"))
+            if mirror.synced("journal_entries"):
+                self._set_entry_docs(mirror.rows("journal_entries", order_by="created_at", descending=True))
+                return True
         except Exception:
             pass
-        return {}
-
-    def _rehydrate_entries(self, serial_entries):
-        restored = []
-        for s_ in (serial_entries or []):
-            fixed_lines = []
-            for ln in (s_.get("lines") or []):
-                fixed_lines.append({
-                    "account_id": ln.get("account_id"),
-                    "account_name": ln.get("account_name"),
-                    "debit": float(ln.get("debit", 0)),
-                    "credit": float(ln.get("credit", 0)),
-                    "balance_before": float(ln.get("balance_before", 0)),
-                    "signed_amt": float(ln.get("signed_amt", 0)),  # <-- restored
-                })
-
-            deb_str, cr_str = self._format_lines_by_side(fixed_lines)
-
-            restored.append({
-                "doc_id": s_.get("doc_id"),
-                "_date_str": s_.get("date_str") or "",
-                "_date_q": self._to_qdate(s_.get("date_str") or ""),
-                "_reference": s_.get("reference") or "-",
-                "_description": s_.get("description") or "",
-                "_purpose": s_.get("purpose") or "-",
-                "_branch": s_.get("branch") or "-",
-                "_user": s_.get("user") or "-",
-                "_created_at_str": s_.get("created_at_str") or "",
-                "_lines": fixed_lines,
-                "_debit_sum": float(s_.get("debit_sum") or 0.0),
-                "_credit_sum": float(s_.get("credit_sum") or 0.0),
-                "_debited_str": deb_str,
-                "_credited_str": cr_str,
-                "meta": {"kind": s_.get("meta_kind", "")} if s_.get("meta_kind") else {},  # <-- OB hint back
-            })
-        return restored
-
-
-    def _render_from_cache_if_any(self):
-        cached = self._load_cache()
-        if not cached:
-            # nothing cached yet; keep table empty but badge visible if offline
-            self.apply_filters()
-            return
-        # restore accounts map first (used by rendering)
-        self.account_map = cached.get("accounts", {}) or self.account_map
-        self.account_disp_map = cached.get("account_disp", {}) or self.account_disp_map
-
-        # rebuild the Account dropdown from cache (so user can filter while offline)
-        self.account_filter.blockSignals(True)
-        self.account_filter.clear()
-        self.account_filter.addItem("— All Accounts —", None)
-        for acc_id, disp in sorted(self.account_disp_map.items(), key=lambda kv: kv[1]):
-            self.account_filter.addItem(disp, acc_id)
-        self.account_filter.blockSignals(False)
-
-        # restore journal entries cache and paint table
-        self.entries_cache = self._rehydrate_entries(cached.get("entries", [])) or self.entries_cache
+        # nothing mirrored yet; keep table empty but badge visible if offline
         self.apply_filters()
+        return False
 
     def _set_offline_badge(self, visible: bool):
         try:
@@ -587,100 +466,100 @@ class JournalEntryViewer(QWidget):
         self.branch_filter.setToolTip("Select one of your assigned branches")
 
     def load_account_list(self):
-        # Offline: use cache and skip network
+        # Offline: use the local mirror and skip network
         if getattr(self, "_offline_read_only", False):
-            cached = self._load_cache()
-            if cached:
-                self.account_map = cached.get("accounts", {}) or self.account_map
-                self.account_disp_map = cached.get("account_disp", {}) or self.account_disp_map
-                # rebuild the dropdown
-                self.account_filter.blockSignals(True)
-                self.account_filter.clear()
-                self.account_filter.addItem("— All Accounts —", None)
-                for acc_id, disp in sorted(self.account_disp_map.items(), key=lambda kv: kv[1]):
-                    self.account_filter.addItem(disp, acc_id)
-                self.account_filter.blockSignals(False)
+            if local_mirror().synced("accounts"):
+                self._set_account_docs(local_mirror().rows("accounts"))
             return
 
-        # Online fetch (original logic)
+        # Online: sync only the accounts changed since the last load
+        mirror = local_mirror()
+        mirror.pull("accounts")
+        self._set_account_docs(mirror.rows("accounts"))
+
+    def _set_account_docs(self, account_docs):
         self.account_map.clear(); self.account_disp_map.clear()
+        self.account_filter.blockSignals(True)
         self.account_filter.clear(); self.account_filter.addItem("— All Accounts —", None)
-        for doc in db.collection("accounts").stream():
-            acc = doc.to_dict() or {}
+        for acc_id, acc in account_docs:
+            acc = acc or {}
             name, code = acc.get("name",""), acc.get("code","")
             disp = f"[{code}] {name}" if code else name
-            self.account_map[doc.id] = name
-            self.account_disp_map[doc.id] = disp
-            self.account_filter.addItem(disp, doc.id)
-        # Save accounts to cache (along with entries after load)
-        self._save_cache()
+            self.account_map[acc_id] = name
+            self.account_disp_map[acc_id] = disp
+        for acc_id, disp in sorted(self.account_disp_map.items(), key=lambda kv: kv[1]):
+            self.account_filter.addItem(disp, acc_id)
+        self.account_filter.blockSignals(False)
 
     # ===== Load entries =====
     def load_entries(self):
-        # If offline, render from cache and stop
+        # If offline, render from the local mirror and stop
         if getattr(self, "_offline_read_only", False):
             self._render_from_cache_if_any()
             return
 
         try:
-            self.entries_cache = []
-            query = db.collection("journal_entries").order_by("created_at", direction=firestore.Query.DESCENDING).stream()
-            for doc in query:
-                data = doc.to_dict() or {}
-                data["doc_id"] = doc.id
-
-                data["_date_q"] = self._to_qdate(data.get("date"))
-                data["_date_str"] = self._date_to_string(data.get("date"))
-                data["_reference"] = data.get("reference_no") or data.get("reference") or "-"
-                data["_description"] = data.get("description", "")
-                data["_purpose"] = data.get("purpose") or "-"
-                data["_branch"] = self._resolve_branch_for_entry(data)
-                data["_user"] = data.get("created_by", "-")
-                data["_created_at_str"] = self._datetime_to_string(data.get("created_at") or data.get("date"))
-
-                fixed_lines = []
-                for ln in (data.get("lines", []) or []):
-                    ln = dict(ln or {})
-                    if not ln.get("account_name"):
-                        ln["account_name"] = self._resolve_account_name(ln.get("account_id",""), "-")
-                    ln["debit"] = float(ln.get("debit",0) or 0)
-                    ln["credit"] = float(ln.get("credit",0) or 0)
-                    ln["balance_before"] = float(ln.get("balance_before",0) or 0.0)
-                    fixed_lines.append(ln)
-                data["_lines"] = fixed_lines
-                data["_debit_sum"] = sum(l["debit"] for l in fixed_lines)
-                data["_credit_sum"] = sum(l["credit"] for l in fixed_lines)
-                data["_debited_str"], data["_credited_str"] = self._format_lines_by_side(fixed_lines)
-
-                self.entries_cache.append(data)
-                
-            # --- NEW: narrow entries for non-admins with cross-branch permission
-            extra = self.user_data.get("extra_perm", []) or []
-            can_see_others = "can_see_other_branches_journals" in extra
-            if self.user_data.get("role") != "admin" and can_see_others:
-                allowed_branches = set(self._admin_branches_or(self.user_data.get("branch", [])))
-                if allowed_branches:
-                    self.entries_cache = [
-                        e for e in self.entries_cache
-                        if (e.get("_branch") in allowed_branches)
-                    ]
-
-
-            # Save a fresh snapshot (including accounts from prior fetch)
-            self._save_cache()
-            self.apply_filters()
+            # Newest first, from the mirror after pulling what changed since the last load
+            mirror = local_mirror()
+            mirror.pull("journal_entries")
+            self._set_entry_docs(mirror.rows("journal_entries", order_by="created_at", descending=True))
         except Exception as e:
-            # On failure, fall back to cache without changing UX
-            cached = self._load_cache()
-            if cached and cached.get("entries"):
+            # On failure, fall back to whatever is mirrored without changing UX
+            if self._render_from_cache_if_any():
                 self._set_offline_badge(True)
-                self.entries_cache = self._rehydrate_entries(cached.get("entries", []))
-                self.account_map = cached.get("accounts", {}) or self.account_map
-                self.account_disp_map = cached.get("account_disp", {}) or self.account_disp_map
-                self.apply_filters()
             else:
                 QMessageBox.critical(self, "Error", f"Failed to load journal entries:{e}")
 
+    def _entry_row(self, doc_id, data):
+        data = dict(data or {})
+        data["doc_id"] = doc_id
+
+        data["_date_q"] = self._to_qdate(data.get("date"))
+        data["_date_str"] = self._date_to_string(data.get("date"))
+        data["_reference"] = data.get("reference_no") or data.get("reference") or "-"
+        data["_description"] = data.get("description", "")
+        data["_purpose"] = data.get("purpose") or "-"
+        data["_branch"] = self._resolve_branch_for_entry(data)
+        data["_user"] = data.get("created_by", "-")
+        data["_created_at_str"] = self._datetime_to_string(data.get("created_at") or data.get("date"))
+
+        fixed_lines = []
+        for ln in (data.get("lines", []) or []):
+            ln = dict(ln or {})
+            if not ln.get("account_name"):
+                ln["account_name"] = self._resolve_account_name(ln.get("account_id",""), "-")
+            ln["debit"] = float(ln.get("debit",0) or 0)
+            ln["credit"] = float(ln.get("credit",0) or 0)
+            ln["balance_before"] = float(ln.get("balance_before",0) or 0.0)
+            fixed_lines.append(ln)
+        data["_lines"] = fixed_lines
+        data["_debit_sum"] = sum(l["debit"] for l in fixed_lines)
+        data["_credit_sum"] = sum(l["credit"] for l in fixed_lines)
+        data["_debited_str"], data["_credited_str"] = self._format_lines_by_side(fixed_lines)
+        return data
+
+    def _set_entry_docs(self, entry_docs):
+        self.entries_cache = [self._entry_row(doc_id, data) for doc_id, data in entry_docs]
+
+        # --- NEW: narrow entries for non-admins with cross-branch permission
+        extra = self.user_data.get("extra_perm", []) or []
+        can_see_others = "can_see_other_branches_journals" in extra
+        if self.user_data.get("role") != "admin" and can_see_others:
+            if getattr(self, "_offline_read_only", False):
+                # no network: the admin branches seen last time, else the user's own
+                allowed = getattr(self, "_allowed_branches", None) or self.user_data.get("branch", [])
+                allowed_branches = set([allowed] if isinstance(allowed, str) else allowed)
+            else:
+                self._allowed_branches = self._admin_branches_or(self.user_data.get("branch", []))
+                allowed_branches = set(self._allowed_branches)
+            if allowed_branches:
+                self.entries_cache = [
+                    e for e in self.entries_cache
+                    if (e.get("_branch") in allowed_branches)
+                ]
+
+        self.apply_filters()
+
     # ===== Balance helpers =====
     def _fmt_balance(self, amount, acc_type):
         if acc_type in ("Asset","Expense"): dr = (amount >= 0)
@@ -690,8 +569,14 @@ class JournalEntryViewer(QWidget):
     def _account_type(self, acc_id: str) -> str:
         if not hasattr(self, "_acct_type_cache"): self._acct_type_cache = {}
         if acc_id in self._acct_type_cache: return self._acct_type_cache[acc_id]
-        # If offline, avoid network; best-effort default
-        if getattr(self, "_offline_read_only", False):
+        # Mirrored accounts first; if offline, avoid network; best-effort default
+        try:
+            mirrored = local_mirror().get("accounts", acc_id) if acc_id else None
+        except Exception:
+            mirrored = None
+        if mirrored is not None:
+            a_type = mirrored.get("type", "Asset")
+        elif getattr(self, "_offline_read_only", False):
             a_type = "Asset"
         else:
             try:
@@ -920,8 +805,9 @@ class JournalEntryViewer(QWidget):
                 d = float(ln.get("debit",0) or 0.0); c = float(ln.get("credit",0) or 0.0)
                 net = (d - c) if acc_type in ["Asset","Expense"] else (c - d)
                 if net != 0:
-                    db.collection("accounts").document(acc_id).update({"current_balance": firestore.Increment(-net)})
+                    db.collection("accounts").document(acc_id).update(stamped({"current_balance": firestore.Increment(-net)}))
             db.collection("journal_entries").document(data["doc_id"]).delete()
+            local_mirror().delete("journal_entries", [data["doc_id"]])
             QMessageBox.information(self, "Deleted", f"Entry {ref} deleted and balances reversed.")
             self.load_entries()
         except Exception as e:
@@ -5,9 +5,13 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, QSize
 from firebase.config import db
+from firebase.catalog import catalog_store
+from firebase.local_mirror import MIRRORED, stamped
 from firebase_admin import firestore
 from datetime import datetime, timezone
 from modules.manufacturing_cycle import ManufacturingModule, PannableGraphicsView
+from nesting.leftovers import MIN_LEFTOVER
+from nesting.plan_codec import decode_sheet_layout
 import traceback
 
 
@@ -245,12 +249,17 @@ class RefactoredOrderDialog(QDialog):
                 if not all([raw_id, branch, color, condition]):
                     continue
 
-                # 🔄 Fetch latest data from Firestore
-                doc = db.collection("products").document(raw_id).get()
-                if not doc.exists:
-                    continue
-
-                product_data = doc.to_dict()
+                # 🔄 Latest data: the live catalog while its listener runs, else Firestore
+                store = catalog_store()
+                if store.live:
+                    product_data = store.product(raw_id)
+                    if product_data is None:
+                        continue
+                else:
+                    doc = db.collection("products").document(raw_id).get()
+                    if not doc.exists:
+                        continue
+                    product_data = doc.to_dict()
                 qty_data = product_data.get("qty", {})
                 updated_qty = qty_data.get(branch, {}).get(color, {}).get(condition, 0)
 
@@ -494,42 +503,48 @@ class RefactoredOrderDialog(QDialog):
                         sheet_w = item_data.get("width", 0)
                         sheet_h = item_data.get("length", 0)
 
-                        if cuts and sheet_w and sheet_h:
-                            # 🧼 Clean and validate all rectangles (even legacy ones)
-                            rectangles = []
-                            for c in cuts:
-                                try:
-                                    x = float(c.get("x", 0)) if "x" in c else 0.0
-                                    y = float(c.get("y", 0)) if "y" in c else 0.0
+                        saved = sheet.get("layout") or {}
+                        if saved.get("kind") == "sheet" or (cuts and sheet_w and sheet_h):
+                            if saved.get("kind") == "sheet":
+                                # Leftovers saved with the plan that was actually cut
+                                waste_blocks = decode_sheet_layout(saved)[3]
+                            else:
+                                # 🧼 Clean and validate all rectangles (even legacy ones)
+                                rectangles = []
+                                for c in cuts:
+                                    try:
+                                        x = float(c.get("x", 0)) if "x" in c else 0.0
+                                        y = float(c.get("y", 0)) if "y" in c else 0.0
 
-                                    # Guard: check for tuple/list values
-                                    length = c.get("length", 0)
-                                    width = c.get("width", 0)
+                                        # Guard: check for tuple/list values
+                                        length = c.get("length", 0)
+                                        width = c.get("width", 0)
 
-                                    if isinstance(length, (tuple, list)) or isinstance(width, (tuple, list)):
-                                        print(f"⚠️ Skipping invalid cut (tuple values): {c}")
-                                        continue
+                                        if isinstance(length, (tuple, list)) or isinstance(width, (tuple, list)):
+                                            print(f"⚠️ Skipping invalid cut (tuple values): {c}")
+                                            continue
 
-                                    w = float(length)
-                                    h = float(width)
+                                        w = float(length)
+                                        h = float(width)
 
-                                    rectangles.append((x, y, w, h))
+                                        rectangles.append((x, y, w, h))
 
-                                except Exception as e:
-                                    print(f"⚠️ Skipping malformed cut: {c}, error: {e}")
+                                    except Exception as e:
+                                        print(f"⚠️ Skipping malformed cut: {c}, error: {e}")
 
-                            sheet_w = item_data.get("width", 0)
-                            sheet_h = item_data.get("length", 0)
+                                sheet_w = item_data.get("width", 0)
+                                sheet_h = item_data.get("length", 0)
 
-                            rects, _ = ManufacturingModule().place_rectangles(sheet_w, sheet_h, rectangles)
-                            rects_clean = []
-                            for r in rects:
-                                try:
-                                    x, y, w, h = map(float, r[:4])  # ✅ Force real numbers
-                                    rects_clean.append((x, y, w, h))
-                                except Exception as e:
-                                    print("⚠️ Skipping bad rect:", r, "→", e)
-                            waste_blocks = ManufacturingModule().find_all_waste_blocks(sheet_w, sheet_h, rects_clean)
+                                rects, _ = ManufacturingModule().place_rectangles(sheet_w, sheet_h, rectangles)
+                                rects_clean = []
+                                for r in rects:
+                                    try:
+                                        x, y, w, h = map(float, r[:4])  # ✅ Force real numbers
+                                        rects_clean.append((x, y, w, h))
+                                    except Exception as e:
+                                        print("⚠️ Skipping bad rect:", r, "→", e)
+                                waste_blocks = ManufacturingModule().find_all_waste_blocks(
+                                    sheet_w, sheet_h, rects_clean, min_size=MIN_LEFTOVER)
 
                             if waste_blocks:
                                 block_lines = []
@@ -707,7 +722,7 @@ class RefactoredOrderDialog(QDialog):
                                             }
 
                                             try:
-                                                db.collection("products").add(waste_data)
+                                                db.collection("products").add(stamped(waste_data))
                                             except Exception as e:
                                                 print("🔥 Error adding new waste product:", e)
 
@@ -752,7 +767,7 @@ class RefactoredOrderDialog(QDialog):
 
             # === Step 3: Apply all deep field updates (qty_done, inventory) ===
             for col, doc_id, field, value in updates:
-                db.collection(col).document(doc_id).update({field: value})
+                db.collection(col).document(doc_id).update(stamped({field: value}) if col in MIRRORED else {field: value})
 
             # === Step 4: Inventory adjustments (raw, finished, waste blocks) ===
             for sheet in self.order_data.get("sheets", []):
@@ -787,7 +802,7 @@ class RefactoredOrderDialog(QDialog):
                             
             # === Step 5: Apply inventory updates ===
             for col, doc_id, field, value in updates:
-                db.collection(col).document(doc_id).update({field: value})
+                db.collection(col).document(doc_id).update(stamped({field: value}) if col in MIRRORED else {field: value})
 
             # === Step 6: UI Updates ===
             QMessageBox.information(self, "Status Updated", f"Order marked as {new_status}.")
@@ -807,6 +822,15 @@ class RefactoredOrderDialog(QDialog):
 
 
     def draw_sheet(self, sheet):
+        layout = sheet.get("layout")
+        if layout:
+            # Plan saved with the order: decode and draw, no nesting and no stock reads
+            viewer = ManufacturingModule(load_catalog=False)
+            viewer.show_saved_plan(layout)
+            self.scene = viewer.scene
+            self.canvas.setScene(self.scene)
+            return
+
         dummy = ManufacturingModule()
         raw_item = sheet.get("raw_item", {})
         raw_ref = raw_item.get("raw_ref")
@@ -853,6 +877,7 @@ class RefactoredOrderDialog(QDialog):
                     pass
 
             dummy.sheet_data[0] = {"cuts": rectangles}
+            dummy.background_nesting = False     # the viewer takes the scene right away
             dummy.simulate_cutting()
 
         self.scene = dummy.scene
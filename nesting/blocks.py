@@ -0,0 +1,101 @@
+# nesting/blocks.py
+"""
+Block packing for repetitive cut lists.
+
+Shelving orders are mostly a few sizes in large quantities (35 x
+"6 1/2 x 16 1/2"). Instead of placing every copy on its own, identical
+pieces (same size, label and bracket flag) are grouped and each group is
+laid out as rectangular blocks of rows x columns:
+
+  * for a group of k pieces, every orientation and column count gives a
+    block of cols x rows pieces (rows * cols <= k, capped by the sheet),
+  * each step places the block that puts the most piece area on the
+    sheet, at the MaxRects spot that scores best for it,
+  * pieces a block leaves over stay in their group and form the next,
+    smaller block (the last row is never ragged).
+
+The search is over groups x arrangements instead of pieces x positions,
+and the result is a tidy grid per size that is quick to mark out and cut.
+Kerf is left between the pieces inside a block as well as around it.
+"""
+
+from math import floor
+
+from nesting.geometry import Rect
+from nesting.maxrects import MaxRectsBin
+
+
+def group_pieces(rectangles):
+    """{(w, h, label, is_bracket): [piece, ...]} in first-seen order; w/h long side first."""
+    groups = {}
+    for rect in rectangles:
+        w, h, label, is_bracket = rect
+        groups.setdefault((max(w, h), min(w, h), label, is_bracket), []).append(rect)
+    return groups
+
+
+def _fit_count(length, piece, kerf):
+    # n pieces take n * piece + (n - 1) * kerf
+    return int(floor((length + kerf) / (piece + kerf) + 1e-9)) if piece > 0 else 0
+
+
+def block_options(w, h, count, sheet_w, sheet_h, kerf=0.0, allow_rotate=True):
+    """
+    Every (block_w, block_h, cols, rows, piece_w, piece_h) arrangement of
+    up to `count` pieces that fits the sheet, most pieces first.
+    """
+    orientations = [(w, h)]
+    if allow_rotate and w != h:
+        orientations.append((h, w))
+
+    options = []
+    for pw, ph in orientations:
+        max_cols = min(count, _fit_count(sheet_w, pw, kerf))
+        max_rows = _fit_count(sheet_h, ph, kerf)
+        for cols in range(1, max_cols + 1):
+            rows = min(count // cols, max_rows)
+            if rows < 1:
+                continue
+            options.append((cols * pw + (cols - 1) * kerf, rows * ph + (rows - 1) * kerf, cols, rows, pw, ph))
+    options.sort(key=lambda o: -(o[2] * o[3]))
+    return options
+
+
+def block_place(sheet_w, sheet_h, rectangles, heuristic="bssf", kerf=0.0, allow_rotate=True):
+    """Pack (w, h, label, is_bracket) pieces as blocks of identical parts; returns (used, unplaced)."""
+    bin_ = MaxRectsBin(sheet_w, sheet_h, heuristic=heuristic, kerf=kerf, allow_rotate=False)
+    groups = group_pieces(rectangles)
+    used = []
+    unplaced = []
+
+    while groups:
+        best = None
+        for key in list(groups):
+            w, h = key[0], key[1]
+            found = False
+            for option in block_options(w, h, len(groups[key]), sheet_w, sheet_h, kerf, allow_rotate):
+                bw, bh, cols, rows, pw, ph = option
+                spot = bin_.find(bw, bh)
+                if spot is None:
+                    continue
+                found = True
+                rank = (-(cols * rows * pw * ph), spot[0])
+                if best is None or rank < best[0]:
+                    best = (rank, key, option, spot)
+            if not found:
+                # Free space only shrinks: not even one piece of this group fits again
+                unplaced.extend(r[2] for r in groups.pop(key))
+        if best is None:
+            break
+
+        _, key, (bw, bh, cols, rows, pw, ph), (_, x, y, _, _) = best
+        bin_.commit(x, y, bw, bh)
+        pieces = groups[key]
+        for row in range(rows):
+            for col in range(cols):
+                _, _, label, is_bracket = pieces.pop(0)
+                used.append(Rect(x + col * (pw + kerf), y + row * (ph + kerf), pw, ph, label, is_bracket))
+        if not pieces:
+            del groups[key]
+
+    return used, unplaced
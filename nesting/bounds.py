@@ -0,0 +1,120 @@
+# nesting/bounds.py
+"""
+Cheap lower bounds for sheet nesting, so a layout can be judged against
+the best any layout could do:
+
+  * area_bound  — ceil(piece area / sheet area), pieces that fit at all,
+  * l2_bound    — Martello–Vigo style L2: large pieces that pairwise can't
+                  share a sheet each open one; the other pieces can only
+                  use the room next to a large piece they fit beside, and
+                  whatever area is left needs extra sheets,
+  * max_area    — upper bound on the area one sheet can hold (for yield).
+
+The classic L2 assumes pieces keep their orientation. Every engine here
+may turn pieces, so "fits beside" is the exact two-piece test in both
+orientations (two rectangles on a sheet are always separable by a
+straight cut, so side by side or one above the other covers every case).
+
+Kerf is ignored: it only makes packing harder, so the bounds stay valid.
+All sums are done in 1/16" units (see geometry), so a bound that is met
+is met exactly.
+"""
+
+from collections import Counter
+
+from nesting.geometry import ceil_units, floor_units
+
+
+def _orientations(w, h):
+    return ((w, h), (h, w)) if w != h else ((w, h),)
+
+
+def _fits(w, h, W, H):
+    return (w <= W and h <= H) or (h <= W and w <= H)
+
+
+def _can_share(a, b, W, H):
+    """Can pieces a and b (w, h) go on one W x H sheet together?"""
+    for wa, ha in _orientations(*a):
+        if wa > W or ha > H:
+            continue
+        for wb, hb in _orientations(*b):
+            if wb > W or hb > H:
+                continue
+            if (wa + wb <= W) or (ha + hb <= H):
+                return True
+    return False
+
+
+def _sizes(sheet_w, sheet_h, rectangles):
+    """
+    Sheet and Counter of fitting piece sizes (long side first) in units.
+    Sheet rounded up and pieces down, so off-grid input can only weaken
+    a lower bound, never break it.
+    """
+    W, H = ceil_units(sheet_w), ceil_units(sheet_h)
+    sizes = Counter()
+    for r in rectangles:
+        w, h = floor_units(r[0]), floor_units(r[1])
+        if _fits(w, h, W, H):
+            sizes[(max(w, h), min(w, h))] += 1
+    return W, H, sizes
+
+
+def _ceil_div(a, b):
+    return -(-a // b)
+
+
+def area_bound(sheet_w, sheet_h, rectangles):
+    W, H, sizes = _sizes(sheet_w, sheet_h, rectangles)
+    if not W or not H:
+        return 0
+    area = sum(w * h * n for (w, h), n in sizes.items())
+    return _ceil_div(area, W * H)
+
+
+def l2_bound(sheet_w, sheet_h, rectangles):
+    """Fewest sheets any layout of `rectangles` (that fit at all) can use."""
+    W, H, sizes = _sizes(sheet_w, sheet_h, rectangles)
+    if not W or not H or not sizes:
+        return 0
+    A = W * H
+    total = sum(w * h * n for (w, h), n in sizes.items())
+    best = _ceil_div(total, A)
+
+    # Large pieces, biggest first, that can't share a sheet with any taken so far
+    # (all copies of a size that can't share with itself)
+    large = []
+    for size in sorted(sizes, key=lambda s: -(s[0] * s[1])):
+        if all(not _can_share(size, other, W, H) for other, _ in large):
+            large.append((size, sizes[size] if not _can_share(size, size, W, H) else 1))
+
+    # Every prefix of that list is also a set of pieces that need a sheet each
+    opened = 0
+    taken = Counter()
+    for size, copies in large:
+        opened += copies
+        taken[size] += copies
+        rest = {s: n - taken[s] for s, n in sizes.items() if n > taken[s]}
+        rest_area = sum(s[0] * s[1] * n for s, n in rest.items())
+
+        # Room next to each large piece, usable only by pieces that fit beside it
+        room = 0
+        for big, n in taken.items():
+            beside = sum(s[0] * s[1] * m for s, m in rest.items() if _can_share(big, s, W, H))
+            room += n * min(A - big[0] * big[1], beside)
+        best = max(best, opened + _ceil_div(max(0, rest_area - room), A))
+    return best
+
+
+def max_area(sheet_w, sheet_h, rectangles):
+    """Upper bound (sq in) on the piece area one sheet can hold."""
+    area = sum(r[0] * r[1] for r in rectangles if _fits(r[0], r[1], sheet_w, sheet_h))
+    return min(sheet_w * sheet_h, area)
+
+
+def yield_bound(sheet_w, sheet_h, rectangles):
+    """Best yield (0..1) a single sheet could reach with these pieces."""
+    sheet_area = sheet_w * sheet_h
+    return min(1.0, max_area(sheet_w, sheet_h, rectangles) / sheet_area) if sheet_area > 0 else 0.0
+
@@ -0,0 +1,431 @@
+# nesting/cutstock.py
+"""
+1D cutting stock for pipe / tube mode: cut a list of lengths from the pipe
+lengths in stock with as little scrap as possible.
+
+Lengths are worked in integer 1/16" units (see geometry). A blade kerf is
+charged once per cut, except when the last piece ends exactly at the end
+of the pipe — so a pipe of length L takes pieces l1..ln when
+
+    (l1 + kerf) + ... + (ln + kerf) <= L + kerf
+
+Three heuristics run on every plan:
+
+  * "ffd"  — first fit decreasing: longest piece first, into the first pipe
+             it fits, a new pipe only when none does,
+  * "bfd"  — best fit decreasing: same, but into the fullest pipe it fits,
+  * "fill" — cut one pipe at a time with the combination of remaining
+             pieces that fills it best (the rowfill knapsack), from the
+             stock length that gives the best fill.
+
+After ffd/bfd every pipe is swapped for the shortest stock length that
+still holds its pieces. Small orders (up to EXACT_PIECES cuts) are then
+solved exactly with a depth-first branch-and-bound seeded by the best
+heuristic, under a TIME_LIMIT so a hard instance never stalls the UI.
+Every plan carries lower_bound() (pipes and stock length), so the UI can
+show the gap, and a heuristic that already meets it skips the search. The
+cover table both of them use is built once per plan, with NumPy.
+
+The objective is the total stock length used; scrap is that minus the
+cut lengths (kerf loss + remnants).
+"""
+
+import time
+from math import ceil
+
+import numpy as np
+
+from nesting import rowfill
+from nesting.geometry import ceil_units, floor_units, from_units
+
+EXACT_PIECES = 24
+TIME_LIMIT = 0.25       # seconds for the exact search
+MIN_REMNANT = 6.0       # inches; shorter ends are scrap, not stock
+COVER_LIMIT = 200000    # units; longer demands use the fractional length bound
+
+
+class Stock:
+    def __init__(self, length, qty=None, ref=None, label=None):
+        self.length = float(length)     # inches
+        self.qty = qty                  # pipes on hand, None = unlimited
+        self.ref = ref                  # caller's item (inventory variant)
+        self.label = label or f"{round(self.length / 12, 2)} ft"
+
+    def __repr__(self):
+        return f"Stock({self.length}, qty={self.qty}, label={self.label!r})"
+
+
+class PipeCut:
+    def __init__(self, stock, cuts, kerf=0.0):
+        self.stock = stock
+        self.cuts = cuts                # [(length, label)] in cutting order
+        self.kerf = kerf
+
+    @property
+    def cut_length(self):
+        return sum(length for length, _ in self.cuts)
+
+    @property
+    def used_length(self):
+        """Cuts plus kerf, never more than the pipe."""
+        return min(self.stock.length, self.cut_length + self.kerf * len(self.cuts))
+
+    @property
+    def remnant(self):
+        return max(0.0, self.stock.length - self.used_length)
+
+    def pattern(self):
+        """Hashable (stock, sorted cut lengths) — identical pipes share it."""
+        return id(self.stock), tuple(sorted((round(l, 6) for l, _ in self.cuts), reverse=True))
+
+
+class CutPlan:
+    def __init__(self, pipes, unplaced, method, optimal=False):
+        self.pipes = pipes
+        self.unplaced = unplaced        # [(length, label)]
+        self.method = method
+        self.optimal = optimal
+        self.bound = (0, 0.0)           # (pipes, stock length) no plan can go below
+
+    @property
+    def pipe_gap(self):
+        return self.pipes_needed - self.bound[0]
+
+    @property
+    def yield_bound(self):
+        """Best yield any plan could reach: cut length over the stock-length bound."""
+        return min(1.0, self.cut_length / self.bound[1]) if self.bound[1] else 0.0
+
+    @property
+    def pipes_needed(self):
+        return len(self.pipes)
+
+    @property
+    def stock_length(self):
+        return sum(p.stock.length for p in self.pipes)
+
+    @property
+    def cut_length(self):
+        return sum(p.cut_length for p in self.pipes)
+
+    @property
+    def scrap(self):
+        return self.stock_length - self.cut_length
+
+    @property
+    def yield_ratio(self):
+        return self.cut_length / self.stock_length if self.stock_length else 0.0
+
+    def stock_counts(self):
+        """[(stock, pipes)] longest stock first."""
+        counts = {}
+        for p in self.pipes:
+            counts.setdefault(id(p.stock), [p.stock, 0])[1] += 1
+        return sorted((tuple(v) for v in counts.values()), key=lambda v: -v[0].length)
+
+    def patterns(self):
+        """[(pipe, repeat)] — identical pipes grouped, in first-seen order."""
+        groups = {}
+        for p in self.pipes:
+            groups.setdefault(p.pattern(), [p, 0])[1] += 1
+        return [tuple(v) for v in groups.values()]
+
+    def remnants(self, min_length=MIN_REMNANT):
+        return [(p.stock, p.remnant) for p in self.pipes if p.remnant >= min_length]
+
+
+# ---------- heuristics ----------
+class _Problem:
+    def __init__(self, cuts, stocks, kerf):
+        self.kerf_units = ceil_units(kerf) if kerf > 0 else 0
+        self.stocks = [s for s in stocks if s.length > 0 and (s.qty is None or s.qty > 0)]
+        self.caps = [floor_units(s.length) + self.kerf_units for s in self.stocks]
+        longest = max(self.caps, default=0)
+
+        pieces = [(ceil_units(length) + self.kerf_units, length, label) for length, label in cuts]
+        pieces.sort(key=lambda p: -p[0])
+        self.pieces = [p for p in pieces if p[0] <= longest]
+        self.too_long = [(length, label) for w, length, label in pieces if w > longest]
+
+    def available(self):
+        return [s.qty for s in self.stocks]
+
+
+def _shrink(problem, bins, avail):
+    """Move every pipe to the shortest stock that still holds it."""
+    for b in sorted(bins, key=lambda b: -b[2]):
+        load = b[2]
+        avail[b[0]] = None if avail[b[0]] is None else avail[b[0]] + 1
+        best = b[0]
+        for s, cap in enumerate(problem.caps):
+            if cap >= load and (avail[s] is None or avail[s] > 0) and cap < problem.caps[best]:
+                best = s
+        b[0] = best
+        if avail[best] is not None:
+            avail[best] -= 1
+
+
+def _pack_decreasing(problem, order, best_fit):
+    """ffd/bfd opening new pipes from stock in `order` (indices)."""
+    avail = problem.available()
+    bins = []           # [stock, free, load, [piece, ...]]
+    unplaced = []
+    for piece in problem.pieces:
+        w = piece[0]
+        target = None
+        for b in bins:
+            if b[1] >= w and (target is None or (best_fit and b[1] < target[1])):
+                target = b
+                if not best_fit:
+                    break
+        if target is None:
+            for s in order:
+                if problem.caps[s] >= w and (avail[s] is None or avail[s] > 0):
+                    target = [s, problem.caps[s], 0, []]
+                    bins.append(target)
+                    if avail[s] is not None:
+                        avail[s] -= 1
+                    break
+        if target is None:
+            unplaced.append(piece)
+            continue
+        target[1] -= w
+        target[2] += w
+        target[3].append(piece)
+    _shrink(problem, bins, avail)
+    return bins, unplaced
+
+
+def _pack_fill(problem):
+    """One pipe at a time, each filled as tightly as the knapsack allows."""
+    avail = problem.available()
+    groups = []
+    index = {}
+    for piece in problem.pieces:
+        if piece[0] not in index:
+            index[piece[0]] = len(groups)
+            groups.append([])
+        groups[index[piece[0]]].append(piece)
+    widths = [(g[0][0], g[0][0]) for g in groups]
+
+    bins = []
+    while any(groups):
+        counts = [len(g) for g in groups]
+        best = None
+        for s, cap in enumerate(problem.caps):
+            if avail[s] is not None and avail[s] <= 0:
+                continue
+            row = rowfill.best_row(widths, counts, cap)
+            load = sum(widths[g][0] for g, _ in row)
+            if not load:
+                continue
+            # Best fill ratio; on a tie the longer pipe (fewer pipes overall)
+            score = (load / cap, cap)
+            if best is None or score > best[0]:
+                best = (score, s, row, load)
+        if best is None:
+            break
+        _, s, row, load = best
+        if avail[s] is not None:
+            avail[s] -= 1
+        bins.append([s, problem.caps[s] - load, load, [groups[g].pop() for g, _ in row]])
+    unplaced = [p for g in groups for p in g]
+    return bins, unplaced
+
+
+# ---------- bounds ----------
+def _cover_table(problem):
+    """
+    cover[d] = least stock length whose capacity adds up to d units (stock on
+    hand ignored), for d up to the problem's demand; None past COVER_LIMIT.
+    cover[d] only looks back at least the shortest capacity, so the table is
+    filled a block of that many entries at a time.
+    """
+    total = sum(p[0] for p in problem.pieces)
+    if not problem.stocks or total > COVER_LIMIT:
+        return None
+    caps = np.array(problem.caps, dtype=np.int64)
+    lengths = caps - problem.kerf_units
+    cover = np.zeros(total + 1, dtype=np.int64)
+    step = max(1, int(caps.min()))
+    for lo in range(1, total + 1, step):
+        d = np.arange(lo, min(lo + step, total + 1))
+        back = np.maximum(0, d[None, :] - caps[:, None])
+        cover[d] = (lengths[:, None] + cover[back]).min(axis=0)
+    return cover.tolist()
+
+
+def _pipes_bound(widths, cap):
+    """Martello–Toth L2 for one pipe length `cap` (all in units, kerf included)."""
+    if not widths:
+        return 0
+    best = -(-sum(widths) // cap)
+    for alpha in sorted({0} | {w for w in widths if w <= cap // 2}):
+        big = [w for w in widths if w > cap - alpha]
+        mid = [w for w in widths if cap / 2 < w <= cap - alpha]
+        small = sum(w for w in widths if alpha <= w <= cap / 2)
+        room = len(mid) * cap - sum(mid)
+        best = max(best, len(big) + len(mid) + max(0, -(-(small - room) // cap)))
+    return best
+
+
+def lower_bound(cuts, stocks, kerf=0.0):
+    """
+    (pipes, stock_length) no plan for the cuts that fit can go below:
+    pipes from the longest stock (L2 bound), stock length from the cheapest
+    way to cover the demand plus one pipe per piece longer than half the
+    longest stock.
+    """
+    problem = _Problem(cuts, stocks, kerf)
+    return _lower_bound(problem, _cover_table(problem))
+
+
+def _lower_bound(problem, cover):
+    if not problem.stocks or not problem.pieces:
+        return 0, 0.0
+    widths = [p[0] for p in problem.pieces]
+    caps = problem.caps
+    lengths = [c - problem.kerf_units for c in caps]
+    longest = max(caps)
+    pipes = _pipes_bound(widths, longest)
+
+    total = sum(widths)
+    if cover is not None:
+        length = cover[total]
+    else:
+        length = ceil(total * min(l / c for l, c in zip(lengths, caps)))
+    # Pieces over half the longest pipe never share one: each needs its own
+    alone = sum(min(l for l, c in zip(lengths, caps) if c >= w) for w in widths if w > longest / 2)
+    return pipes, from_units(max(length, alone))
+
+
+# ---------- exact search ----------
+def _branch_and_bound(problem, incumbent, deadline, cover):
+    """
+    Depth-first over pieces (longest first): each goes into an open pipe or
+    opens one of the stock lengths. `cover` is the plan's _cover_table (None
+    falls back to the fractional length bound). Returns (bins, proven_optimal).
+    """
+    pieces = problem.pieces
+    caps = problem.caps
+    lengths = [c - problem.kerf_units for c in caps]
+    suffix = [0] * (len(pieces) + 1)
+    for i in range(len(pieces) - 1, -1, -1):
+        suffix[i] = suffix[i + 1] + pieces[i][0]
+    if cover is None:
+        ratio = min(l / c for l, c in zip(lengths, caps))
+        cover = np.ceil(np.arange(suffix[0] + 1) * ratio).astype(np.int64).tolist()
+
+    best = {"cost": sum(lengths[b[0]] for b in incumbent), "bins": None}
+    avail = problem.available()
+    bins = []           # [stock, free]
+    where = [0] * len(pieces)
+    nodes = [0]
+    timed_out = [False]
+
+    if best["cost"] <= cover[suffix[0]]:
+        return None, True
+
+    def search(i, cost):
+        nodes[0] += 1
+        if nodes[0] & 1023 == 0 and time.monotonic() > deadline:
+            timed_out[0] = True
+        if timed_out[0]:
+            return
+        if i == len(pieces):
+            best["cost"] = cost
+            best["bins"] = [(b[0], [pieces[j] for j in range(len(pieces)) if where[j] == k])
+                            for k, b in enumerate(bins)]
+            return
+
+        # Space below the shortest piece left can never be filled
+        smallest = pieces[-1][0]
+        free = sum(b[1] for b in bins if b[1] >= smallest)
+        if cost + cover[max(0, suffix[i] - free)] >= best["cost"]:
+            return
+
+        w = pieces[i][0]
+        # Identical pieces go into pipes in non-decreasing order (no mirror branches)
+        start = where[i - 1] if i and pieces[i - 1][0] == w else 0
+        tried = set()
+        for k in range(start, len(bins)):
+            b = bins[k]
+            if b[1] < w or b[1] in tried:
+                continue
+            tried.add(b[1])
+            b[1] -= w
+            where[i] = k
+            search(i + 1, cost)
+            b[1] += w
+
+        for s in sorted(range(len(caps)), key=lambda s: caps[s]):
+            if caps[s] < w or (avail[s] is not None and avail[s] <= 0):
+                continue
+            if cost + lengths[s] >= best["cost"]:
+                continue
+            if avail[s] is not None:
+                avail[s] -= 1
+            bins.append([s, caps[s] - w])
+            where[i] = len(bins) - 1
+            search(i + 1, cost + lengths[s])
+            bins.pop()
+            if avail[s] is not None:
+                avail[s] += 1
+
+    search(0, 0)
+    found = [[s, 0, 0, list(ps)] for s, ps in best["bins"]] if best["bins"] else None
+    return found, not timed_out[0]
+
+
+# ---------- plans ----------
+def _to_plan(problem, bins, unplaced, method, kerf, optimal=False):
+    pipes = []
+    for b in sorted(bins, key=lambda b: (-problem.stocks[b[0]].length, -sum(p[0] for p in b[3]))):
+        cuts = [(length, label) for _, length, label in sorted(b[3], key=lambda p: -p[0])]
+        pipes.append(PipeCut(problem.stocks[b[0]], cuts, kerf))
+    missing = problem.too_long + [(length, label) for _, length, label in unplaced]
+    return CutPlan(pipes, missing, method, optimal)
+
+
+def _plan_score(plan):
+    # Place everything, then least stock, fewest pipes, one big remnant over many small
+    return (len(plan.unplaced), round(plan.stock_length, 6), plan.pipes_needed,
+            -max((p.remnant for p in plan.pipes), default=0.0))
+
+
+def plan_cuts(cuts, stocks, kerf=0.0, exact_pieces=EXACT_PIECES, time_limit=TIME_LIMIT):
+    """
+    cuts: [(length_in, label)], stocks: [Stock]. Returns the best CutPlan;
+    pieces longer than every stock (or left when stock runs out) are in
+    plan.unplaced.
+    """
+    problem = _Problem(cuts, stocks, kerf)
+    if not problem.stocks:
+        return CutPlan([], list(cuts), "none")
+
+    longest_first = sorted(range(len(problem.caps)), key=lambda s: -problem.caps[s])
+    runs = [
+        ("ffd", _pack_decreasing(problem, longest_first, best_fit=False)),
+        ("bfd", _pack_decreasing(problem, longest_first, best_fit=True)),
+        ("fill", _pack_fill(problem)),
+    ]
+    plans = [(_to_plan(problem, bins, unplaced, name, kerf), bins) for name, (bins, unplaced) in runs]
+    plans.sort(key=lambda p: _plan_score(p[0]))
+    best, bins = plans[0]
+    cover = _cover_table(problem)
+    bound = _lower_bound(problem, cover)
+    best.bound = bound
+
+    fits_all = len(best.unplaced) == len(problem.too_long)
+    if fits_all and best.stock_length <= bound[1] + 1e-9:
+        # Heuristic already meets the bound: nothing left to search
+        best.optimal = True
+    elif fits_all and 0 < len(problem.pieces) <= exact_pieces:
+        found, proven = _branch_and_bound(problem, bins, time.monotonic() + time_limit, cover)
+        if found is not None:
+            exact = _to_plan(problem, found, [], "exact" if proven else "branch-and-bound", kerf, proven)
+            if _plan_score(exact) < _plan_score(best):
+                exact.bound = bound
+                best = exact
+        best.optimal = proven
+    return best
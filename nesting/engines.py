@@ -0,0 +1,170 @@
+# nesting/engines.py
+"""
+Common interface for sheet nesting engines.
+
+Every engine takes pieces as (w, h, label, is_bracket) in inches and returns
+(used, unplaced) exactly like ManufacturingModule.place_rectangles:
+
+    used     = [(x, y, w, h, label, is_bracket), ...]   # w/h after rotation
+    unplaced = [label, ...]
+
+Engines are registered in ENGINES by key; the manufacturing UI lists them
+by `title` and looks them up with get_engine().
+"""
+
+from nesting.blocks import block_place
+from nesting.geometry import Rect
+from nesting.guillotine import guillotine_place
+from nesting.maxrects import maxrects_place
+from nesting.skyline import Skyline
+
+
+class NestingEngine:
+    key = ""
+    title = ""
+    # Engines that decide piece order and orientation themselves; the
+    # portfolio runs them once instead of once per ordering / rotation
+    self_ordering = False
+
+    def __init__(self, kerf=0.0, allow_rotate=True, presort=False):
+        self.kerf = kerf
+        self.allow_rotate = allow_rotate
+        self.presort = presort
+        # Engines that produce a cut tree (guillotine) leave it here after pack()
+        self.last_tree = None
+
+    def order(self, rectangles):
+        """Largest-first order (long side, then area) when presort is on."""
+        if not self.presort:
+            return list(rectangles)
+        return sorted(rectangles, key=lambda r: (-max(r[0], r[1]), -(r[0] * r[1])))
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        raise NotImplementedError
+
+
+class SkylineEngine(NestingEngine):
+    key = "skyline"
+    title = "Skyline (bottom-left)"
+
+    def __init__(self, kerf=0.0, allow_rotate=True, presort=False, step=0.125):
+        super().__init__(kerf, allow_rotate, presort)
+        self.step = step
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        skyline = Skyline(sheet_w, sheet_h, step=self.step, kerf=self.kerf)
+        used, unplaced = [], []
+        for w, h, label, is_bracket in self.order(rectangles):
+            pos = skyline.place(w, h)
+            if not pos and self.allow_rotate and w != h:
+                pos = skyline.place(h, w)
+                if pos:
+                    w, h = h, w
+            if pos:
+                used.append(Rect(pos[0], pos[1], w, h, label, is_bracket))
+            else:
+                unplaced.append(label)
+        return used, unplaced
+
+
+class MaxRectsEngine(NestingEngine):
+    heuristic = "bssf"
+
+    def _run(self, sheet_w, sheet_h, rectangles, global_fit=False):
+        return maxrects_place(
+            sheet_w, sheet_h, rectangles,
+            heuristic=self.heuristic, kerf=self.kerf, allow_rotate=self.allow_rotate,
+            global_fit=global_fit,
+        )
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        if not self.presort:
+            # Manual order (drag & drop) is respected as-is
+            return self._run(sheet_w, sheet_h, rectangles)
+
+        # Each run is a few ms, so try the given order, largest-first and
+        # global best fit, and keep whichever covers the most sheet area.
+        candidates = [
+            self._run(sheet_w, sheet_h, rectangles),
+            self._run(sheet_w, sheet_h, self.order(rectangles)),
+            self._run(sheet_w, sheet_h, rectangles, global_fit=True),
+        ]
+        return max(candidates, key=lambda res: (layout_area(res[0]), -len(res[1])))
+
+
+class MaxRectsBSSF(MaxRectsEngine):
+    key = "maxrects-bssf"
+    title = "MaxRects — best short side fit"
+    heuristic = "bssf"
+
+
+class MaxRectsBAF(MaxRectsEngine):
+    key = "maxrects-baf"
+    title = "MaxRects — best area fit"
+    heuristic = "baf"
+
+
+class MaxRectsCP(MaxRectsEngine):
+    key = "maxrects-cp"
+    title = "MaxRects — contact point"
+    heuristic = "cp"
+
+
+class GuillotineEngine(NestingEngine):
+    stages = 2
+    self_ordering = True
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        used, unplaced, self.last_tree = guillotine_place(
+            sheet_w, sheet_h, rectangles,
+            stages=self.stages, kerf=self.kerf, allow_rotate=self.allow_rotate,
+        )
+        return used, unplaced
+
+
+class Guillotine2Stage(GuillotineEngine):
+    key = "guillotine-2"
+    title = "Guillotine shear — 2-stage"
+    stages = 2
+
+
+class Guillotine3Stage(GuillotineEngine):
+    key = "guillotine-3"
+    title = "Guillotine shear — 3-stage"
+    stages = 3
+
+
+class BlockEngine(NestingEngine):
+    key = "blocks"
+    title = "Blocks — identical cuts as rows × columns"
+    self_ordering = True
+
+    def pack(self, sheet_w, sheet_h, rectangles):
+        return block_place(sheet_w, sheet_h, rectangles, kerf=self.kerf, allow_rotate=self.allow_rotate)
+
+
+ENGINES = {
+    cls.key: cls
+    for cls in (SkylineEngine, MaxRectsBSSF, MaxRectsBAF, MaxRectsCP, Guillotine2Stage, Guillotine3Stage,
+                BlockEngine)
+}
+DEFAULT_ENGINE = SkylineEngine.key
+
+
+def get_engine(key, **options):
+    cls = ENGINES.get(key)
+    if cls is None:
+        raise KeyError(f"Unknown nesting engine: {key}")
+    return cls(**options)
+
+
+def layout_area(used):
+    return sum(r[2] * r[3] for r in used)
+
+
+def layout_yield(used, sheet_w, sheet_h):
+    """Fraction of the sheet area covered by placed pieces (0..1)."""
+    sheet_area = sheet_w * sheet_h
+    if sheet_area <= 0:
+        return 0.0
+    return layout_area(used) / sheet_area
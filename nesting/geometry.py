@@ -0,0 +1,176 @@
+# nesting/geometry.py
+"""
+Shared geometry core: one length grid and one parser for every nesting path.
+
+All lengths live on a 1/16" grid. A length is either
+
+  * integer units (UNITS per inch) — for DP tables, bounds, keys, or
+  * a "snapped" float: units / 16. Multiples of 1/16 are exact binary
+    floats, so sums, differences and comparisons of snapped values are
+    exact too — no 47.99999 vs 48.0 overlaps, and every engine gives the
+    same answer for the same input on every machine.
+
+Cut sizes are typed as whole inches + soot (1/8"), so snapping never moves
+them. Sheet and pipe sizes from inventory are floored onto the grid (a
+1220 mm sheet is not treated as longer than it is).
+
+parse_units() is memoized: the same few dozen cut strings are parsed over
+and over while sorting, nesting and redrawing.
+
+Rect / Piece are plain tuples with names, so existing (x, y, w, h, label,
+is_bracket) / (w, h, label, is_bracket) code keeps working unchanged.
+"""
+
+import re
+from collections import namedtuple
+from fractions import Fraction
+from functools import lru_cache
+from math import ceil, floor
+
+UNITS = 16          # 1/16"
+MM_PER_INCH = 25.4
+
+Rect = namedtuple("Rect", "x y w h label is_bracket")
+Piece = namedtuple("Piece", "w h label is_bracket")
+
+
+# ---------- units ----------
+def to_units(inches):
+    """Nearest 1/16"."""
+    return int(floor(inches * UNITS + 0.5))
+
+
+def ceil_units(inches):
+    """Rounded up — for pieces, so they never come out smaller."""
+    return int(ceil(inches * UNITS - 1e-9))
+
+
+def floor_units(inches):
+    """Rounded down — for stock, so it never comes out bigger."""
+    return int(floor(inches * UNITS + 1e-9))
+
+
+def from_units(units):
+    return units / UNITS
+
+
+def snap(inches):
+    return to_units(inches) / UNITS
+
+
+def snap_down(inches):
+    return floor_units(inches) / UNITS
+
+
+def to_inches(value, unit="inch"):
+    """Inventory value + unit ("ft", "mm", "cm", "inch"...) → inches (float)."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    unit = str(unit or "").strip().lower()
+    if unit in ("ft", "feet", "foot", "'"):
+        return value * 12
+    if unit == "mm":
+        return value / MM_PER_INCH
+    if unit == "cm":
+        return value * 10 / MM_PER_INCH
+    if unit == "m":
+        return value * 1000 / MM_PER_INCH
+    return value
+
+
+# ---------- parsing ----------
+_NUMBER = re.compile(r"^(\d+(?:\.\d*)?|\.\d+)?(?:[\s\-]+)?(\d+/\d+)?$")
+_UNIT_SUFFIX = re.compile(r"(mm|cm|ft|feet|foot|inches|inch|in|\"|')$")
+
+
+def _number(text):
+    """'60', '60.25', '60 1/4', '60-1/4', '1/4' → Fraction, or None."""
+    text = text.strip()
+    if not text:
+        return None
+    match = _NUMBER.match(text)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    value = Fraction(match.group(1)) if match.group(1) else Fraction(0)
+    if match.group(2):
+        value += Fraction(match.group(2))
+    return value
+
+
+@lru_cache(maxsize=4096)
+def parse_units(text):
+    """
+    Length text → integer 1/16" units, or None if it can't be read.
+    Accepts inches with soot ('60"', '60 1/4', '1/2'), decimals, feet
+    (5', 5 ft, 5' 3 1/2"), and metric (1220mm, 122 cm). No unit = inches.
+    """
+    text = str(text).strip().lower()
+    if not text:
+        return None
+
+    # Feet and inches: 5' 3 1/2"
+    if "'" in text and not text.endswith("'"):
+        feet, _, rest = text.partition("'")
+        feet_value = _number(feet)
+        rest_units = parse_units(rest)
+        if feet_value is None or rest_units is None:
+            return None
+        return to_units(float(feet_value * 12)) + rest_units
+
+    unit = "inch"
+    match = _UNIT_SUFFIX.search(text)
+    if match:
+        unit = {"\"": "inch", "inches": "inch", "in": "inch", "'": "ft"}.get(match.group(1), match.group(1))
+        text = text[:match.start()]
+
+    value = _number(text)
+    if value is None:
+        return None
+    return to_units(to_inches(float(value), unit))
+
+
+def parse_inches(text):
+    """Length text → snapped inches (0.0 if unreadable)."""
+    units = parse_units(text)
+    if units is None:
+        print(f"Invalid inch input: '{text}'")
+        return 0.0
+    return units / UNITS
+
+
+def format_inches(inches):
+    """Snapped mixed fraction: 60.25 → '60 1/4', 60 → '60'."""
+    units = to_units(inches)
+    whole, rest = divmod(units, UNITS)
+    if not rest:
+        return f"{whole}"
+    fraction = Fraction(rest, UNITS)
+    return f"{whole} {fraction.numerator}/{fraction.denominator}"
+
+
+# ---------- rectangles ----------
+def snap_piece(piece):
+    w, h, label, is_bracket = piece
+    return Piece(snap(w), snap(h), label, is_bracket)
+
+
+def rect_units(rects):
+    """[(x, y, w, h, ...)] → [(x, y, w, h)] in integer units."""
+    return [(to_units(r[0]), to_units(r[1]), to_units(r[2]), to_units(r[3])) for r in rects]
+
+
+def overlaps(rects):
+    """Index pairs of rectangles that overlap (touching edges is fine)."""
+    boxes = sorted((x, y, x + w, y + h, i) for i, (x, y, w, h) in enumerate(rect_units(rects)))
+    found = []
+    for a in range(len(boxes)):
+        x0, y0, x1, y1, i = boxes[a]
+        for b in range(a + 1, len(boxes)):
+            bx0, by0, bx1, by1, j = boxes[b]
+            if bx0 >= x1:
+                break       # sorted by x: nothing further right can overlap
+            if by0 < y1 and y0 < by1:
+                found.append((i, j))
+    return found
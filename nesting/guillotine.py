@@ -0,0 +1,215 @@
+# nesting/guillotine.py
+"""
+Staged guillotine nesting for shear machines.
+
+Every cut runs edge-to-edge through the piece of metal being cut:
+
+  stage 1 — the sheet is sheared into full-width strips,
+  stage 2 — each strip is sheared into stacks (columns),
+  stage 3 — (3-stage only) a stack is sheared into pieces stacked on top
+            of each other; a piece may be narrower than its stack.
+
+Anything left over above a shorter piece / beside a narrower piece comes
+off with a trim cut, which cut_sequence() lists one stage after the cut
+that freed the piece. A blade kerf is left between neighbouring cuts.
+
+The layout is returned as a CutNode tree (sheet → strip → stack → piece),
+and cut_sequence() flattens it into the ordered list of shear cuts.
+"""
+
+from nesting.geometry import Rect
+
+
+class CutNode:
+    __slots__ = ("kind", "x", "y", "w", "h", "label", "is_bracket", "split", "children")
+
+    # Children of a sheet/stack sit on top of each other (horizontal cuts),
+    # children of a strip sit side by side (vertical cuts).
+    SPLITS = {"sheet": "h", "strip": "v", "stack": "h", "piece": None}
+
+    def __init__(self, kind, x, y, w, h, label=None, is_bracket=False):
+        self.kind = kind          # "sheet" | "strip" | "stack" | "piece"
+        self.split = self.SPLITS[kind]
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.label = label
+        self.is_bracket = is_bracket
+        self.children = []
+
+    def transposed(self):
+        node = CutNode(self.kind, self.y, self.x, self.h, self.w, self.label, self.is_bracket)
+        node.split = {"h": "v", "v": "h"}.get(self.split)
+        node.children = [c.transposed() for c in self.children]
+        return node
+
+    def pieces(self):
+        """All placed pieces as (x, y, w, h, label, is_bracket)."""
+        if self.kind == "piece":
+            return [Rect(self.x, self.y, self.w, self.h, self.label, self.is_bracket)]
+        out = []
+        for child in self.children:
+            out.extend(child.pieces())
+        return out
+
+    def to_dict(self):
+        data = {"kind": self.kind, "x": self.x, "y": self.y, "w": self.w, "h": self.h}
+        if self.split:
+            data["split"] = self.split
+        if self.kind == "piece":
+            data["label"] = self.label
+            data["is_bracket"] = self.is_bracket
+        if self.children:
+            data["children"] = [c.to_dict() for c in self.children]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        node = cls(data["kind"], data["x"], data["y"], data["w"], data["h"],
+                   data.get("label"), data.get("is_bracket", False))
+        node.split = data.get("split")
+        node.children = [cls.from_dict(c) for c in data.get("children", [])]
+        return node
+
+
+def cut_sequence(root):
+    """
+    Ordered shear cuts for a CutNode tree: [(stage, x1, y1, x2, y2), ...].
+    A cut is emitted wherever a child ends before its parent's far edge,
+    plus one trim cut per piece that is smaller than its slot.
+    """
+    cuts = []
+
+    def walk(node, stage):
+        horizontal = node.split == "h"
+        for child in node.children:
+            if horizontal:
+                end = child.y + child.h
+                if end < node.y + node.h:
+                    cuts.append((stage, node.x, end, node.x + node.w, end))
+            else:
+                end = child.x + child.w
+                if end < node.x + node.w:
+                    cuts.append((stage, end, node.y, end, node.y + node.h))
+            if child.kind == "piece":
+                # Trim whatever the piece leaves over inside its slot
+                if horizontal and child.x + child.w < node.x + node.w:
+                    cuts.append((stage + 1, child.x + child.w, child.y, child.x + child.w, child.y + child.h))
+                if not horizontal and child.y + child.h < node.y + node.h:
+                    cuts.append((stage + 1, child.x, child.y + child.h, child.x + child.w, child.y + child.h))
+            else:
+                walk(child, stage + 1)
+
+    walk(root, 1)
+    return cuts
+
+
+def _orient(rect, policy):
+    w, h, label, is_bracket = rect
+    if policy == "tall" and w > h:
+        w, h = h, w
+    elif policy == "wide" and h > w:
+        w, h = h, w
+    return w, h, label, is_bracket
+
+
+def _pack_strips(sheet_w, sheet_h, pieces, stages, kerf, allow_rotate):
+    """First-fit decreasing-height strip packing; returns (root, unplaced)."""
+    root = CutNode("sheet", 0.0, 0.0, sheet_w, sheet_h)
+    strips = []        # [strip_node, used_w]
+    columns = {}       # id(strip_node) -> [[stack_node, used_h], ...]
+    next_y = 0.0
+    unplaced = []
+
+    def add_piece(stack, w, h, y, label, is_bracket):
+        stack.children.append(CutNode("piece", stack.x, y, w, h, label, is_bracket))
+
+    for w, h, label, is_bracket in pieces:
+        options = [(w, h)]
+        if allow_rotate and w != h:
+            options.append((h, w))
+        placed = False
+
+        for strip in strips:
+            node, used_w = strip
+            # Tallest orientation that still fits under the strip wastes least
+            fitting = sorted((o for o in options if o[1] <= node.h), key=lambda o: -o[1])
+
+            if stages >= 3:
+                for ow, oh in fitting:
+                    for col in columns[id(node)]:
+                        stack, used_h = col
+                        if ow <= stack.w and used_h + kerf + oh <= node.h:
+                            add_piece(stack, ow, oh, node.y + used_h + kerf, label, is_bracket)
+                            col[1] = used_h + kerf + oh
+                            placed = True
+                            break
+                    if placed:
+                        break
+            if placed:
+                break
+
+            for ow, oh in fitting:
+                x = used_w + kerf if used_w else 0.0
+                if x + ow <= sheet_w:
+                    stack = CutNode("stack", x, node.y, ow, node.h)
+                    node.children.append(stack)
+                    add_piece(stack, ow, oh, node.y, label, is_bracket)
+                    columns[id(node)].append([stack, oh])
+                    strip[1] = x + ow
+                    placed = True
+                    break
+            if placed:
+                break
+
+        if placed:
+            continue
+
+        # Open a new strip with the piece as given (already oriented by policy)
+        y = next_y + kerf if strips else 0.0
+        for ow, oh in options:
+            if ow <= sheet_w and y + oh <= sheet_h:
+                node = CutNode("strip", 0.0, y, sheet_w, oh)
+                root.children.append(node)
+                stack = CutNode("stack", 0.0, y, ow, oh)
+                node.children.append(stack)
+                add_piece(stack, ow, oh, y, label, is_bracket)
+                strips.append([node, ow])
+                columns[id(node)] = [[stack, oh]]
+                next_y = y + oh
+                placed = True
+                break
+
+        if not placed:
+            unplaced.append(label)
+
+    return root, unplaced
+
+
+def guillotine_place(sheet_w, sheet_h, rectangles, stages=2, kerf=0.0, allow_rotate=True):
+    """
+    Best staged-guillotine layout over a small portfolio of runs
+    (piece orientation policy × strip direction).
+    Returns (used, unplaced, tree).
+    """
+    best = None
+    for policy in ("given", "tall", "wide"):
+        oriented = [_orient(r, policy) if allow_rotate else tuple(r) for r in rectangles]
+        for transpose in (False, True):
+            if transpose:
+                pieces = [(h, w, label, br) for w, h, label, br in oriented]
+                W, H = sheet_h, sheet_w
+            else:
+                pieces = oriented
+                W, H = sheet_w, sheet_h
+            pieces = sorted(pieces, key=lambda r: (-r[1], -r[0]))
+            root, unplaced = _pack_strips(W, H, pieces, stages, kerf, allow_rotate)
+            if transpose:
+                root = root.transposed()
+            used = root.pieces()
+            score = (sum(r[2] * r[3] for r in used), -len(unplaced), -len(root.children))
+            if best is None or score > best[0]:
+                best = (score, used, unplaced, root)
+    _, used, unplaced, root = best
+    return used, unplaced, root
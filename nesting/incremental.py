@@ -0,0 +1,81 @@
+# nesting/incremental.py
+"""
+Incremental skyline layout for drag-and-drop reordering.
+
+Dragging a block only changes the piece order from the drop point on, so
+re-packing the whole sheet on every mouse move is wasted work. The layout
+keeps a Skyline.copy() checkpoint every CHECKPOINT_EVERY pieces; when a new
+order comes in, the longest common prefix with the previous order is kept
+and only the suffix is re-placed, starting from the last checkpoint at or
+before the point where they diverge. (A copy costs about as much as a few
+placements, so checkpointing every piece would be slower than re-packing.)
+
+Placement rules are exactly ManufacturingModule.place_rectangles without the
+row-fill fallback (upright first, then turned; bottom-left on the skyline),
+so a full re-pack and an incremental one give the same layout.
+"""
+
+from nesting.geometry import Rect
+from nesting.skyline import Skyline
+
+CHECKPOINT_EVERY = 8
+
+
+class IncrementalSkyline:
+    def __init__(self, sheet_w, sheet_h, kerf=0.0, step=0.125, every=CHECKPOINT_EVERY):
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.kerf = kerf
+        self.step = step
+        self.every = every
+        self.pieces = []        # order of the last layout
+        self.results = []       # Rect or None (unplaced) per piece
+        self.checkpoints = []   # skyline state before piece i * every
+        self.replayed = 0       # pieces re-placed by the last layout() call
+        self._end_state = None
+
+    def matches(self, sheet_w, sheet_h, kerf):
+        return (self.sheet_w, self.sheet_h, self.kerf) == (sheet_w, sheet_h, kerf)
+
+    def _common_prefix(self, pieces):
+        n = min(len(pieces), len(self.pieces))
+        k = 0
+        while k < n and tuple(pieces[k]) == tuple(self.pieces[k]):
+            k += 1
+        return k
+
+    def layout(self, pieces):
+        """(used, unplaced) for `pieces` in order, reusing the unchanged prefix."""
+        pieces = [tuple(p) for p in pieces]
+        k = self._common_prefix(pieces)
+
+        if k and k == len(self.pieces):
+            # Whole previous order is a prefix: carry on from its end state
+            start, skyline = k, self._end_state
+        elif k >= self.every:
+            c = min(k // self.every, len(self.checkpoints) - 1)
+            start, skyline = c * self.every, self.checkpoints[c].copy()
+        else:
+            start, skyline = 0, Skyline(self.sheet_w, self.sheet_h, step=self.step, kerf=self.kerf)
+
+        del self.results[start:]
+        del self.checkpoints[(start + self.every - 1) // self.every:]
+
+        for i in range(start, len(pieces)):
+            w, h, label, is_bracket = pieces[i]
+            if i % self.every == 0:
+                self.checkpoints.append(skyline.copy())
+            pos = skyline.place(w, h)
+            if not pos and w != h:
+                pos = skyline.place(h, w)
+                if pos:
+                    w, h = h, w
+            self.results.append(Rect(pos[0], pos[1], w, h, label, is_bracket) if pos else None)
+
+        self._end_state = skyline
+        self.pieces = pieces
+        self.replayed = len(pieces) - start
+
+        used = [r for r in self.results if r is not None]
+        unplaced = [p[2] for p, r in zip(pieces, self.results) if r is None]
+        return used, unplaced
@@ -0,0 +1,129 @@
+# nesting/jobs.py
+"""
+Sheet layout jobs that can run off the GUI thread.
+
+A NestJob carries everything one layout needs (sheet, pieces, engine and
+options), so the worker running it never touches a widget:
+
+    job = NestJob(48, 96, rectangles, engine_key="skyline", kerf=0.0625)
+    used, unplaced, tree = job.run(progress=lambda done, total: ...)
+
+run() checks job.cancelled between pieces and raises Cancelled once it is
+set, so a superseded layout stops early instead of finishing for nothing.
+Jobs are numbered in the order they are made; the screen that starts them
+only keeps the result of the newest one.
+
+place_rectangles() is the in-app skyline layout (bottom-left, upright then
+turned, row-fill fallback when something does not fit). The layout cache
+is not touched here — callers read and fill it on their own thread.
+"""
+
+import threading
+from itertools import count
+
+from nesting import rowfill
+from nesting.engines import SkylineEngine, get_engine
+from nesting.geometry import Rect
+from nesting.layout_cache import layout_key
+from nesting.skyline import Skyline
+
+_job_ids = count(1)
+
+
+class Cancelled(Exception):
+    pass
+
+
+def place_rectangles(sheet_w, sheet_h, rectangles, fallback_allowed=True, kerf=0.0, checkpoint=None):
+    """
+    Skyline bottom-left, upright first then turned. When a piece does not
+    fit and fallback_allowed, the whole list is re-run once in best-width
+    rows (rowfill). checkpoint(done, total) is called before every piece.
+    """
+    used = []
+    unplaced = []
+    step = 0.125        # Resolution (1/8 inch)
+    total = len(rectangles)
+
+    # Segment-tree skyline: same bottom-left result as scanning every x-step
+    skyline = Skyline(sheet_w, sheet_h, step=step, kerf=kerf)
+    try_place = skyline.place
+
+    for i, (w, h, label, is_bracket) in enumerate(rectangles):
+        if checkpoint:
+            checkpoint(i, total)
+
+        # Try original orientation
+        pos = try_place(w, h)
+
+        # Try rotated
+        if not pos and w != h:
+            pos = try_place(h, w)
+            if pos:
+                w, h = h, w  # apply rotation
+
+        if pos:
+            x, y = pos
+            used.append(Rect(x, y, w, h, label, is_bracket))
+        elif fallback_allowed:
+            optimized = rowfill.fill_rows(sheet_w, sheet_h, rectangles)
+            return place_rectangles(sheet_w, sheet_h, optimized, fallback_allowed=False,
+                                    kerf=kerf, checkpoint=checkpoint)
+        else:
+            unplaced.append(label)
+
+    if checkpoint:
+        checkpoint(total, total)
+    return used, unplaced
+
+
+class NestJob:
+    def __init__(self, sheet_w, sheet_h, rectangles, engine_key=SkylineEngine.key, kerf=0.0,
+                 presort=False, fallback_allowed=True, ordered=True):
+        self.id = next(_job_ids)
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.rectangles = list(rectangles)
+        self.engine_key = engine_key
+        self.kerf = kerf
+        self.presort = presort
+        self.fallback_allowed = fallback_allowed
+        self.ordered = ordered
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cache_key(self):
+        return layout_key(
+            self.sheet_w, self.sheet_h, self.rectangles, self.engine_key,
+            {"kerf": self.kerf, "presort": self.presort, "fallback": self.fallback_allowed},
+            ordered=self.ordered,
+        )
+
+    def run(self, progress=None):
+        """(used, unplaced, cut_tree). Raises Cancelled if cancel() was called meanwhile."""
+        def checkpoint(done, total):
+            if self._cancel.is_set():
+                raise Cancelled()
+            if progress:
+                progress(done, total)
+
+        total = len(self.rectangles)
+        if self.engine_key == SkylineEngine.key:
+            used, unplaced = place_rectangles(
+                self.sheet_w, self.sheet_h, self.rectangles,
+                fallback_allowed=self.fallback_allowed, kerf=self.kerf, checkpoint=checkpoint,
+            )
+            return used, unplaced, None
+
+        # Other engines place in one call: progress at start and end only
+        checkpoint(0, total)
+        engine = get_engine(self.engine_key, kerf=self.kerf, presort=self.presort)
+        used, unplaced = engine.pack(self.sheet_w, self.sheet_h, self.rectangles)
+        checkpoint(total, total)
+        return used, unplaced, engine.last_tree
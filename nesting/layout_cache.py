@@ -0,0 +1,166 @@
+# nesting/layout_cache.py
+"""
+Layout cache: the same shelf products come back again and again, so a
+finished layout is stored under a hash of everything that determines it
+
+    (sheet_w, sheet_h, cuts, engine, options)
+
+in an in-memory LRU and as a small JSON file under the app cache dir, so a
+repeated layout is instant, also after a restart. The directory is kept to
+DISK_ENTRIES files / DISK_BYTES: every PRUNE_EVERY writes (and on the first
+one) the least recently used files, by mtime, are removed; a disk hit
+refreshes its file's mtime.
+
+Cuts are keyed as a sorted multiset unless `ordered=True` — use that when
+the caller's piece order matters (manual drag order, auto-sort off).
+Bump CACHE_VERSION whenever an engine's output changes.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from nesting.geometry import Rect
+from nesting.guillotine import CutNode
+from utils.paths import app_cache_dir
+
+CACHE_VERSION = 1
+MEMORY_ENTRIES = 256
+DISK_ENTRIES = 2000
+DISK_BYTES = 32 * 1024 * 1024
+PRUNE_EVERY = 64        # writes between directory scans
+
+
+def layout_key(sheet_w, sheet_h, rectangles, engine, options=None, ordered=False):
+    """Canonical sha1 for a layout request."""
+    cuts = [(round(float(w), 6), round(float(h), 6), str(label), bool(is_bracket))
+            for w, h, label, is_bracket in rectangles]
+    if not ordered:
+        cuts.sort()
+    payload = {
+        "v": CACHE_VERSION,
+        "sheet": [round(float(sheet_w), 6), round(float(sheet_h), 6)],
+        "engine": engine,
+        "options": options or {},
+        "ordered": bool(ordered),
+        "cuts": cuts,
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class LayoutCache:
+    def __init__(self, maxsize=MEMORY_ENTRIES, directory=None, persist=True,
+                 disk_entries=DISK_ENTRIES, disk_bytes=DISK_BYTES):
+        self.maxsize = maxsize
+        self.persist = persist
+        self.disk_entries = disk_entries
+        self.disk_bytes = disk_bytes
+        self._directory = directory
+        self._memory = OrderedDict()
+        self._writes = 0
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = os.path.join(app_cache_dir(), "layouts")
+        return self._directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """(used, unplaced, tree) or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        elif self.persist:
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+                os.utime(path)      # recently used: pruned last
+            except Exception:
+                return None
+            self._remember(key, entry)
+        else:
+            return None
+
+        used = [Rect._make(r) for r in entry["used"]]
+        tree = CutNode.from_dict(entry["tree"]) if entry.get("tree") else None
+        # JSON turns tuples into lists: hand back the same types as a memory hit
+        unplaced = [tuple(u) if isinstance(u, list) else u for u in entry["unplaced"]]
+        return used, unplaced, tree
+
+    def put(self, key, used, unplaced, tree=None):
+        entry = {
+            "used": [list(r) for r in used],
+            "unplaced": list(unplaced),
+            "tree": tree.to_dict() if tree is not None else None,
+        }
+        self._remember(key, entry)
+        if not self.persist:
+            return
+        try:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except Exception:
+            return
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+        self._writes += 1
+
+    def prune(self):
+        """Drop the least recently used files beyond disk_entries / disk_bytes."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        files.sort(reverse=True)
+        kept = size = 0
+        for _, nbytes, path in files:
+            if kept < self.disk_entries and size + nbytes <= self.disk_bytes and path.endswith(".json"):
+                kept += 1
+                size += nbytes
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        if disk and self.persist:
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+
+_shared = None
+
+
+def shared_cache():
+    """Process-wide cache used by the manufacturing screens."""
+    global _shared
+    if _shared is None:
+        _shared = LayoutCache()
+    return _shared
@@ -0,0 +1,98 @@
+# nesting/leftovers.py
+"""
+Leftover extraction straight from the placed-rectangle geometry.
+
+The occupancy grid flood (see occupancy) walks the sheet row by row on a
+1/8" raster, so one L-shaped offcut comes out as a strip per row change
+and the inventory fills up with slivers. Here the free space is cut into
+a few large, non-overlapping rectangles instead:
+
+  * the piece edges split the sheet into a compressed grid — at most
+    2n + 1 columns and rows for n pieces, whatever the sheet size,
+  * every maximal free rectangle shows up as a bar of the usual
+    "largest rectangle in a histogram" sweep over those cells,
+  * the largest one whose short side is at least `min_size` is taken,
+    its cells marked used, and the sweep repeats until nothing usable
+    is left.
+
+Work grows with the piece count (cells are (2n + 1)^2), not with the sheet
+area or its resolution. Edges are kept in 1/16" units (see geometry):
+pieces are rounded outwards and the sheet down, so a leftover never
+overlaps a cut.
+"""
+
+from nesting.geometry import ceil_units, floor_units, from_units
+
+MIN_LEFTOVER = 1.5   # inches; smaller scraps are not worth stocking
+
+
+def _edges(sheet, starts, ends):
+    return sorted({0, sheet} | {min(max(v, 0), sheet) for v in starts + ends})
+
+
+def _best_rectangle(free, xs, ys, row, min_units):
+    """Largest (area, c0, r0, c1, r1) free rectangle in cell indices, or None."""
+    cols = len(xs) - 1
+    heights = [0] * cols        # units of free space ending at the current row
+    best = None
+    for r in range(len(ys) - 1):
+        row_h = ys[r + 1] - ys[r]
+        for c in range(cols):
+            heights[c] = heights[c] + row_h if free[r][c] else 0
+
+        stack = []              # column indices with increasing height
+        for c in range(cols + 1):
+            h = heights[c] if c < cols else 0
+            while stack and heights[stack[-1]] >= h:
+                top = stack.pop()
+                bar = heights[top]
+                left = stack[-1] + 1 if stack else 0
+                width = xs[c] - xs[left]
+                if bar and min(bar, width) >= min_units:
+                    area = bar * width
+                    if best is None or area > best[0]:
+                        best = (area, left, row[ys[r + 1] - bar], c, r + 1)
+            if c < cols:
+                stack.append(c)
+    return best
+
+
+def free_rectangles(sheet_w, sheet_h, rects, min_size=0.0):
+    """
+    Non-overlapping leftover rectangles [(x, y, w, h)] in inches, largest
+    first. Each has both sides >= min_size. rects: (x, y, w, h, *extra).
+    """
+    W, H = floor_units(sheet_w), floor_units(sheet_h)
+    if W <= 0 or H <= 0:
+        return []
+    boxes = []
+    for x, y, w, h, *_ in rects:
+        x0, y0 = floor_units(x), floor_units(y)
+        x1, y1 = ceil_units(x + w), ceil_units(y + h)
+        if x0 < W and y0 < H and x1 > 0 and y1 > 0 and x0 < x1 and y0 < y1:
+            boxes.append((x0, y0, x1, y1))
+
+    xs = _edges(W, [b[0] for b in boxes], [b[2] for b in boxes])
+    ys = _edges(H, [b[1] for b in boxes], [b[3] for b in boxes])
+    col = {v: i for i, v in enumerate(xs)}
+    row = {v: i for i, v in enumerate(ys)}
+
+    free = [[True] * (len(xs) - 1) for _ in range(len(ys) - 1)]
+    for x0, y0, x1, y1 in boxes:
+        c0, c1 = col[max(x0, 0)], col[min(x1, W)]
+        for r in range(row[max(y0, 0)], row[min(y1, H)]):
+            free[r][c0:c1] = [False] * (c1 - c0)
+
+    # Anything thinner than a 1/16" can't be stocked even with min_size=0
+    min_units = max(1, ceil_units(min_size))
+    found = []
+    while True:
+        best = _best_rectangle(free, xs, ys, row, min_units)
+        if best is None:
+            break
+        _, c0, r0, c1, r1 = best
+        for r in range(r0, r1):
+            free[r][c0:c1] = [False] * (c1 - c0)
+        found.append((from_units(xs[c0]), from_units(ys[r0]),
+                      from_units(xs[c1] - xs[c0]), from_units(ys[r1] - ys[r0])))
+    return found
@@ -0,0 +1,190 @@
+# nesting/maxrects.py
+"""
+MaxRects sheet packer (Jylänki, "A Thousand Ways to Pack the Bin").
+
+Free space is kept as a list of maximal, possibly overlapping rectangles.
+Placing a piece splits every free rectangle it touches into up to four
+maximal leftovers; leftovers fully contained in another free rectangle are
+pruned. Only the freshly split rectangles need the containment check — the
+untouched ones were already maximal — which keeps each placement roughly
+linear in the free-list size.
+
+Scoring heuristics (lower is better):
+  * "bssf" — best short side fit
+  * "baf"  — best area fit
+  * "cp"   — contact point (most edge length touching sheet/placed parts)
+"""
+
+from nesting.geometry import Rect
+
+HEURISTICS = ("bssf", "baf", "cp")
+
+
+class MaxRectsBin:
+    def __init__(self, sheet_w, sheet_h, heuristic="bssf", kerf=0.0, allow_rotate=True):
+        if heuristic not in HEURISTICS:
+            raise ValueError(f"Unknown MaxRects heuristic: {heuristic}")
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.heuristic = heuristic
+        self.kerf = kerf
+        self.allow_rotate = allow_rotate
+        # Kerf is added to every piece; growing the bin by one kerf lets the
+        # last piece in a row/column sit flush against the sheet edge.
+        self.bin_w = sheet_w + kerf
+        self.bin_h = sheet_h + kerf
+        self.free = [(0.0, 0.0, self.bin_w, self.bin_h)]
+        self.used = []  # (x, y, w, h) incl. kerf, for contact scoring
+
+    # ---------- scoring ----------
+    def _contact(self, x, y, w, h):
+        score = 0.0
+        if x == 0 or x + w == self.bin_w:
+            score += h
+        if y == 0 or y + h == self.bin_h:
+            score += w
+        for ux, uy, uw, uh in self.used:
+            if ux == x + w or ux + uw == x:
+                overlap = min(uy + uh, y + h) - max(uy, y)
+                if overlap > 0:
+                    score += overlap
+            if uy == y + h or uy + uh == y:
+                overlap = min(ux + uw, x + w) - max(ux, x)
+                if overlap > 0:
+                    score += overlap
+        return score
+
+    def _score(self, fx, fy, fw, fh, w, h):
+        if self.heuristic == "bssf":
+            lw, lh = fw - w, fh - h
+            return (min(lw, lh), max(lw, lh), fy, fx)
+        if self.heuristic == "baf":
+            lw, lh = fw - w, fh - h
+            return (fw * fh - w * h, min(lw, lh), fy, fx)
+        return (-self._contact(fx, fy, w, h), fy, fx)
+
+    def find(self, w, h):
+        """Best (score, x, y, w, h) for a piece (kerf excluded), or None."""
+        pw, ph = w + self.kerf, h + self.kerf
+        options = [(pw, ph)]
+        if self.allow_rotate and w != h:
+            options.append((ph, pw))
+
+        best = None
+        for fx, fy, fw, fh in self.free:
+            for ow, oh in options:
+                if ow <= fw and oh <= fh:
+                    score = self._score(fx, fy, fw, fh, ow, oh)
+                    if best is None or score < best[0]:
+                        best = (score, fx, fy, ow, oh)
+        if best is None:
+            return None
+        score, x, y, ow, oh = best
+        return score, x, y, ow - self.kerf, oh - self.kerf
+
+    # ---------- free-list maintenance ----------
+    def commit(self, x, y, w, h):
+        pw, ph = w + self.kerf, h + self.kerf
+        px2, py2 = x + pw, y + ph
+
+        kept = []
+        fresh = []
+        for fr in self.free:
+            fx, fy, fw, fh = fr
+            fx2, fy2 = fx + fw, fy + fh
+            if x >= fx2 or px2 <= fx or y >= fy2 or py2 <= fy:
+                kept.append(fr)
+                continue
+            if x > fx:
+                fresh.append((fx, fy, x - fx, fh))
+            if px2 < fx2:
+                fresh.append((px2, fy, fx2 - px2, fh))
+            if y > fy:
+                fresh.append((fx, fy, fw, y - fy))
+            if py2 < fy2:
+                fresh.append((fx, py2, fw, fy2 - py2))
+
+        # Prune split leftovers contained in any other free rectangle
+        survivors = []
+        for i, a in enumerate(fresh):
+            ax, ay, aw, ah = a
+            ax2, ay2 = ax + aw, ay + ah
+            contained = False
+            for j, b in enumerate(fresh):
+                if i == j:
+                    continue
+                bx, by, bw, bh = b
+                if bx <= ax and by <= ay and ax2 <= bx + bw and ay2 <= by + bh:
+                    # Identical duplicates: keep the first one only
+                    if a != b or j < i:
+                        contained = True
+                        break
+            if not contained:
+                for bx, by, bw, bh in kept:
+                    if bx <= ax and by <= ay and ax2 <= bx + bw and ay2 <= by + bh:
+                        contained = True
+                        break
+            if not contained:
+                survivors.append(a)
+
+        self.free = kept + survivors
+        self.used.append((x, y, pw, ph))
+
+    def place(self, w, h):
+        """find() + commit(); returns (x, y, w, h) as placed or None."""
+        spot = self.find(w, h)
+        if spot is None:
+            return None
+        _, x, y, pw, ph = spot
+        self.commit(x, y, pw, ph)
+        return x, y, pw, ph
+
+
+def maxrects_place(sheet_w, sheet_h, rectangles, heuristic="bssf", kerf=0.0, allow_rotate=True, global_fit=False):
+    """
+    Pack (w, h, label, is_bracket) pieces; returns (used, unplaced).
+
+    global_fit=False places pieces in the given order (respects manual
+    ordering). global_fit=True repeatedly places whichever remaining piece
+    scores best anywhere on the sheet; identical sizes are scored once, so
+    repetitive shelf cut lists stay cheap.
+    """
+    bin_ = MaxRectsBin(sheet_w, sheet_h, heuristic=heuristic, kerf=kerf, allow_rotate=allow_rotate)
+    used = []
+    unplaced = []
+
+    if not global_fit:
+        for w, h, label, is_bracket in rectangles:
+            spot = bin_.place(w, h)
+            if spot is None:
+                unplaced.append(label)
+                continue
+            x, y, pw, ph = spot
+            used.append(Rect(x, y, pw, ph, label, is_bracket))
+        return used, unplaced
+
+    # Group identical sizes, keeping first-seen order for tie-breaks
+    groups = {}
+    for rect in rectangles:
+        groups.setdefault((rect[0], rect[1]), []).append(rect)
+
+    while groups:
+        best = None
+        for size in list(groups):
+            spot = bin_.find(*size)
+            if spot is None:
+                # Free space only shrinks, so this size will never fit again
+                unplaced.extend(r[2] for r in groups.pop(size))
+                continue
+            if best is None or spot[0] < best[1][0]:
+                best = (size, spot)
+        if best is None:
+            break
+        size, (_, x, y, pw, ph) = best
+        bin_.commit(x, y, pw, ph)
+        _, _, label, is_bracket = groups[size].pop(0)
+        if not groups[size]:
+            del groups[size]
+        used.append(Rect(x, y, pw, ph, label, is_bracket))
+
+    return used, unplaced
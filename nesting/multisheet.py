@@ -0,0 +1,222 @@
+# nesting/multisheet.py
+"""
+Order-level nesting: pack every cut of an order across as few raw sheets
+as possible.
+
+Pieces are sorted largest-first and dropped into incremental sheet bins:
+
+  * "ffd" — first fit decreasing: the first open sheet that takes it,
+  * "bfd" — best fit decreasing: the fullest open sheet that takes it,
+
+and a new sheet is opened only when nothing fits. A third strategy,
+
+  * "fill" — pack as much as possible on one sheet with the engine itself,
+             then carry the rest over to the next sheet,
+
+works with every engine and is the only one for engines without an
+incremental bin (guillotine).
+
+plan_order() runs the strategies and returns the plan with the fewest
+sheets (ties → emptiest last sheet, which leaves the most usable offcut).
+It stops as soon as a plan meets the L2 lower bound (see bounds), which
+the plan keeps so the UI can show the gap.
+"""
+
+from nesting import bounds
+from nesting.engines import get_engine, layout_area
+from nesting.geometry import Rect
+from nesting.leftovers import MIN_LEFTOVER, free_rectangles
+from nesting.maxrects import MaxRectsBin
+from nesting.skyline import Skyline
+
+STRATEGIES = ("ffd", "bfd", "fill")
+
+
+class SheetPlan:
+    def __init__(self, sheet_w, sheet_h, used=None):
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.used = used if used is not None else []
+
+    @property
+    def used_area(self):
+        return layout_area(self.used)
+
+    @property
+    def yield_ratio(self):
+        area = self.sheet_w * self.sheet_h
+        return self.used_area / area if area else 0.0
+
+    def leftovers(self, min_size=MIN_LEFTOVER):
+        return free_rectangles(self.sheet_w, self.sheet_h, self.used, min_size=min_size)
+
+
+class OrderPlan:
+    def __init__(self, sheet_w, sheet_h, engine_key, strategy, sheets, unplaced):
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.engine_key = engine_key
+        self.strategy = strategy
+        self.sheets = sheets
+        self.unplaced = unplaced
+        self.lower_bound = 0            # fewest sheets any plan could use
+
+    @property
+    def sheets_needed(self):
+        return len(self.sheets)
+
+    @property
+    def sheet_gap(self):
+        return self.sheets_needed - self.lower_bound
+
+    @property
+    def optimal(self):
+        return self.sheets_needed <= self.lower_bound
+
+    @property
+    def total_yield(self):
+        area = self.sheet_w * self.sheet_h * len(self.sheets)
+        return sum(s.used_area for s in self.sheets) / area if area else 0.0
+
+
+# ---------- incremental sheet bins ----------
+class _SkylineBin:
+    def __init__(self, sheet_w, sheet_h, kerf):
+        self.skyline = Skyline(sheet_w, sheet_h, kerf=kerf)
+
+    def place(self, w, h):
+        pos = self.skyline.place(w, h)
+        if pos:
+            return pos[0], pos[1], w, h
+        if w != h:
+            pos = self.skyline.place(h, w)
+            if pos:
+                return pos[0], pos[1], h, w
+        return None
+
+
+class _MaxRectsBin:
+    def __init__(self, sheet_w, sheet_h, kerf, heuristic):
+        self.bin = MaxRectsBin(sheet_w, sheet_h, heuristic=heuristic, kerf=kerf)
+
+    def place(self, w, h):
+        return self.bin.place(w, h)
+
+
+def _bin_factory(engine_key, sheet_w, sheet_h, kerf):
+    if engine_key == "skyline":
+        return lambda: _SkylineBin(sheet_w, sheet_h, kerf)
+    if engine_key.startswith("maxrects-"):
+        heuristic = engine_key.split("-", 1)[1]
+        return lambda: _MaxRectsBin(sheet_w, sheet_h, kerf, heuristic)
+    return None
+
+
+def _largest_first(rectangles):
+    return sorted(rectangles, key=lambda r: (-(r[0] * r[1]), -max(r[0], r[1])))
+
+
+def _fits_blank(sheet_w, sheet_h, w, h):
+    return (w <= sheet_w and h <= sheet_h) or (h <= sheet_w and w <= sheet_h)
+
+
+def _pack_incremental(sheet_w, sheet_h, pieces, new_bin, strategy):
+    bins = []        # [bin, SheetPlan, failed_sizes]
+    unplaced = []
+    for w, h, label, is_bracket in pieces:
+        if not _fits_blank(sheet_w, sheet_h, w, h):
+            unplaced.append(label)
+            continue
+
+        order = bins if strategy == "ffd" else sorted(bins, key=lambda b: -b[1].used_area)
+        spot = None
+        for entry in order:
+            bin_, plan, failed = entry
+            # Free space only shrinks: a size that failed once never fits again
+            if (w, h) in failed:
+                continue
+            spot = bin_.place(w, h)
+            if spot:
+                break
+            failed.add((w, h))
+
+        if not spot:
+            entry = [new_bin(), SheetPlan(sheet_w, sheet_h), set()]
+            bins.append(entry)
+            spot = entry[0].place(w, h)
+            if not spot:
+                unplaced.append(label)
+                continue
+
+        x, y, pw, ph = spot
+        entry[1].used.append(Rect(x, y, pw, ph, label, is_bracket))
+
+    return [plan for _, plan, _ in bins if plan.used], unplaced
+
+
+def _pack_fill(sheet_w, sheet_h, pieces, engine):
+    sheets = []
+    unplaced = [p[2] for p in pieces if not _fits_blank(sheet_w, sheet_h, p[0], p[1])]
+    remaining = [p for p in pieces if _fits_blank(sheet_w, sheet_h, p[0], p[1])]
+    while remaining:
+        used, _ = engine.pack(sheet_w, sheet_h, remaining)
+        if not used:
+            unplaced.extend(p[2] for p in remaining)
+            break
+        sheets.append(SheetPlan(sheet_w, sheet_h, used))
+        # Engines report unplaced labels only; drop placed pieces one by one
+        # (matched on size too — rotated pieces come back with w/h swapped)
+        left = list(remaining)
+        for _, _, w, h, label, is_bracket in used:
+            size = sorted((w, h))
+            for i, p in enumerate(left):
+                if p[2] == label and p[3] == is_bracket and sorted((p[0], p[1])) == size:
+                    del left[i]
+                    break
+        remaining = left
+    return sheets, unplaced
+
+
+def fill_order(sheet_w, sheet_h, rectangles, engine, engine_key=""):
+    """
+    The "fill" strategy with any packer that has
+    pack(sheet_w, sheet_h, rectangles) -> (used, unplaced), such as the app's
+    own layout (nesting.jobs). Returns an OrderPlan.
+    """
+    sheets, unplaced = _pack_fill(sheet_w, sheet_h, _largest_first(rectangles), engine)
+    plan = OrderPlan(sheet_w, sheet_h, engine_key, "fill", sheets, unplaced)
+    plan.lower_bound = bounds.l2_bound(sheet_w, sheet_h, rectangles)
+    return plan
+
+
+def plan_order(sheet_w, sheet_h, rectangles, engine_key="maxrects-bssf", kerf=0.0, strategies=STRATEGIES):
+    """
+    Pack (w, h, label, is_bracket) pieces onto as few sheet_w x sheet_h
+    sheets as possible. Returns the best OrderPlan.
+    """
+    pieces = _largest_first(rectangles)
+    new_bin = _bin_factory(engine_key, sheet_w, sheet_h, kerf)
+
+    if new_bin is None:
+        strategies = ("fill",)
+    lower_bound = bounds.l2_bound(sheet_w, sheet_h, rectangles)
+    too_large = sum(1 for p in pieces if not _fits_blank(sheet_w, sheet_h, p[0], p[1]))
+
+    plans = []
+    for strategy in strategies:
+        if strategy == "fill":
+            engine = get_engine(engine_key, kerf=kerf, presort=True)
+            sheets, unplaced = _pack_fill(sheet_w, sheet_h, pieces, engine)
+        else:
+            sheets, unplaced = _pack_incremental(sheet_w, sheet_h, pieces, new_bin, strategy)
+        plan = OrderPlan(sheet_w, sheet_h, engine_key, strategy, sheets, unplaced)
+        plan.lower_bound = lower_bound
+        plans.append(plan)
+        if plan.optimal and len(unplaced) == too_large:
+            break   # provably fewest sheets; the other strategies can't beat it
+
+    def rank(plan):
+        last = plan.sheets[-1].used_area if plan.sheets else 0.0
+        return (len(plan.unplaced), plan.sheets_needed, last)
+
+    return min(plans, key=rank)
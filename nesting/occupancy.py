@@ -0,0 +1,104 @@
+# nesting/occupancy.py
+"""
+NumPy occupancy grid used for waste detection on a sheet.
+
+The sheet is rasterized at `resolution` cells per inch (8 → 1/8"), placed
+rectangles are burned into a boolean array with slice assignment, and free
+space is extracted as blocks:
+
+  * every row is scanned for runs of free cells (run-length via np.diff),
+  * each run is grown in the scan direction while the whole column span
+    stays free (one `.any(axis=1)` + `argmax` per run),
+  * the block is marked visited so later rows skip it.
+
+This is the exact same greedy as the old nested-list scanner, so the blocks
+(and their order) are identical — only the inner loops moved into NumPy.
+"""
+
+from math import ceil, floor
+
+import numpy as np
+
+
+class OccupancyGrid:
+    def __init__(self, sheet_w, sheet_h, resolution=8):
+        self.resolution = resolution
+        self.grid_w = max(0, int(sheet_w * resolution))
+        self.grid_h = max(0, int(sheet_h * resolution))
+        self.used = np.zeros((self.grid_h, self.grid_w), dtype=bool)
+
+    def mark(self, rects, snap="floor"):
+        """
+        Burn rectangles (x, y, w, h, *extra) into the grid.
+        snap="floor" matches ManufacturingModule (int(x*res + dx)),
+        snap="round" matches the standalone algorithm scripts (round(x*res)).
+        """
+        res = self.resolution
+        to_cell = floor if snap == "floor" else round
+        for x, y, w, h, *_ in rects:
+            x0 = int(to_cell(x * res))
+            y0 = int(to_cell(y * res))
+            x1 = x0 + int(ceil(w * res))
+            y1 = y0 + int(ceil(h * res))
+            x0, y0 = max(0, x0), max(0, y0)
+            x1, y1 = min(self.grid_w, x1), min(self.grid_h, y1)
+            if x0 < x1 and y0 < y1:
+                self.used[y0:y1, x0:x1] = True
+        return self
+
+    @staticmethod
+    def row_runs(free_row):
+        """(start, end) pairs of consecutive True cells in a 1-D bool row."""
+        padded = np.empty(free_row.size + 2, dtype=np.int8)
+        padded[0] = padded[-1] = 0
+        padded[1:-1] = free_row
+        edges = np.diff(padded)
+        return zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist())
+
+    def waste_blocks(self, scan_direction="top"):
+        """Greedy free-space blocks in inches: [(x, y, w, h), ...]."""
+        res = self.resolution
+        grid_h = self.grid_h
+        if not grid_h or not self.grid_w:
+            return []
+
+        blocked = self.used.copy()
+        free_per_row = self.grid_w - blocked.sum(axis=1)
+        top = scan_direction == "top"
+        y_range = range(grid_h) if top else range(grid_h - 1, -1, -1)
+        blocks = []
+
+        for y in y_range:
+            if free_per_row[y] <= 0:
+                continue
+            for a, b in self.row_runs(~blocked[y]):
+                # Grow the run downwards/upwards while the full span stays free
+                if top:
+                    below = blocked[y + 1:, a:b].any(axis=1)
+                else:
+                    below = blocked[:y, a:b][::-1].any(axis=1)
+                if below.size == 0:
+                    extra = 0
+                elif below.any():
+                    extra = int(below.argmax())
+                else:
+                    extra = below.size
+                max_h = 1 + extra
+
+                y0 = y if top else y - max_h + 1
+                blocked[y0:y0 + max_h, a:b] = True
+                free_per_row[y0:y0 + max_h] -= (b - a)
+
+                blocks.append((a / res, y0 / res, (b - a) / res, max_h / res))
+
+        return blocks
+
+
+def scan_waste_blocks(sheet_w, sheet_h, rects, scan_direction="top", resolution=8, snap="floor"):
+    grid = OccupancyGrid(sheet_w, sheet_h, resolution)
+    grid.mark(rects, snap=snap)
+    return grid.waste_blocks(scan_direction)
+
+
+def find_all_waste_blocks(sheet_w, sheet_h, rects, resolution=8):
+    return scan_waste_blocks(sheet_w, sheet_h, rects, scan_direction="bottom", resolution=resolution)
@@ -0,0 +1,137 @@
+# nesting/plan_codec.py
+"""
+Compact encoding of a finished cutting plan for the order document, so the
+order viewer (and the stock update when an order completes) can draw and
+use the exact layout that was sent, without re-nesting or reading stock.
+
+Every length is stored as integer 1/16" units (see geometry) and each row
+is a comma-separated list of integers, rows joined by ";". Labels are kept
+once in a list and referred to by index:
+
+    sheet: {"v": 1, "kind": "sheet", "sheet": [W, H], "labels": [...],
+            "rects": "x,y,w,h,label,bracket;...", "waste": "x,y,w,h;...",
+            "engine": key, "kerf": K,                    # how it was nested
+            "tree": {...}}                               # guillotine only
+    pipe:  {"v": 1, "kind": "pipe", "diameter": D, "kerf": K, "qty": n,
+            "short": bool, "method": str, "optimal": bool, "bound": [p, L],
+            "labels": [...], "stocks": [{"length", "label"}, ...],
+            "pipes": "repeat,stock,len,label,len,label...;...",
+            "unplaced": "len,label;..."}
+
+Identical pipes are stored once with their repeat count. A 40-piece sheet
+comes to about 1.5 KB (a guillotine cut tree adds a few KB), far inside
+the Firestore document limit.
+"""
+
+from nesting.cutstock import CutPlan, PipeCut, Stock
+from nesting.geometry import Rect, from_units, to_units
+from nesting.guillotine import CutNode
+
+FORMAT_VERSION = 1
+
+
+# ---------- rows ----------
+def _pack(rows):
+    return ";".join(",".join(str(int(v)) for v in row) for row in rows)
+
+
+def _unpack(text):
+    return [[int(v) for v in row.split(",")] for row in text.split(";") if row] if text else []
+
+
+class _Labels:
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+    def __call__(self, label):
+        label = str(label)
+        if label not in self._index:
+            self._index[label] = len(self.names)
+            self.names.append(label)
+        return self._index[label]
+
+
+# ---------- sheets ----------
+def encode_sheet_layout(sheet_w, sheet_h, used, waste=(), tree=None, engine=None, kerf=None):
+    labels = _Labels()
+    data = {
+        "v": FORMAT_VERSION,
+        "kind": "sheet",
+        "sheet": [to_units(sheet_w), to_units(sheet_h)],
+        "rects": _pack(
+            (to_units(x), to_units(y), to_units(w), to_units(h), labels(label), bool(is_bracket))
+            for x, y, w, h, label, is_bracket in used
+        ),
+        "waste": _pack((to_units(x), to_units(y), to_units(w), to_units(h)) for x, y, w, h in waste),
+    }
+    data["labels"] = labels.names
+    if engine is not None:
+        data["engine"] = str(engine)
+    if kerf is not None:
+        data["kerf"] = to_units(kerf)
+    if tree is not None:
+        data["tree"] = tree.to_dict()
+    return data
+
+
+def decode_sheet_layout(data):
+    """(sheet_w, sheet_h, used, waste, tree) in inches."""
+    labels = data.get("labels", [])
+    sheet_w, sheet_h = (from_units(v) for v in data["sheet"])
+    used = [
+        Rect(from_units(x), from_units(y), from_units(w), from_units(h), labels[label], bool(is_bracket))
+        for x, y, w, h, label, is_bracket in _unpack(data.get("rects"))
+    ]
+    waste = [tuple(from_units(v) for v in row) for row in _unpack(data.get("waste"))]
+    tree = CutNode.from_dict(data["tree"]) if data.get("tree") else None
+    return sheet_w, sheet_h, used, waste, tree
+
+
+# ---------- pipes ----------
+def encode_pipe_plan(plan, diameter=0.0, pipe_qty=1, short=False):
+    labels = _Labels()
+    stocks = {}
+    stock_rows = []
+    rows = []
+    for pipe, repeat in plan.patterns():
+        if id(pipe.stock) not in stocks:
+            stocks[id(pipe.stock)] = len(stock_rows)
+            stock_rows.append([to_units(pipe.stock.length), pipe.stock.label])
+        row = [repeat, stocks[id(pipe.stock)]]
+        for length, label in pipe.cuts:
+            row += [to_units(length), labels(label)]
+        rows.append(row)
+    kerf = plan.pipes[0].kerf if plan.pipes else 0.0
+    return {
+        "v": FORMAT_VERSION,
+        "kind": "pipe",
+        "diameter": to_units(diameter),
+        "kerf": to_units(kerf),
+        "qty": int(pipe_qty),
+        "short": bool(short),
+        "method": plan.method,
+        "optimal": bool(plan.optimal),
+        "bound": [int(plan.bound[0]), to_units(plan.bound[1])],
+        "stocks": [{"length": length, "label": label} for length, label in stock_rows],
+        "pipes": _pack(rows),
+        "unplaced": _pack((to_units(length), labels(label)) for length, label in plan.unplaced),
+        "labels": labels.names,
+    }
+
+
+def decode_pipe_plan(data):
+    """(CutPlan, diameter, pipe_qty, short); stock on hand is not part of the record."""
+    labels = data.get("labels", [])
+    stocks = [Stock(from_units(s["length"]), label=s.get("label")) for s in data.get("stocks", [])]
+    kerf = from_units(data.get("kerf", 0))
+    pipes = []
+    for row in _unpack(data.get("pipes")):
+        repeat, stock = row[0], stocks[row[1]]
+        cuts = [(from_units(length), labels[label]) for length, label in zip(row[2::2], row[3::2])]
+        pipes.extend(PipeCut(stock, list(cuts), kerf) for _ in range(repeat))
+    unplaced = [(from_units(length), labels[label]) for length, label in _unpack(data.get("unplaced"))]
+    plan = CutPlan(pipes, unplaced, data.get("method", ""), data.get("optimal", False))
+    pipes_bound, length_bound = data.get("bound", [0, 0])
+    plan.bound = (pipes_bound, from_units(length_bound))
+    return plan, from_units(data.get("diameter", 0)), data.get("qty", 1), data.get("short", False)
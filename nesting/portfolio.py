@@ -0,0 +1,282 @@
+# nesting/portfolio.py
+"""
+Heuristic portfolio: run many (engine, piece order, rotation policy)
+combinations in worker processes under a time budget and keep the layout
+with the best yield.
+
+A single run depends heavily on the order pieces are fed in and how they
+are turned, so instead of guessing we try them all in parallel:
+
+    run = PortfolioRun(48, 96, rectangles, budget=2.0)
+    while not run.done:
+        better = run.poll()      # non-blocking; a new best layout or None
+        ...
+
+The run stops early once a layout holds every piece area a sheet could
+(bounds.max_area): no other candidate can beat it on yield.
+
+Everything here is Qt-free so worker processes import it cheaply. If a
+process pool cannot be started the candidates are evaluated in-process in
+short slices from poll(), so callers behave the same either way.
+"""
+
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from nesting import bounds, rowfill
+from nesting.engines import ENGINES, get_engine, layout_area
+
+ROTATIONS = ("free", "tall", "wide", "fixed")
+SHUFFLES = 3
+CHUNK = 4               # candidates per worker task
+INLINE_SLICE = 0.03     # seconds of in-process work per poll() without a pool
+
+
+# ---------- piece orders ----------
+def _grouped(rectangles, sheet_w, sheet_h):
+    # Same idea as ManufacturingModule.smart_group_sort: identical sizes stay together
+    groups = defaultdict(list)
+    for rect in rectangles:
+        groups[(rect[0], rect[1])].append(rect)
+    keys = sorted(groups, key=lambda k: (k[0], -int(k[1] >= k[0]), -len(groups[k]), -(k[0] * k[1])))
+    return [r for k in keys for r in groups[k]]
+
+
+def _rows(rectangles, sheet_w, sheet_h):
+    # Best-width rows first (the auto-optimize pass), then whatever is left
+    rows = rowfill.fill_rows(sheet_w, sheet_h, rectangles)
+    left = list(rectangles)
+    for w, h, label, is_bracket in rows:
+        for i, r in enumerate(left):
+            if r[2] == label and r[3] == is_bracket and {r[0], r[1]} == {w, h}:
+                del left[i]
+                break
+    return rows + left
+
+
+ORDERINGS = {
+    "given": lambda rects, W, H: list(rects),
+    "grouped": _grouped,
+    "rows": _rows,
+    "area": lambda rects, W, H: sorted(rects, key=lambda r: -(r[0] * r[1])),
+    "long-side": lambda rects, W, H: sorted(rects, key=lambda r: (-max(r[0], r[1]), -(r[0] * r[1]))),
+    "height": lambda rects, W, H: sorted(rects, key=lambda r: (-r[1], -r[0])),
+    "width": lambda rects, W, H: sorted(rects, key=lambda r: (-r[0], -r[1])),
+    "perimeter": lambda rects, W, H: sorted(rects, key=lambda r: -(r[0] + r[1])),
+}
+
+
+def order_pieces(ordering, rectangles, sheet_w, sheet_h):
+    if ordering.startswith("shuffle-"):
+        pieces = list(rectangles)
+        random.Random(int(ordering.split("-", 1)[1])).shuffle(pieces)
+        return pieces
+    return ORDERINGS[ordering](rectangles, sheet_w, sheet_h)
+
+
+def orient_pieces(rotation, rectangles):
+    if rotation == "tall":
+        return [(min(w, h), max(w, h), label, br) for w, h, label, br in rectangles]
+    if rotation == "wide":
+        return [(max(w, h), min(w, h), label, br) for w, h, label, br in rectangles]
+    return list(rectangles)
+
+
+def default_candidates(engines=None):
+    """(engine, ordering, rotation) triples, most promising first."""
+    engines = list(engines or ENGINES)
+    orderings = list(ORDERINGS) + [f"shuffle-{i}" for i in range(1, SHUFFLES + 1)]
+    candidates = []
+    for rotation in ROTATIONS:
+        for ordering in orderings:
+            for key in engines:
+                if ENGINES[key].self_ordering:
+                    # Guillotine / blocks sort and orient pieces themselves; one run each is enough
+                    if ordering != "given" or rotation != "free":
+                        continue
+                candidates.append((key, ordering, rotation))
+    return candidates
+
+
+# ---------- evaluation ----------
+class PortfolioResult:
+    def __init__(self, candidate, used, unplaced, tree, sheet_w, sheet_h):
+        self.candidate = candidate
+        self.used = used
+        self.unplaced = unplaced
+        self.tree = tree
+        self.area = layout_area(used)
+        self.yield_ratio = self.area / (sheet_w * sheet_h) if sheet_w * sheet_h else 0.0
+        # Highest piece edge: lower means a bigger offcut left at the top
+        self.height = max((r[1] + r[3] for r in used), default=0.0)
+
+    @property
+    def score(self):
+        return (round(self.area, 6), -len(self.unplaced), -round(self.height, 6))
+
+
+def evaluate(sheet_w, sheet_h, rectangles, kerf, candidate):
+    key, ordering, rotation = candidate
+    pieces = orient_pieces(rotation, order_pieces(ordering, rectangles, sheet_w, sheet_h))
+    engine = get_engine(key, kerf=kerf, allow_rotate=rotation != "fixed", presort=False)
+    used, unplaced = engine.pack(sheet_w, sheet_h, pieces)
+    return PortfolioResult(candidate, used, unplaced, engine.last_tree, sheet_w, sheet_h)
+
+
+def _evaluate_chunk(sheet_w, sheet_h, rectangles, kerf, candidates):
+    best = None
+    for candidate in candidates:
+        result = evaluate(sheet_w, sheet_h, rectangles, kerf, candidate)
+        if best is None or result.score > best.score:
+            best = result
+    return best
+
+
+_executor = None
+
+
+def shared_executor():
+    """Process pool kept for the life of the app (None if it can't be started)."""
+    global _executor
+    if _executor is None:
+        try:
+            _executor = ProcessPoolExecutor()
+        except (OSError, NotImplementedError, ImportError):
+            _executor = False
+    return _executor or None
+
+
+def _drop_executor():
+    global _executor
+    if _executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+class PortfolioRun:
+    def __init__(self, sheet_w, sheet_h, rectangles, kerf=0.0, budget=2.0, candidates=None, executor="shared"):
+        self.sheet_w = sheet_w
+        self.sheet_h = sheet_h
+        self.rectangles = [tuple(r) for r in rectangles]
+        self.kerf = kerf
+        self.budget = budget
+        self.candidates = list(candidates or default_candidates())
+        self.total = len(self.candidates)
+        self.tried = 0
+        self.best = None
+        self.done = False
+        self.optimal = False
+        self.yield_bound = bounds.yield_bound(sheet_w, sheet_h, self.rectangles)
+        self._area_bound = bounds.max_area(sheet_w, sheet_h, self.rectangles)
+        self._improved = False
+        self._started = time.monotonic()
+        self._pending = []
+        self._queue = list(self.candidates)
+
+        self.executor = shared_executor() if executor == "shared" else executor
+        if self.executor is not None:
+            self._submit_all()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def _submit_all(self):
+        try:
+            while self._queue:
+                chunk = self._queue[:CHUNK]
+                future = self.executor.submit(
+                    _evaluate_chunk, self.sheet_w, self.sheet_h, self.rectangles, self.kerf, chunk)
+                self._pending.append((future, chunk))
+                self._queue = self._queue[CHUNK:]
+        except (BrokenProcessPool, RuntimeError):
+            self._fall_back_inline()
+
+    def _fall_back_inline(self):
+        # Pool died (or is shutting down): finish the remaining work in-process
+        self._queue = [c for _, chunk in self._pending for c in chunk] + self._queue
+        for future, _ in self._pending:
+            future.cancel()
+        self._pending = []
+        self.executor = None
+        _drop_executor()
+
+    def _offer(self, result):
+        if result is not None and (self.best is None or result.score > self.best.score):
+            self.best = result
+            self._improved = True
+            self.optimal = result.area >= self._area_bound - 1e-6
+
+    def _collect(self):
+        still = []
+        broken = False
+        for future, chunk in self._pending:
+            if broken or not future.done():
+                still.append((future, chunk))
+                continue
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken = True
+                still.append((future, chunk))
+                continue
+            except Exception as e:
+                print("Portfolio candidate failed:", e)
+                result = None
+            self.tried += len(chunk)
+            self._offer(result)
+        self._pending = still
+        if broken:
+            self._fall_back_inline()
+
+    def _run_inline(self):
+        slice_end = time.monotonic() + INLINE_SLICE
+        while self._queue and not self.optimal and time.monotonic() < slice_end:
+            candidate = self._queue.pop(0)
+            self.tried += 1
+            try:
+                self._offer(evaluate(self.sheet_w, self.sheet_h, self.rectangles, self.kerf, candidate))
+            except Exception as e:
+                print("Portfolio candidate failed:", e)
+
+    def poll(self):
+        """Collect finished work; returns the new best result if it improved, else None."""
+        if not self.done:
+            if self.executor is not None:
+                self._collect()
+            if self.executor is None:
+                self._run_inline()
+            if self.optimal or (not self._pending and not self._queue) or self.elapsed >= self.budget:
+                self.cancel()
+
+        if self._improved:
+            self._improved = False
+            return self.best
+        return None
+
+    def cancel(self):
+        for future, _ in self._pending:
+            future.cancel()
+        self._pending = []
+        self._queue = []
+        self.done = True
+
+    def wait(self, on_improve=None, interval=0.01):
+        """Blocking loop for scripts; calls on_improve(result) on every new best."""
+        while not self.done:
+            better = self.poll()
+            if better is not None and on_improve:
+                on_improve(better)
+            if not self.done and self.executor is not None:
+                time.sleep(interval)
+        better = self.poll()
+        if better is not None and on_improve:
+            on_improve(better)
+        return self.best
+
+
+def run_portfolio(sheet_w, sheet_h, rectangles, kerf=0.0, budget=2.0, on_improve=None, **options):
+    return PortfolioRun(sheet_w, sheet_h, rectangles, kerf=kerf, budget=budget, **options).wait(on_improve)
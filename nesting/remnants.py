@@ -0,0 +1,215 @@
+# nesting/remnants.py
+"""
+Remnant-first nesting: finished orders put their offcuts back into stock as
+"Waste Sheet WxH" products (subcategory "Waste Raw Material"). Before an
+order opens full sheets, cuts that fit on one of those remnants are cut
+from it instead.
+
+RemnantIndex keeps remnants grouped by
+
+    (metal_type, gauge, branch, color, condition)
+
+and, per group, sorted by area, so "smallest remnant that holds w x h" is a
+bisect plus a short scan even with thousands of remnant SKUs.
+
+plan_with_remnants() works best-fit decreasing over remnants: the largest
+remaining cut that fits any remnant picks the smallest such remnant, which
+is then filled with whatever else fits (MaxRects). The rest go through
+plan_order() on full sheets, and the plan reports how many full sheets that
+saved against nesting everything on full sheets.
+"""
+
+from bisect import bisect_left
+
+from nesting.geometry import Rect, snap_down, to_inches
+from nesting.maxrects import MaxRectsBin
+from nesting.multisheet import plan_order
+
+WASTE_SUBCATEGORY = "Waste Raw Material"
+MAX_REMNANT_SHEETS = 200    # remnants tried per order; keeps big orders interactive
+
+
+def _norm(value):
+    return str(value if value is not None else "").strip().lower()
+
+
+class Remnant:
+    __slots__ = ("w", "h", "qty", "ref")
+
+    def __init__(self, w, h, qty, ref=None):
+        self.w, self.h = max(w, h), min(w, h)   # long side first
+        self.qty = qty
+        self.ref = ref                          # product variant dict
+
+    @property
+    def area(self):
+        return self.w * self.h
+
+    def holds(self, w, h):
+        return max(w, h) <= self.w and min(w, h) <= self.h
+
+    def __repr__(self):
+        return f"Remnant({self.w} x {self.h}, qty={self.qty})"
+
+
+def group_key(metal_type, gauge, branch, color, condition):
+    return (_norm(metal_type), _norm(gauge), _norm(branch), _norm(color), _norm(condition))
+
+
+class RemnantIndex:
+    def __init__(self):
+        self._groups = {}       # key -> ([area, ...], [Remnant, ...]) sorted by area
+
+    def __len__(self):
+        return sum(len(r) for _, r in self._groups.values())
+
+    def add(self, key, remnant):
+        areas, remnants = self._groups.setdefault(key, ([], []))
+        i = bisect_left(areas, remnant.area)
+        areas.insert(i, remnant.area)
+        remnants.insert(i, remnant)
+
+    @classmethod
+    def from_products(cls, products):
+        """
+        products: waste product dicts as stored in Firestore (with "qty"
+        nested branch → color → condition). One Remnant per in-stock variant.
+        """
+        index = cls()
+        entries = []
+        for data in products:
+            try:
+                length = snap_down(to_inches(float(data.get("length", 0)), data.get("length_unit", "inch")))
+                width = snap_down(to_inches(float(data.get("width", 0)), data.get("width_unit", "inch")))
+            except (TypeError, ValueError):
+                continue
+            if length <= 0 or width <= 0:
+                continue
+            for branch, colors in (data.get("qty") or {}).items():
+                for color, conditions in (colors or {}).items():
+                    for condition, amount in (conditions or {}).items():
+                        try:
+                            amount = int(float(amount))
+                        except (TypeError, ValueError):
+                            continue
+                        if amount <= 0:
+                            continue
+                        variant = dict(data, branch=branch, color=color, condition=condition, available_qty=amount)
+                        key = group_key(data.get("metal_type"), data.get("gauge"), branch, color, condition)
+                        entries.append((key, Remnant(length, width, amount, variant)))
+
+        # Bulk build: one sort per group instead of an insert per remnant
+        for key, remnant in entries:
+            index._groups.setdefault(key, ([], []))[1].append(remnant)
+        for key, (areas, remnants) in index._groups.items():
+            remnants.sort(key=lambda r: r.area)
+            areas.extend(r.area for r in remnants)
+        return index
+
+    def group(self, key):
+        return self._groups.get(key, ([], []))[1]
+
+    def product_ids(self):
+        """Ids of the products (ref["id"]) the remnants were read from."""
+        return {(r.ref or {}).get("id") for _, remnants in self._groups.values() for r in remnants}
+
+    def smallest_fit(self, key, w, h, taken=None):
+        """Smallest remnant in the group that holds w x h and still has qty left."""
+        areas, remnants = self._groups.get(key, ([], []))
+        taken = taken or {}
+        for i in range(bisect_left(areas, w * h), len(remnants)):
+            remnant = remnants[i]
+            if remnant.holds(w, h) and taken.get(id(remnant), 0) < remnant.qty:
+                return remnant
+        return None
+
+
+class RemnantUse:
+    def __init__(self, remnant, used):
+        self.remnant = remnant
+        self.used = used        # [(x, y, w, h, label, is_bracket)] on the remnant
+
+    @property
+    def used_area(self):
+        return sum(r[2] * r[3] for r in self.used)
+
+
+class RemnantPlan:
+    def __init__(self, uses, order_plan, baseline):
+        self.uses = uses                # [RemnantUse]
+        self.order_plan = order_plan    # full sheets for the rest
+        self.baseline = baseline        # full sheets without remnants
+
+    @property
+    def sheets_needed(self):
+        return self.order_plan.sheets_needed
+
+    @property
+    def sheets_saved(self):
+        return self.baseline.sheets_needed - self.order_plan.sheets_needed
+
+    @property
+    def remnant_area(self):
+        return sum(u.used_area for u in self.uses)
+
+    @property
+    def cuts_on_remnants(self):
+        return sum(len(u.used) for u in self.uses)
+
+
+def _fill_remnant(remnant, anchor, pieces, kerf):
+    """Pack the anchor piece, then every other piece that fits, onto one remnant."""
+    bin_ = MaxRectsBin(remnant.w, remnant.h, heuristic="bssf", kerf=kerf)
+    used = []
+    left = []
+    for piece in [anchor] + pieces:
+        w, h, label, is_bracket = piece
+        spot = bin_.place(w, h) if remnant.holds(w, h) else None
+        if spot:
+            x, y, pw, ph = spot
+            used.append(Rect(x, y, pw, ph, label, is_bracket))
+        elif piece is anchor:
+            return [], pieces
+        else:
+            left.append(piece)
+    return used, left
+
+
+def plan_with_remnants(sheet_w, sheet_h, rectangles, index, key, engine_key="maxrects-bssf",
+                       kerf=0.0, max_remnants=MAX_REMNANT_SHEETS):
+    """
+    Cut what fits from remnants in `index` group `key`, nest the rest on
+    sheet_w x sheet_h sheets. Returns a RemnantPlan.
+    """
+    baseline = plan_order(sheet_w, sheet_h, rectangles, engine_key=engine_key, kerf=kerf)
+    if not index.group(key):
+        return RemnantPlan([], baseline, baseline)
+
+    remaining = sorted(rectangles, key=lambda r: (-(r[0] * r[1]), -max(r[0], r[1])))
+    taken = {}
+    uses = []
+    i = 0
+    while i < len(remaining) and len(uses) < max_remnants:
+        w, h = remaining[i][0], remaining[i][1]
+        remnant = index.smallest_fit(key, w, h, taken)
+        if remnant is None:
+            i += 1          # no remnant takes this one; smaller pieces still may
+            continue
+        anchor = remaining[i]
+        used, rest = _fill_remnant(remnant, anchor, remaining[:i] + remaining[i + 1:], kerf)
+        if not used:
+            i += 1
+            continue
+        taken[id(remnant)] = taken.get(id(remnant), 0) + 1
+        uses.append(RemnantUse(remnant, used))
+        # Pieces before i found no remnant and never will (stock only shrinks)
+        remaining = rest
+
+    if not uses:
+        return RemnantPlan([], baseline, baseline)
+
+    order_plan = plan_order(sheet_w, sheet_h, remaining, engine_key=engine_key, kerf=kerf)
+    if order_plan.sheets_needed > baseline.sheets_needed:
+        # Heuristic noise: never report a plan that costs more full sheets
+        return RemnantPlan([], baseline, baseline)
+    return RemnantPlan(uses, order_plan, baseline)
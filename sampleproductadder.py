@@ -1,4 +1,5 @@
 from firebase.config import db
+from firebase.local_mirror import stamped
 import random
 import string
 
@@ -43,7 +44,7 @@ def add_item(base, sub_id, is_raw):
     if not is_raw:
         item.pop("metal_type", None)
 
-    db.collection("products").add(item)
+    db.collection("products").add(stamped(item))
     print(f"✅ Added: {item['name']} [{item['item_code']}] {'(Raw)' if is_raw else '(Finished)'}")
 
 def push_all():
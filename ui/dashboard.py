@@ -9,8 +9,10 @@ from PyQt5.QtGui import QFont, QPainter, QPen
 
 from ui.sidebar import create_expandable_sidebar
 from ui.network_monitor import NetworkMonitor, MaintenanceWatcher
+from ui.live_sync import live_sync
 from firebase.cred_loader import set_refresh_token  # for logout
 from firebase.config import db, APP_VERSION
+from firebase.catalog import catalog_store, STOCK_MAX_AGE
 
 # ---- App modules ----
 from modules.products import ProductsPage
@@ -384,20 +386,10 @@ class DashboardDataWorker(QThread):
         highlights = []
 
         # --- products collection (new structure) ---
+        # Read through the session catalog: this also warms it for every module opened later
         try:
-            snaps = db.collection("products") \
-                .select([
-                    "name","item_name","item_code",
-                    "qty","reorder_qty",
-                    "length","width","height",
-                    "length_unit","width_unit","height_unit",
-                    "gauge"
-                ]) \
-                .stream()
-
-            for snap in snaps:
+            for _, it in catalog_store().ensure(max_age=STOCK_MAX_AGE).items():
                 total_items += 1
-                it = snap.to_dict() or {}
 
                 code = (it.get("item_code") or "").strip() or "-"
                 name = (it.get("name") or it.get("item_name") or code or "Item")
@@ -483,6 +475,7 @@ class DashboardApp(QMainWindow):
         self._build_ui()
         self._start_network_monitor()
         self._start_maintenance_watcher()
+        self._start_live_sync()
         self._check_maintenance_once()
         self._kick_data_load() if self._is_admin else None
 
@@ -1115,6 +1108,9 @@ class DashboardApp(QMainWindow):
                     self.maint_watcher.start()
             except Exception:
                 pass
+            # Catalog/account/party listeners reconnect by themselves; only start them if they never did
+            if not live_sync().running:
+                live_sync().start()
             # One manual check to ensure state is current
             self._check_maintenance_once()
 
@@ -1185,6 +1181,10 @@ class DashboardApp(QMainWindow):
             self.maint_watcher.start()
         except Exception:
             self.maint_watcher = None
+
+    def _start_live_sync(self):
+        # Products, categories, accounts and parties: changed documents only, after the first snapshot
+        live_sync().start()
             
     def _check_maintenance_once(self):
         """Perform a single Firestore read to sync current maintenance state."""
@@ -1387,6 +1387,10 @@ class DashboardApp(QMainWindow):
             except Exception as e:
                 print(f"Failed to close window: {e}")
 
+        # Stop the realtime listeners and drop the session catalog
+        live_sync().stop()
+        catalog_store().clear()
+
         super().closeEvent(event)
 
     # ---------------- Logout ----------------
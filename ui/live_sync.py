@@ -0,0 +1,206 @@
+# ui/live_sync.py
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from firebase.config import db
+from firebase.catalog import CatalogStore, catalog_store, documents
+from firebase.local_mirror import MIRRORED, SYNC_OVERLAP, local_mirror
+
+
+class LiveSync(QObject):
+    """
+    Firestore realtime listeners for the product catalog, accounts and parties
+    (same pattern as MaintenanceWatcher).
+
+    Each snapshot carries only the documents that changed; they are applied
+    to the in-memory stores (firebase.catalog) and the local mirror, and the
+    affected ids are emitted, so windows patch the rows they show instead of
+    re-reading the collection.
+
+    Products, accounts and parties are seeded from the local mirror (after a
+    delta sync) and then listen only to documents stamped after its
+    watermark, so starting up reads what changed since the last run, not the
+    collection. Deletes are hard deletes: a listener sees a REMOVED change
+    only for documents inside its query, and this app's own deletes are
+    discarded as they are made. The rest are found by the mirror's id-only
+    reconciliation (local_mirror.sync), which runs when a listener starts
+    and again every RECONCILE_INTERVAL while they run, so a long session
+    drops documents other clients deleted too. The two small category
+    collections are listened to whole; their first snapshot replaces the
+    mirror's copy.
+
+    A store counts as live once its listener's first snapshot is applied:
+    the seed with that snapshot on top, diffed so only the ids that differ
+    are emitted.
+
+    Signals are emitted from listener/worker threads; slots on widgets run
+    queued on the UI thread.
+    """
+    products_changed = pyqtSignal(list)     # product doc ids
+    categories_changed = pyqtSignal(list)   # main/sub category doc ids
+    accounts_changed = pyqtSignal(list)     # account doc ids
+    parties_changed = pyqtSignal(list)      # party doc ids
+
+    DOCUMENT_COLLECTIONS = ("accounts", "parties")
+    RECONCILE_INTERVAL = 15 * 60    # seconds between id reconciliations
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._unsubscribe = []
+        self._generation = 0
+        self._active = False
+        self._stopped = None        # set when this generation of listeners stops
+
+    @property
+    def running(self):
+        return self._active
+
+    def _signal_for(self, collection):
+        if collection == "products":
+            return self.products_changed
+        if collection == "accounts":
+            return self.accounts_changed
+        if collection == "parties":
+            return self.parties_changed
+        return self.categories_changed
+
+    def _apply(self, collection, upserts, removed=(), initial=False):
+        if collection in CatalogStore.LIVE_COLLECTIONS:
+            changed = catalog_store().apply(collection, upserts, removed, initial=initial)
+        else:
+            changed = documents(collection).apply(upserts, removed, initial=initial)
+        if changed:
+            self._signal_for(collection).emit(changed)
+
+    def _listener(self, collection, whole):
+        """whole: the query is the whole collection, so its first snapshot is all of it."""
+        state = {"initial": True}
+
+        def _on_snapshot(doc_snapshots, changes, read_time):
+            try:
+                mirror = local_mirror()
+                upserts, removed = {}, []
+                if state["initial"] and whole:
+                    upserts = {snap.id: snap.to_dict() or {} for snap in doc_snapshots}
+                    mirror.replace(collection, upserts)
+                else:
+                    for change in changes:
+                        snap = change.document
+                        if change.type.name == "REMOVED":
+                            # updated_at only grows: a document leaving the query was deleted outright
+                            removed.append(snap.id)
+                        else:
+                            upserts[snap.id] = snap.to_dict() or {}
+                    mirror.put(collection, upserts)
+                    mirror.delete(collection, removed)
+                    if state["initial"]:
+                        # the whole collection is the mirror with this first delta on top
+                        upserts, removed = dict(mirror.rows(collection)), []
+                self._apply(collection, upserts, removed, initial=state["initial"])
+                state["initial"] = False
+            except Exception:
+                # swallow listener exceptions; keep listener alive
+                pass
+
+        return _on_snapshot
+
+    def _subscribe(self, collection, generation):
+        try:
+            mirror = local_mirror()
+            query, whole = db.collection(collection), True
+            removed = []
+            if MIRRORED[collection][1]:
+                # Catch the mirror up (deletes included), then only newer writes
+                pulled = mirror.pull(collection)
+                removed = pulled[1] if pulled else []
+                watermark = mirror.watermark(collection)
+                if watermark is not None:
+                    query = query.where("updated_at", ">", watermark - SYNC_OVERLAP)
+                    whole = False
+            # Seed from disk; the first snapshot then only emits what differs.
+            # Not initial: a store only counts as live once its listener delivers.
+            if mirror.synced(collection):
+                if generation != self._generation:
+                    return
+                self._apply(collection, dict(mirror.rows(collection)), removed)
+            watch = query.on_snapshot(self._listener(collection, whole))
+        except Exception:
+            # Listener not available (e.g., transient network); modules keep reading on demand
+            # and the dashboard starts the listeners again once it is back online
+            with self._lock:
+                if generation == self._generation:
+                    self._active = False
+                    # no listener behind the stores: back to max_age re-reads
+                    catalog_store().stop_live()
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._unsubscribe.append(watch.unsubscribe)
+                return
+        # stopped (or restarted) while this one was starting
+        try:
+            watch.unsubscribe()
+        except Exception:
+            pass
+
+    def _reconcile(self, stopped):
+        """Every RECONCILE_INTERVAL: sync the delta collections and apply what the listeners missed."""
+        mirror = local_mirror()
+        collections = [c for c in CatalogStore.LIVE_COLLECTIONS + self.DOCUMENT_COLLECTIONS if MIRRORED[c][1]]
+        while not stopped.wait(self.RECONCILE_INTERVAL):
+            for collection in collections:
+                try:
+                    pulled = mirror.pull(collection)
+                except Exception:
+                    continue
+                if not pulled or stopped.is_set():
+                    continue
+                read, removed = pulled
+                upserts = {}
+                for doc_id in read:
+                    data = mirror.get(collection, doc_id)
+                    if data is not None:
+                        upserts[doc_id] = data
+                self._apply(collection, upserts, removed)
+
+    def start(self):
+        # avoid double subscribe
+        self.stop()
+        with self._lock:
+            generation = self._generation
+            self._active = True
+            self._stopped = stopped = threading.Event()
+        # Seeding reads the mirror (and syncs it): keep it off the UI thread
+        for collection in CatalogStore.LIVE_COLLECTIONS + self.DOCUMENT_COLLECTIONS:
+            threading.Thread(target=self._subscribe, args=(collection, generation), daemon=True).start()
+        threading.Thread(target=self._reconcile, args=(stopped,), daemon=True).start()
+
+    def stop(self):
+        with self._lock:
+            self._generation += 1
+            self._active = False
+            if self._stopped is not None:
+                self._stopped.set()
+                self._stopped = None
+            unsubscribe, self._unsubscribe = self._unsubscribe, []
+        for unsub in unsubscribe:
+            try:
+                unsub()
+            except Exception:
+                pass
+        catalog_store().stop_live()
+        for collection in self.DOCUMENT_COLLECTIONS:
+            documents(collection).clear()
+
+
+_live_sync = None
+
+
+def live_sync():
+    """The listener service of this session (started by the dashboard)."""
+    global _live_sync
+    if _live_sync is None:
+        _live_sync = LiveSync()
+    return _live_sync
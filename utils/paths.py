@@ -0,0 +1,10 @@
+# utils/paths.py
+import os
+
+
+def app_cache_dir() -> str:
+    """The app's per-user cache directory (layout cache, local mirror)."""
+    base = os.environ.get("APPDATA") if os.name == "nt" else os.path.join(os.path.expanduser("~"), ".config")
+    root = os.path.join(base, "PlayWithAayan-ERP_Software", "cache")
+    os.makedirs(root, exist_ok=True)
+    return root